@@ -1,13 +1,29 @@
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from src.config.settings import OUTPUT_DIR, ensure_directories
-from api.routes import config, gallery, generate
+from src.jobs import get_job_service
+from src.utils.file_utils import reconcile_gallery_index
+from api.routes import config, gallery, generate, jobs, metrics
 
 ensure_directories()
 
-app = FastAPI(title="AI Wallpaper Generator")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Catch up the gallery index with files added or removed while offline
+    threading.Thread(target=reconcile_gallery_index, name="gallery-reconcile", daemon=True).start()
+    service = get_job_service()
+    service.start()
+    yield
+    service.stop()
+
+
+app = FastAPI(title="AI Wallpaper Generator", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,3 +38,5 @@ app.mount("/images", StaticFiles(directory=str(OUTPUT_DIR)), name="images")
 app.include_router(config.router, prefix="/api/config", tags=["config"])
 app.include_router(gallery.router, prefix="/api/gallery", tags=["gallery"])
 app.include_router(generate.router, tags=["generate"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(metrics.router, tags=["metrics"])
@@ -1,12 +1,40 @@
 from fastapi import APIRouter, Query
 
 from src.config.presets import DEVICE_PRESETS, calculate_base_resolution, validate_resolution
+from src.config.profiles import PROFILES, SCHEDULERS
 from src.config.settings import DEFAULT_SETTINGS
-from src.generator.upscaler import UPSCALER_MODELS
+from src.generator.device import get_execution_backend
+from src.generator.embeddings import get_embedding_cache
+from src.generator.model_manager import get_model_manager
+from src.generator.upscaler import AUTO_UPSCALE_MODEL, UPSCALER_MODELS
+from src.jobs import get_job_service
 from api.schemas import ValidationResponse
 
 router = APIRouter()
 
+# Server-side settings that are not exposed to the UI
+_INTERNAL_SETTINGS = (
+    "model_id", "use_fp16", "enable_attention_slicing", "base_size",
+    "model_cache_budget_gb", "low_memory_mode", "max_batch_size",
+    "upscale_tile", "upscale_tile_overlap", "upscale_memory_budget_gb",
+    "upscale_lanczos_threshold", "encode_workers", "progress_min_interval",
+    "preview_budget", "embedding_cache_mb", "embedding_cache_disk", "base_cache_mb",
+    "execution_mode", "cpu_dtype", "generator_backend", "synthetic_step_ms",
+    "synthetic_step_ms_per_mp", "synthetic_upscale_ms_per_mp", "synthetic_load_ms",
+    "pipeline_stages", "stage_queue_size", "stage_max_pending_saves",
+    "worker_devices", "worker_heartbeat_seconds", "worker_heartbeat_timeout", "worker_max_attempts",
+)
+
+
+@router.get("")
+def get_config():
+    """Server capabilities: the execution backend the models run on."""
+    return {
+        "backend": DEFAULT_SETTINGS["generator_backend"],
+        "execution": get_execution_backend().as_dict(),
+        "model_id": DEFAULT_SETTINGS["model_id"],
+    }
+
 
 @router.get("/presets")
 def get_presets():
@@ -19,12 +47,20 @@ def get_presets():
     return {
         "presets": presets,
         "upscaler_models": {
-            name: {"scale": m["scale"], "description": m["description"]}
-            for name, m in UPSCALER_MODELS.items()
+            AUTO_UPSCALE_MODEL: {
+                "scale": None,
+                "description": "Cheapest model chain for the target (Lanczos when close)",
+            },
+            **{
+                name: {"scale": m["scale"], "description": m["description"]}
+                for name, m in UPSCALER_MODELS.items()
+            },
         },
+        "profiles": {name: p.as_dict() for name, p in PROFILES.items()},
+        "schedulers": list(SCHEDULERS),
         "default_settings": {
             k: v for k, v in DEFAULT_SETTINGS.items()
-            if k not in ("model_id", "use_fp16", "enable_attention_slicing", "base_size")
+            if k not in _INTERNAL_SETTINGS
         },
     }
 
@@ -39,3 +75,22 @@ def validate(w: int = Query(...), h: int = Query(...)) -> ValidationResponse:
 def base_resolution(w: int = Query(...), h: int = Query(...)):
     base_w, base_h = calculate_base_resolution(w, h)
     return {"base_width": base_w, "base_height": base_h}
+
+
+@router.get("/stats")
+def cache_stats():
+    """Hit/miss counters of the server-side model and prompt embedding caches.
+
+    With worker processes the model cache shown is the server's own; each
+    worker's resident models are listed under "workers".
+    """
+    manager = get_model_manager()
+    return {
+        "model_cache": {
+            **manager.stats.as_dict(),
+            "resident_bytes": manager.resident_bytes,
+            "loaded": [f"{kind}:{name}" for kind, name in manager.loaded_models()],
+        },
+        "embedding_cache": get_embedding_cache().stats(),
+        "workers": get_job_service().worker.status(),
+    }
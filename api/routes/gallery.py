@@ -1,26 +1,36 @@
 import math
 from pathlib import Path
 
-from fastapi import APIRouter, Query, Response
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 from src.config.settings import OUTPUT_DIR
-from src.utils.file_utils import (
-    get_generation_history,
-    filter_history,
-    delete_output,
-    batch_export_zip,
-)
+from src.utils.derivatives import DERIVATIVE_FORMATS, DERIVATIVE_SIZES, ensure_derivative
+from src.utils.file_utils import delete_output, iter_export_zip, reconcile_gallery_index
+from src.utils.gallery_index import InvalidCursor, get_gallery_index
 from api.schemas import GalleryItem, GalleryResponse
 
 router = APIRouter()
 
 
+# Derivatives are content-addressed, so they can be cached indefinitely
+_DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _derivative_url(filename: str, kind: str, digest: str | None) -> str:
+    url = f"/api/gallery/{filename}/{kind}"
+    # Version the URL by content so browsers never reuse a stale derivative
+    return f"{url}?v={digest[:16]}" if digest else url
+
+
 def _to_gallery_item(entry: dict) -> GalleryItem:
     filename = entry["filename"]
+    digest = entry.get("content_hash")
     return GalleryItem(
         filename=filename,
         image_url=f"/images/{filename}",
+        thumbnail_url=_derivative_url(filename, "thumb", digest),
+        preview_url=_derivative_url(filename, "preview", digest),
         prompt=entry.get("prompt"),
         negative_prompt=entry.get("negative_prompt"),
         seed=entry.get("seed"),
@@ -31,6 +41,7 @@ def _to_gallery_item(entry: dict) -> GalleryItem:
         enable_upscaling=entry.get("enable_upscaling"),
         upscale_model=entry.get("upscale_model"),
         timestamp=entry.get("timestamp"),
+        snippet=entry.get("snippet"),
     )
 
 
@@ -40,31 +51,36 @@ def list_gallery(
     resolution: str = "",
     page: int = Query(1, ge=1),
     per_page: int = Query(9, ge=1, le=50),
+    cursor: str | None = None,
 ) -> GalleryResponse:
-    history = get_generation_history()
-    filtered = filter_history(history, search=search, resolution_filter=resolution)
-    total = len(filtered)
-    total_pages = max(1, math.ceil(total / per_page))
-    start = (page - 1) * per_page
-    page_items = filtered[start : start + per_page]
+    try:
+        result = get_gallery_index().query(
+            search=search,
+            resolution=resolution,
+            limit=per_page,
+            offset=(page - 1) * per_page,
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     return GalleryResponse(
-        items=[_to_gallery_item(e) for e in page_items],
-        total=total,
+        items=[_to_gallery_item(e) for e in result.entries],
+        total=result.total,
         page=page,
         per_page=per_page,
-        total_pages=total_pages,
+        total_pages=max(1, math.ceil(result.total / per_page)),
+        next_cursor=result.next_cursor,
     )
 
 
 @router.get("/resolutions")
 def list_resolutions():
-    history = get_generation_history()
-    resolutions = set()
-    for entry in history:
-        res = entry.get("target_resolution")
-        if res:
-            resolutions.add(f"{res[0]}x{res[1]}")
-    return sorted(resolutions)
+    return get_gallery_index().resolutions()
+
+
+@router.post("/reindex")
+def reindex(full: bool = False):
+    return reconcile_gallery_index(full=full)
 
 
 @router.delete("/{filename}")
@@ -76,13 +92,38 @@ def delete_image(filename: str):
     return Response(status_code=204)
 
 
+@router.get("/{filename}/{kind}")
+def get_derivative(
+    request: Request,
+    filename: str,
+    kind: str,
+    format: str = Query("webp"),
+):
+    if kind not in DERIVATIVE_SIZES or format not in DERIVATIVE_FORMATS:
+        return JSONResponse(status_code=404, content={"error": "Unknown derivative"})
+    image_path = OUTPUT_DIR / filename
+    if Path(filename).name != filename or not image_path.is_file():
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+
+    index = get_gallery_index()
+    digest = index.get_content_hash(filename)
+    path, computed = ensure_derivative(image_path, kind, format, digest=digest)
+    if digest is None:
+        index.set_content_hash(filename, computed)
+
+    etag = f'"{computed}-{kind}-{format}"'
+    headers = {"ETag": etag, "Cache-Control": _DERIVATIVE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=DERIVATIVE_FORMATS[format][2], headers=headers)
+
+
 @router.get("/export")
-def export_zip(filenames: str = Query(...)):
+def export_zip(filenames: str = Query(...), include_metadata: bool = False):
     names = [n.strip() for n in filenames.split(",") if n.strip()]
-    paths = [OUTPUT_DIR / name for name in names]
-    zip_bytes = batch_export_zip(paths)
-    return Response(
-        content=zip_bytes,
+    paths = [OUTPUT_DIR / name for name in names if Path(name).name == name]
+    return StreamingResponse(
+        iter_export_zip(paths, include_metadata=include_metadata),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=wallpapers.zip"},
     )
@@ -0,0 +1,217 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.config.presets import get_preset_by_name
+from src.config.settings import DEFAULT_SETTINGS
+from src.jobs import Job, JobStatus, get_job_service
+from src.jobs.events import TERMINAL_TYPES
+from src.utils.encoding import format_available
+from api.schemas import (
+    DraftGridRequest,
+    GenerateRequest,
+    JobInfo,
+    JobSubmitRequest,
+    MultiTargetRequest,
+    OutputOptions,
+    PromoteRequest,
+)
+
+router = APIRouter()
+
+
+def _to_job_info(job: Job) -> JobInfo:
+    return JobInfo(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status.value,
+        priority=job.priority,
+        position=get_job_service().position(job.id),
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error,
+    )
+
+
+async def stream_job_events(websocket: WebSocket, job_id: str) -> bool:
+    """Forward a job's events to a WebSocket until the job finishes.
+
+    Returns False if the client disconnected first.
+    """
+    service = get_job_service()
+    sub = service.subscribe(job_id)
+    try:
+        while True:
+            event = await sub.get()
+            await websocket.send_json(event)
+            if event["type"] in TERMINAL_TYPES:
+                return True
+    except WebSocketDisconnect:
+        # Client went away; the job keeps running and can be reattached
+        return False
+    finally:
+        service.unsubscribe(job_id, sub)
+
+
+_SSE_KEEPALIVE_SECONDS = 15.0
+
+
+async def _sse_events(job_id: str):
+    service = get_job_service()
+    sub = service.subscribe(job_id)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.get(), _SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if event["type"] in TERMINAL_TYPES:
+                return
+    finally:
+        service.unsubscribe(job_id, sub)
+
+
+def unsupported_format_error(request: OutputOptions) -> str | None:
+    """Error message if the requested output format cannot be encoded here."""
+    if request.output_format and not format_available(request.output_format):
+        return f"Output format not supported on this server: {request.output_format}"
+    return None
+
+
+def _unsupported_format(request: OutputOptions) -> JSONResponse | None:
+    if (error := unsupported_format_error(request)) is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    return None
+
+
+@router.post("/api/jobs", status_code=202)
+def submit_job(request: JobSubmitRequest):
+    if (error := _unsupported_format(request)) is not None:
+        return error
+    params = request.model_dump(exclude={"priority"})
+    job = get_job_service().submit("generate", params, priority=request.priority)
+    return _to_job_info(job)
+
+
+@router.post("/api/jobs/multi-target", status_code=202)
+def submit_multi_target_job(request: MultiTargetRequest):
+    unknown = [name for name in request.presets if get_preset_by_name(name) is None]
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unknown presets: {unknown}"})
+    if (error := _unsupported_format(request)) is not None:
+        return error
+    params = request.model_dump(exclude={"priority"})
+    job = get_job_service().submit("multi_target", params, priority=request.priority)
+    return _to_job_info(job)
+
+
+@router.post("/api/jobs/draft-grid", status_code=202)
+def submit_draft_grid_job(request: DraftGridRequest):
+    params = request.model_dump(exclude={"priority"})
+    job = get_job_service().submit("draft_grid", params, priority=request.priority)
+    return _to_job_info(job)
+
+
+@router.post("/api/jobs/{job_id}/promote", status_code=202)
+def promote_drafts(job_id: str, request: PromoteRequest) -> list[JobInfo]:
+    """Queue a full render of each chosen draft seed with the grid's prompt."""
+    service = get_job_service()
+    draft_job = service.get(job_id)
+    if draft_job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    if draft_job.kind != "draft_grid":
+        return JSONResponse(status_code=400, content={"error": "Only draft grid jobs can be promoted"})
+    if (error := _unsupported_format(request)) is not None:
+        return error
+    jobs = [
+        service.submit("generate", promoted_params(draft_job.params, request, seed), priority=request.priority)
+        for seed in request.seeds
+    ]
+    return [_to_job_info(job) for job in jobs]
+
+
+def promoted_params(grid: dict, request: PromoteRequest, seed: int) -> dict:
+    """``generate`` job parameters for the full render of one draft seed.
+
+    Prompt, guidance and scheduler come from the grid, so the composition
+    carries over; the request's profile only sets the step count. A
+    scheduler given explicitly in the request still wins.
+    """
+    overrides = request.model_dump(exclude={"seeds", "priority"}, exclude_none=True)
+    scheduler = overrides.pop("scheduler", None)
+    if "scheduler" not in request.model_fields_set:
+        # The grid ran with the scheduler setting when it named none
+        scheduler = grid.get("scheduler") or DEFAULT_SETTINGS["scheduler"]
+    return GenerateRequest(**{
+        "target_width": grid["target_width"],
+        "target_height": grid["target_height"],
+        **overrides,
+        "prompt": grid["prompt"],
+        "negative_prompt": grid.get("negative_prompt"),
+        "guidance_scale": grid["guidance_scale"],
+        "scheduler": scheduler,
+        "seed": seed,
+    }).model_dump()
+
+
+@router.get("/api/jobs")
+def list_jobs(
+    status: list[JobStatus] = Query(default=[JobStatus.QUEUED, JobStatus.RUNNING]),
+    limit: int = Query(100, ge=1, le=500),
+) -> list[JobInfo]:
+    return [_to_job_info(j) for j in get_job_service().store.list_jobs(status, limit=limit)]
+
+
+@router.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_service().get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return _to_job_info(job)
+
+
+@router.get("/api/jobs/{job_id}/position")
+def get_job_position(job_id: str):
+    service = get_job_service()
+    job = service.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return {"job_id": job_id, "status": job.status.value, "position": service.position(job_id)}
+
+
+@router.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str):
+    status = get_job_service().cancel(job_id)
+    if status is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return {"job_id": job_id, "status": status.value, "cancel_requested": status == JobStatus.RUNNING}
+
+
+@router.get("/api/jobs/{job_id}/events")
+def job_events(job_id: str):
+    """Follow a job's events as Server-Sent Events, ending with its terminal event."""
+    if get_job_service().get(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return StreamingResponse(
+        _sse_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/jobs/{job_id}")
+async def ws_job(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    if get_job_service().get(job_id) is None:
+        await websocket.send_json({"type": "error", "error": "Job not found"})
+        await websocket.close()
+        return
+    if await stream_job_events(websocket, job_id):
+        await websocket.close()
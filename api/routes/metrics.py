@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.generator.instrumentation import PROMETHEUS_CONTENT_TYPE, get_stage_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Per-stage timing and memory histograms in the Prometheus text format."""
+    return PlainTextResponse(get_stage_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,7 +1,61 @@
-from pydantic import BaseModel
+from typing import Annotated, Literal
 
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-class GenerateRequest(BaseModel):
+from src.config.profiles import SCHEDULERS, get_profile
+from src.config.settings import DEFAULT_SETTINGS
+
+OutputFormat = Literal["png", "webp", "jpeg", "avif"]
+
+# Client-chosen queue priority: enough to reorder a few jobs, not to jump
+# ahead of everything else (JobStore orders by priority before submission)
+MAX_PRIORITY = 10
+Priority = Annotated[int, Field(ge=-MAX_PRIORITY, le=MAX_PRIORITY)]
+
+
+class OutputOptions(BaseModel):
+    """Output encoding options; None fields fall back to the server settings."""
+    output_format: OutputFormat | None = None
+    output_quality: int | None = Field(None, ge=1, le=100)
+    png_compress_level: int | None = Field(None, ge=0, le=9)
+    output_lossless: bool | None = None
+    embed_metadata: bool | None = None
+
+
+class SchedulerOption(BaseModel):
+    scheduler: str | None = None
+
+    @field_validator("scheduler")
+    @classmethod
+    def _known_scheduler(cls, value: str | None) -> str | None:
+        if value is not None and value not in SCHEDULERS:
+            raise ValueError(f"Unknown scheduler: {value}. Choose from {sorted(SCHEDULERS)}")
+        return value
+
+
+class ProfileOptions(SchedulerOption):
+    """Speed/quality profile; its scheduler, steps and guidance apply unless set explicitly."""
+    profile: str | None = None
+
+    @model_validator(mode="after")
+    def _apply_profile(self):
+        name = self.profile or DEFAULT_SETTINGS["profile"]
+        if name is None:
+            return self
+        profile = get_profile(name)
+        if profile is None:
+            raise ValueError(f"Unknown profile: {name}")
+        explicit = set(self.model_fields_set)
+        self.profile = name
+        for field in ("scheduler", "num_inference_steps", "guidance_scale"):
+            if field in type(self).model_fields and field not in explicit:
+                setattr(self, field, getattr(profile, field))
+        # Assignment marks fields as set; keep model_fields_set to what the caller sent
+        self.__pydantic_fields_set__ = explicit
+        return self
+
+
+class GenerateRequest(OutputOptions, ProfileOptions):
     prompt: str
     target_width: int = 3840
     target_height: int = 2160
@@ -10,7 +64,67 @@ class GenerateRequest(BaseModel):
     guidance_scale: float = 7.5
     seed: int = -1
     enable_upscaling: bool = True
-    upscale_model: str = "RealESRGAN_x4plus"
+    upscale_model: str = "auto"
+    preview_every: int | None = Field(None, ge=0)
+    # Skip the result cache and render again even if an identical output exists
+    force_regenerate: bool = False
+
+
+class JobSubmitRequest(GenerateRequest):
+    priority: Priority = 0
+
+
+class MultiTargetRequest(OutputOptions, ProfileOptions):
+    prompt: str
+    presets: list[str] = Field(..., min_length=1)
+    negative_prompt: str | None = None
+    num_inference_steps: int = 30
+    guidance_scale: float = 7.5
+    seed: int = -1
+    enable_upscaling: bool = True
+    upscale_model: str = "auto"
+    preview_every: int | None = Field(None, ge=0)
+    priority: Priority = 0
+
+
+class DraftGridRequest(SchedulerOption):
+    """Cheap low-step renders of several seeds; None fields use the draft settings."""
+    prompt: str
+    target_width: int = 3840
+    target_height: int = 2160
+    negative_prompt: str | None = None
+    count: int | None = Field(None, ge=1, le=16)
+    seeds: list[int] | None = Field(None, min_length=1, max_length=16)
+    num_inference_steps: int | None = Field(None, ge=1, le=50)
+    guidance_scale: float = 7.5
+    base_size: int | None = Field(None, ge=256, le=1024)
+    priority: Priority = 0
+
+
+class PromoteRequest(OutputOptions, ProfileOptions):
+    """Full renders of seeds picked from a draft grid; prompt and aspect come from the grid."""
+    seeds: list[int] = Field(..., min_length=1)
+    target_width: int | None = None
+    target_height: int | None = None
+    num_inference_steps: int = 30
+    enable_upscaling: bool = True
+    upscale_model: str = "auto"
+    preview_every: int | None = Field(None, ge=0)
+    force_regenerate: bool = False
+    priority: Priority = 0
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+    position: int | None = None
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
 
 
 class GenerateProgress(BaseModel):
@@ -28,12 +142,15 @@ class GenerateComplete(BaseModel):
     seed_used: int | None = None
     base_resolution: list[int] | None = None
     target_resolution: list[int] | None = None
+    cached: bool = False
     error: str | None = None
 
 
 class GalleryItem(BaseModel):
     filename: str
     image_url: str
+    thumbnail_url: str | None = None
+    preview_url: str | None = None
     prompt: str | None = None
     negative_prompt: str | None = None
     seed: int | None = None
@@ -44,6 +161,7 @@ class GalleryItem(BaseModel):
     enable_upscaling: bool | None = None
     upscale_model: str | None = None
     timestamp: str | None = None
+    snippet: str | None = None
 
 
 class GalleryResponse(BaseModel):
@@ -52,6 +170,7 @@ class GalleryResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: str | None = None
 
 
 class ValidationResponse(BaseModel):
@@ -0,0 +1,81 @@
+"""Draft grid vs. K full renders, with the synthetic generator backend.
+
+The synthetic backend sleeps for a fixed per-step overhead plus a cost per
+megapixel of latents in the batch, and per output megapixel when
+upscaling. Both are calibrated with flags, so the ratio reflects the real
+step counts, base sizes and upscale work that a draft grid avoids.
+Checks that every draft is streamed once, that drafts keep their seeds, and
+that promoting a draft with a profile keeps the grid's scheduler.
+
+Usage:
+    python -m benchmarks.bench_drafts [--count 4] [--step-ms-per-mp 90] [--upscale-ms-per-mp 250]
+"""
+
+import argparse
+import time
+
+from api.routes.jobs import promoted_params
+from api.schemas import PromoteRequest
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends import SyntheticBackend, register_backend
+from src.generator.orchestrator import run_draft_grid, run_pipeline
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=4, help="Seeds per grid (K)")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--step-overhead-ms", type=float, default=15.0, help="Fixed cost per diffusion step")
+    parser.add_argument("--step-ms-per-mp", type=float, default=90.0, help="Step cost per latent megapixel")
+    parser.add_argument("--upscale-ms-per-mp", type=float, default=250.0, help="Upscale cost per output megapixel")
+    args = parser.parse_args()
+
+    register_backend("bench", lambda: SyntheticBackend(
+        step_ms=args.step_overhead_ms,
+        step_ms_per_mp=args.step_ms_per_mp,
+        upscale_ms_per_mp=args.upscale_ms_per_mp,
+        load_ms=0,
+    ))
+    DEFAULT_SETTINGS["generator_backend"] = "bench"
+    # Keep the base cache out of the comparison
+    DEFAULT_SETTINGS["base_cache_mb"] = 0
+
+    grid_params = {
+        "prompt": "benchmark prompt", "target_width": args.width, "target_height": args.height,
+        "guidance_scale": 7.5, "scheduler": "euler",
+    }
+    streamed = []
+    start = time.perf_counter()
+    grid = run_draft_grid(
+        "benchmark prompt", args.width, args.height, count=args.count, scheduler="euler",
+        on_draft=lambda index, seed, jpeg: streamed.append((index, seed)),
+    )
+    draft_seconds = time.perf_counter() - start
+    assert grid.error is None, grid.error
+    assert [s for _, s in streamed] == [d.seed for d in grid.drafts]
+    assert [i for i, _ in streamed] == list(range(args.count))
+
+    start = time.perf_counter()
+    for draft in grid.drafts:
+        # The profile brings its own scheduler; the promoted render must keep the grid's
+        promoted = promoted_params(grid_params, PromoteRequest(seeds=[draft.seed], profile="quality"), draft.seed)
+        assert promoted["scheduler"] == "euler", promoted["scheduler"]
+        result = run_pipeline(
+            "benchmark prompt", args.width, args.height, seed=draft.seed,
+            scheduler=promoted["scheduler"], save_output=False,
+        )
+        assert result.error is None, result.error
+        assert result.seed_used == draft.seed
+    full_seconds = time.perf_counter() - start
+
+    steps, full_steps = grid.num_inference_steps, DEFAULT_SETTINGS["num_inference_steps"]
+    base_w, base_h = grid.base_resolution
+    print(f"target {args.width}x{args.height}, K={args.count}")
+    print(f"draft grid:   {draft_seconds:7.2f}s  ({steps} steps at {base_w}x{base_h}, no upscaling)")
+    print(f"full renders: {full_seconds:7.2f}s  ({full_steps} steps + upscaling)")
+    print(f"speedup:      {full_seconds / draft_seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
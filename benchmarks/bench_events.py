@@ -0,0 +1,138 @@
+"""Stress the job event bus with a fake pipeline emitting 10k progress events.
+
+A publisher thread plays the worker: it emits --events progress events as
+fast as it can, interleaved with a few durable "saved" events, then a
+terminal "complete" event. Several subscribers with different delivery
+rates follow the job; one only starts reading once the whole job has been
+published, so its progress events are coalesced around the saved and
+complete events. The run fails (exit status 1) unless every subscriber
+sees every durable event, receives all events in publish order, receives
+the final progress value, and ends on the terminal event, with no
+coalesced progress event held back until after it.
+
+Usage:
+    python -m benchmarks.bench_events [--events 10000] [--subscribers 4]
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+from src.jobs.events import EventBus
+
+JOB_ID = "bench"
+
+
+def fake_pipeline(bus: EventBus, events: int, saves: int, started: threading.Event) -> None:
+    started.wait()
+    every = max(1, events // max(saves, 1))
+    seq = 0
+    for i in range(1, events + 1):
+        seq += 1
+        bus.publish(JOB_ID, {
+            "type": "progress", "job_id": JOB_ID, "stage": "generating", "seq": seq,
+            "progress": i / events, "message": f"Step {i}/{events}",
+        })
+        if i % every == 0 and i // every <= saves:
+            seq += 1
+            bus.publish(JOB_ID, {
+                "type": "progress", "job_id": JOB_ID, "stage": "saved", "seq": seq,
+                "progress": 1.0, "message": f"Saved {i // every}",
+            })
+    bus.publish(JOB_ID, {"type": "complete", "job_id": JOB_ID, "success": True, "seq": seq + 1})
+
+
+async def consume(
+    bus: EventBus, min_interval: float, consume_delay: float, published: asyncio.Event | None = None
+) -> dict:
+    sub = bus.subscribe(JOB_ID, min_interval=min_interval)
+    saved, last_progress, events = [], 0.0, []
+    try:
+        if published is not None:
+            await published.wait()
+        while True:
+            event = await sub.get()
+            events.append(event)
+            if event.get("stage") == "saved":
+                saved.append(event["message"])
+            elif event["type"] == "progress":
+                last_progress = event["progress"]
+            if event["type"] == "complete":
+                break
+            if consume_delay:
+                await asyncio.sleep(consume_delay)
+        # Nothing is published after the terminal event, so nothing may follow it;
+        # wait out one delivery interval in case a progress event was held back
+        try:
+            events.append(await asyncio.wait_for(sub.get(), min_interval + 0.05))
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        bus.unsubscribe(JOB_ID, sub)
+    terminal = next(i for i, event in enumerate(events) if event["type"] == "complete")
+    return {
+        "min_interval": min_interval, "delay": consume_delay, "backlog": published is not None,
+        "received": terminal + 1, "coalesced": sub.coalesced, "saved": saved, "last_progress": last_progress,
+        "ordered": all(a["seq"] < b["seq"] for a, b in zip(events, events[1:])),
+        # Progress published before the terminal event but delivered after it
+        "trailing": [event["seq"] for event in events[terminal + 1:]],
+    }
+
+
+async def run(events: int, subscribers: int, saves: int) -> bool:
+    bus = EventBus()
+    started = threading.Event()
+    published = asyncio.Event()
+    profiles = [(0.0, 0.0, None), (0.05, 0.0, None), (0.0, 0.002, None), (0.05, 0.0, published)]
+    consumers = [
+        asyncio.create_task(consume(bus, *profiles[i % len(profiles)])) for i in range(subscribers)
+    ]
+    await asyncio.sleep(0)  # let every consumer subscribe
+    publisher = threading.Thread(target=fake_pipeline, args=(bus, events, saves, started))
+    start = time.perf_counter()
+    publisher.start()
+    started.set()
+    await asyncio.to_thread(publisher.join)
+    elapsed = time.perf_counter() - start
+    published.set()
+    results = await asyncio.gather(*consumers)
+
+    expected_saved = [f"Saved {i}" for i in range(1, saves + 1)]
+    ok = True
+    print(f"{events:,} progress + {saves} saved events in {elapsed * 1000:.1f} ms "
+          f"({events / elapsed:,.0f} events/s)\n")
+    print(f"{'interval':>9}{'delay':>7}{'backlog':>9}{'received':>10}{'coalesced':>11}{'last':>7}  checks")
+    for r in results:
+        checks = []
+        if r["saved"] != expected_saved:
+            checks.append("durable events lost or reordered")
+        if not r["ordered"]:
+            checks.append("events delivered out of publish order")
+        if r["last_progress"] != 1.0:
+            checks.append("final progress missing")
+        if r["trailing"]:
+            checks.append(f"progress delivered after the terminal event: seq {r['trailing']}")
+        ok &= not checks
+        backlog = "yes" if r["backlog"] else "no"
+        print(f"{r['min_interval']:>9.3f}{r['delay']:>7.3f}{backlog:>9}{r['received']:>10,}{r['coalesced']:>11,}"
+              f"{r['last_progress']:>7.2f}  {'; '.join(checks) or 'ok'}")
+    if bus.subscriber_count(JOB_ID):
+        print("subscribers leaked")
+        ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--subscribers", type=int, default=4)
+    parser.add_argument("--saves", type=int, default=5)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.events, args.subscribers, args.saves))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
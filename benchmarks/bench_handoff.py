@@ -0,0 +1,157 @@
+"""Full-frame copies and peak memory of the decode -> upscale -> encode hand-off.
+
+"legacy" and "buffer" start from a float RGB tensor standing in for the VAE
+output at a quarter of the target size, and end with the PIL image the
+encoder receives. "legacy" is the PIL-to-PIL path the pipeline used before
+``ImageBuffer``: decode to PIL, copy into a tensor, upscale, copy back out
+through bytes. "buffer" is the current path (``upscale_buffer`` then one
+``pil()``). A nearest-neighbour x4 "network" keeps the tiler cheap, so the
+conversions dominate.
+
+"job" is a whole ``run_pipeline`` call with the synthetic backend, counted
+until the file is saved: the pickle to the encoder process, the gallery
+derivatives and any final Lanczos resize are all on that path.
+
+Each variant runs in its own process and reports its peak RSS above the
+post-setup baseline. The default target is 8K (7680x4320); the buffer path
+must stay within --max-copies full-frame copies and a job within
+--max-job-copies.
+
+Usage:
+    python -m benchmarks.bench_handoff [--width 7680] [--height 4320] [--max-copies 2] [--max-job-copies 1]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.instrumentation import current_rss
+from src.generator.tiling import TileConfig, TiledUpscaler
+from src.utils.encoding import shutdown_image_saver
+from src.utils.file_utils import delete_output
+from src.utils.image_buffer import CopyStats, ImageBuffer, count_copies
+
+VARIANTS = ("legacy", "buffer", "job")
+
+
+def _engine() -> TiledUpscaler:
+    return TiledUpscaler(
+        torch.nn.Upsample(scale_factor=4, mode="nearest"), 4,
+        config=TileConfig(tile=512, overlap=16, batch_size=4), num_feat=16,
+    )
+
+
+def _legacy(engine: TiledUpscaler, decoded: torch.Tensor) -> Image.Image:
+    # diffusers' numpy_to_pil, then the old TiledUpscaler.upscale
+    array = (decoded[0].permute(1, 2, 0) * 255).round().to(torch.uint8).numpy()
+    base = Image.fromarray(array)
+    tensor = torch.frombuffer(bytearray(base.tobytes()), dtype=torch.uint8)
+    tensor = tensor.view(base.size[1], base.size[0], 3).permute(2, 0, 1)[None].float() / 255
+    out = engine.upscale_tensor(tensor)
+    out = (out[0] * 255).round_().to(torch.uint8).permute(1, 2, 0).contiguous()
+    return Image.frombytes("RGB", (out.shape[1], out.shape[0]), out.numpy().tobytes())
+
+
+def _buffer(engine: TiledUpscaler, decoded: torch.Tensor) -> Image.Image:
+    return engine.upscale_buffer(ImageBuffer.from_tensor(decoded)).pil()
+
+
+def _job(width: int, height: int) -> tuple[tuple[int, int], float, int, CopyStats]:
+    from src.generator.orchestrator import run_pipeline
+
+    DEFAULT_SETTINGS["generator_backend"] = "synthetic"
+    DEFAULT_SETTINGS["synthetic_step_ms"] = 0
+    DEFAULT_SETTINGS["synthetic_upscale_ms_per_mp"] = 0
+    # Keep the base cache's own PNG write out of the count
+    DEFAULT_SETTINGS["base_cache_mb"] = 0
+    baseline = current_rss() or 0
+    start = time.perf_counter()
+    with count_copies() as copies:
+        result = run_pipeline("handoff benchmark", width, height, num_inference_steps=1)
+        # Derivatives are built on the saver's thread, in this context
+        path = result.wait_saved()
+    seconds = time.perf_counter() - start
+    assert result.error is None, result.error
+    size = result.upscaled_image.size
+    delete_output(Path(path))
+    shutdown_image_saver()
+    return size, seconds, baseline, copies
+
+
+def _child(variant: str, width: int, height: int) -> None:
+    if variant == "job":
+        size, seconds, baseline, copies = _job(width, height)
+    else:
+        engine = _engine()
+        decoded = torch.rand(1, 3, height // 4, width // 4)
+        baseline = current_rss() or 0
+        start = time.perf_counter()
+        with count_copies() as copies:
+            size = (_legacy if variant == "legacy" else _buffer)(engine, decoded).size
+        seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    print(json.dumps({
+        "variant": variant,
+        "size": list(size),
+        "seconds": seconds,
+        "peak_bytes": peak - baseline,
+        # Only ImageBuffer conversions are counted; the legacy path makes none
+        "copies": copies.copies,
+        "copied_bytes": copies.bytes,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=7680, help="Target width")
+    parser.add_argument("--height", type=int, default=4320, help="Target height")
+    parser.add_argument("--max-copies", type=int, default=2, help="Allowed copies on the buffer path")
+    parser.add_argument("--max-job-copies", type=int, default=1, help="Allowed copies in a whole job")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        _child(args.variant, args.width, args.height)
+        return
+
+    results = {}
+    for variant in VARIANTS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_handoff", "--variant", variant,
+             "--width", str(args.width), "--height", str(args.height)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[variant] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{args.width // 4}x{args.height // 4} -> {args.width}x{args.height}\n")
+    print(f"{'variant':>8}{'seconds':>10}{'peak MiB':>10}{'copies':>8}{'copied MiB':>12}")
+    for variant, r in results.items():
+        counted = variant != "legacy"
+        print(f"{variant:>8}{r['seconds']:>10.2f}{r['peak_bytes'] / 2**20:>10.0f}"
+              f"{r['copies'] if counted else '-':>8}"
+              f"{r['copied_bytes'] / 2**20 if counted else 0:>12.0f}")
+    saved = results["legacy"]["peak_bytes"] - results["buffer"]["peak_bytes"]
+    print(f"\nPeak memory saved by the buffer path: {saved / 2**20:.0f} MiB")
+
+    errors = []
+    for variant, limit in (("buffer", args.max_copies), ("job", args.max_job_copies)):
+        copies = results[variant]["copies"]
+        if results[variant]["size"] != [args.width, args.height]:
+            errors.append(f"{variant} produced {results[variant]['size']}")
+        if copies > limit:
+            errors.append(f"{variant} made {copies} full-frame copies (max {limit})")
+    if errors:
+        sys.exit("; ".join(errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Check ModelManager's loads, evictions and locking with stub loaders.
+
+Stub models have fixed sizes and count their loads and unloads, so each
+scenario can assert ``stats.loads`` / ``stats.evictions`` exactly: the
+memory budget, LRU order, models in use, low-memory mode. A slow stub
+loader then checks that a load does not hold the cache lock (lookups and
+other models' get/release stay fast) and that concurrent gets of the
+model being loaded share one load. Exits with status 1 if a check fails.
+
+Usage:
+    python -m benchmarks.bench_model_manager [--load-ms 300]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from src.generator.model_manager import ModelManager
+
+_GB = 1024**3
+_SIZES = {"sdxl": 7 * _GB, "other-sdxl": 7 * _GB, "x2": 1 * _GB, "x4": 1 * _GB, "x8": 1 * _GB}
+
+
+def _manager(budget_gb: float | None, low_memory: bool = False, load_seconds: float = 0.0) -> ModelManager:
+    manager = ModelManager(budget_bytes=int(budget_gb * _GB) if budget_gb else None, low_memory=low_memory)
+
+    def load(name):
+        time.sleep(load_seconds if name == "sdxl" else 0)
+        return name
+
+    for kind in ("sdxl", "upscaler"):
+        manager.register(kind, load=load, unload=lambda model: None, estimate_size=lambda model: _SIZES[model])
+    return manager
+
+
+def _use(manager: ModelManager, kind: str, name: str) -> None:
+    manager.get(kind, name)
+    manager.release(kind, name)
+
+
+def _keys(counts: dict) -> dict[str, int]:
+    return {f"{kind}:{name}": n for (kind, name), n in counts.items()}
+
+
+def check_budget() -> dict:
+    manager = _manager(budget_gb=8)
+    _use(manager, "sdxl", "sdxl")
+    _use(manager, "upscaler", "x4")
+    # 7 + 1 fits; a second SDXL does not, so the idle first one goes before it loads
+    _use(manager, "sdxl", "other-sdxl")
+    assert _keys(manager.stats.loads) == {"sdxl:sdxl": 1, "upscaler:x4": 1, "sdxl:other-sdxl": 1}
+    assert _keys(manager.stats.evictions) == {"sdxl:sdxl": 1}
+    assert manager.resident_bytes <= manager.budget_bytes
+    return manager.stats.as_dict()
+
+
+def check_lru() -> dict:
+    manager = _manager(budget_gb=2)
+    _use(manager, "upscaler", "x2")
+    _use(manager, "upscaler", "x4")
+    _use(manager, "upscaler", "x2")  # Hit; x4 is now the least recently used
+    _use(manager, "upscaler", "x8")
+    assert manager.stats.hits == 1 and manager.stats.misses == 3
+    assert _keys(manager.stats.evictions) == {"upscaler:x4": 1}
+    assert manager.loaded_models() == [("upscaler", "x2"), ("upscaler", "x8")]
+    return manager.stats.as_dict()
+
+
+def check_in_use() -> dict:
+    manager = _manager(budget_gb=8)
+    manager.get("sdxl", "sdxl")
+    # Over budget, but a model in use is never evicted
+    _use(manager, "sdxl", "other-sdxl")
+    assert manager.stats.evictions == {}
+    assert manager.is_loaded("sdxl", "sdxl")
+    manager.release("sdxl", "sdxl")
+    return manager.stats.as_dict()
+
+
+def check_low_memory() -> dict:
+    manager = _manager(budget_gb=None, low_memory=True)
+    for _ in range(2):
+        _use(manager, "sdxl", "sdxl")
+        _use(manager, "upscaler", "x4")
+    assert _keys(manager.stats.loads) == {"sdxl:sdxl": 2, "upscaler:x4": 2}
+    assert _keys(manager.stats.evictions) == {"sdxl:sdxl": 2, "upscaler:x4": 2}
+    assert manager.loaded_models() == []
+    return manager.stats.as_dict()
+
+
+def check_concurrent_load(load_seconds: float) -> dict:
+    manager = _manager(budget_gb=None, load_seconds=load_seconds)
+    _use(manager, "upscaler", "x4")
+    loaders = [threading.Thread(target=_use, args=(manager, "sdxl", "sdxl")) for _ in range(2)]
+    for thread in loaders:
+        thread.start()
+    time.sleep(load_seconds / 10)
+
+    # While SDXL loads: lookups and a resident model's get/release must not wait for it
+    start = time.perf_counter()
+    manager.is_loaded("sdxl", "sdxl")
+    manager.loaded_models()
+    _use(manager, "upscaler", "x4")
+    blocked = time.perf_counter() - start
+    for thread in loaders:
+        thread.join()
+    assert blocked < load_seconds / 4, f"lookups waited {blocked * 1000:.0f} ms for a load"
+    # Both SDXL gets share one load
+    assert _keys(manager.stats.loads) == {"upscaler:x4": 1, "sdxl:sdxl": 1}
+    return {**manager.stats.as_dict(), "blocked_ms": round(blocked * 1000, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--load-ms", type=float, default=300.0, help="Stub SDXL load time")
+    args = parser.parse_args()
+
+    checks = [
+        ("budget", check_budget),
+        ("lru", check_lru),
+        ("in use", check_in_use),
+        ("low memory", check_low_memory),
+        ("concurrent load", lambda: check_concurrent_load(args.load_ms / 1000)),
+    ]
+    failed = 0
+    for name, check in checks:
+        try:
+            result = check()
+        except AssertionError as e:
+            failed += 1
+            print(f"{name:<16} FAILED {e}")
+        else:
+            print(f"{name:<16} ok  {result}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
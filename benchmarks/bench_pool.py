@@ -0,0 +1,122 @@
+"""Throughput and crash recovery of the worker-process pool, on CPU only.
+
+Runs --jobs synthetic ``generate`` jobs through a WorkerPool of one CPU
+worker, then of --workers, then of --workers again while one worker is
+killed mid-run. Every job must still finish in the last run: the killed
+worker is respawned and its jobs requeued. Jobs alternate between the x2
+and x4 upscalers, so the final model lists show the affinity scheduling.
+Exits with status 1 if any job failed.
+
+Usage:
+    python -m benchmarks.bench_pool [--workers 2] [--jobs 24] [--step-ms 20] [--cleanup]
+"""
+
+import argparse
+import sys
+import time
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.jobs import JobStatus, JobStore, WorkerPool
+from src.jobs.events import EventBus
+from src.jobs.worker import batch_key_for
+from src.utils import file_utils
+
+_MODELS = ("RealESRGAN_x2plus", "RealESRGAN_x4plus")
+
+
+def _params(i: int, args: argparse.Namespace) -> dict:
+    return {
+        "prompt": f"pool benchmark {i}",
+        "target_width": args.width,
+        "target_height": args.height,
+        "num_inference_steps": args.steps,
+        "seed": -1,  # Random, so the base-image cache stays out of the way
+        "upscale_model": _MODELS[i % len(_MODELS)],
+        "output_format": "jpeg",
+    }
+
+
+def _wait(condition, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("worker pool did not get there in time")
+        time.sleep(0.05)
+
+
+def run(workers: int, args: argparse.Namespace, kill: bool = False) -> dict:
+    store = JobStore(":memory:")
+    pool = WorkerPool(store, EventBus(), devices=["cpu"] * workers, poll_interval=0.1)
+    pool.start()
+    try:
+        _wait(lambda: all(w["ready"] for w in pool.status()), timeout=180)
+        start = time.perf_counter()
+        jobs = []
+        for i in range(args.jobs):
+            params = _params(i, args)
+            jobs.append(store.submit("generate", params, batch_key=batch_key_for("generate", params)))
+        pool.notify()
+        if kill:
+            _wait(lambda: pool.status()[0]["jobs"], timeout=60)
+            pool.workers[0].process.kill()
+        _wait(lambda: all(store.get(j.id).status.is_terminal for j in jobs), timeout=600)
+        elapsed = time.perf_counter() - start
+        status = pool.status()
+    finally:
+        pool.stop(timeout=30)
+
+    finished = [store.get(j.id) for j in jobs]
+    failed = [j for j in finished if j.status != JobStatus.COMPLETE]
+    if args.cleanup:
+        for job in finished:
+            if job.result and job.result.get("filename"):
+                file_utils.delete_output(file_utils.OUTPUT_DIR / job.result["filename"])
+    return {
+        "seconds": elapsed,
+        "failed": failed,
+        "restarts": sum(w["restarts"] for w in status),
+        "models": [w["models"] for w in status],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2, help="CPU worker processes")
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--step-ms", type=float, default=20.0, help="Synthetic backend: ms per diffusion step")
+    parser.add_argument("--load-ms", type=float, default=200.0, help="Synthetic backend: ms per model load")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the generated images afterwards")
+    args = parser.parse_args()
+
+    # Copied into every worker process when it starts
+    DEFAULT_SETTINGS["generator_backend"] = "synthetic"
+    DEFAULT_SETTINGS["synthetic_step_ms"] = args.step_ms
+    DEFAULT_SETTINGS["synthetic_load_ms"] = args.load_ms
+    DEFAULT_SETTINGS["worker_heartbeat_seconds"] = 0.5
+
+    runs = [
+        ("1 worker", run(1, args)),
+        (f"{args.workers} workers", run(args.workers, args)),
+        (f"{args.workers} workers, 1 killed", run(args.workers, args, kill=True)),
+    ]
+
+    print(f"{args.jobs} jobs at {args.width}x{args.height}, {args.steps} steps of {args.step_ms:g} ms\n")
+    print(f"{'run':<24}{'seconds':>9}{'jobs/s':>9}{'failed':>8}{'restarts':>10}")
+    for name, r in runs:
+        print(f"{name:<24}{r['seconds']:>9.2f}{args.jobs / r['seconds']:>9.2f}"
+              f"{len(r['failed']):>8}{r['restarts']:>10}")
+    print("\nResident models per worker after the last run:")
+    for index, models in enumerate(runs[-1][1]["models"]):
+        print(f"  worker {index}: {', '.join(models) or '-'}")
+
+    failed = [j for _, r in runs for j in r["failed"]]
+    for job in failed[:5]:
+        print(f"  failed: {job.id} {job.status.value}: {job.error}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Latent preview cost on CPU with synthetic SDXL latents.
+
+Decodes random latents shaped like each base resolution, checks the output
+shapes, and reports how many milliseconds one preview costs and how often
+the adaptive throttle would emit one for a given step time.
+
+Usage:
+    python -m benchmarks.bench_previews [--step-ms 100] [--every 1]
+"""
+
+import argparse
+import time
+
+import torch
+
+from src.config.presets import calculate_base_resolution
+from src.generator.previews import PreviewThrottle, latents_to_jpegs, latents_to_rgb
+
+TARGETS = [(1920, 1080), (3840, 2160), (1290, 2796), (2732, 2048), (5120, 1440)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--step-ms", type=float, default=100.0, help="Simulated diffusion step time")
+    parser.add_argument("--every", type=int, default=1, help="Requested preview interval (steps)")
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    print(f"{'target':>11}{'latent':>10}{'ms/preview':>12}{'jpeg KB':>9}{'previews':>10}{'cost':>8}")
+    for width, height in TARGETS:
+        base_w, base_h = calculate_base_resolution(width, height)
+        latents = torch.randn(args.batch, 4, base_h // 8, base_w // 8)
+
+        rgb = latents_to_rgb(latents)
+        assert rgb.shape == (args.batch, base_h // 8, base_w // 8, 3) and rgb.dtype == torch.uint8
+
+        start = time.perf_counter()
+        frames = latents_to_jpegs(latents)
+        preview_ms = (time.perf_counter() - start) * 1000
+
+        # Replay a generation with a fixed step time through the throttle
+        throttle = PreviewThrottle(args.every)
+        spent = 0.0
+        for step in range(args.steps):
+            time.sleep(args.step_ms / 1000)
+            if throttle.should_preview(step):
+                t = time.perf_counter()
+                latents_to_jpegs(latents)
+                cost = time.perf_counter() - t
+                spent += cost
+                throttle.record(step, cost)
+        share = spent / (args.steps * args.step_ms / 1000)
+        print(f"{width}x{height:<6}{f'{base_w // 8}x{base_h // 8}':>10}{preview_ms:>12.2f}"
+              f"{len(frames[0]) / 1024:>9.1f}{throttle.emitted:>10}{share:>8.2%}")
+
+
+if __name__ == "__main__":
+    main()
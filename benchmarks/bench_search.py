@@ -0,0 +1,84 @@
+"""Compare gallery prompt search: linear filter_history scan vs the FTS5 index.
+
+Usage:
+    python -m benchmarks.bench_search [--entries 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.utils.file_utils import filter_history
+from src.utils.gallery_index import GalleryIndex
+
+_SUBJECTS = ["mountain", "lake", "forest", "city", "desert", "ocean", "galaxy", "canyon", "glacier", "meadow"]
+_STYLES = ["at sunset", "at night", "in fog", "neon", "watercolor", "minimalist", "cinematic", "pastel"]
+_DETAILS = ["reflections", "aurora", "cherry blossoms", "snow", "lightning", "stars", "clouds", "waves"]
+_RESOLUTIONS = [[1920, 1080], [2560, 1440], [3840, 2160], [1290, 2796], [2732, 2048]]
+
+QUERIES = ["mountain", "neon city", "aur", "glacier snow stars", "nonexistent"]
+
+
+def synthetic_history(count: int, seed: int = 0) -> list[dict]:
+    """Build a history list shaped like get_generation_history() output."""
+    rng = random.Random(seed)
+    history = []
+    for i in range(count):
+        prompt = (
+            f"{rng.choice(_STYLES)} {rng.choice(_SUBJECTS)} with "
+            f"{rng.choice(_DETAILS)} and {rng.choice(_DETAILS)}"
+        )
+        res = rng.choice(_RESOLUTIONS)
+        history.append({
+            "filename": f"{i:08d}_{prompt.replace(' ', '_')[:50]}_{res[0]}x{res[1]}.png",
+            "prompt": prompt,
+            "negative_prompt": "blurry, low quality",
+            "target_resolution": res,
+            "mtime": 1_700_000_000 + i,
+        })
+    return history
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--per-page", type=int, default=15)
+    args = parser.parse_args()
+
+    history = synthetic_history(args.entries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = GalleryIndex(Path(tmp) / "bench.sqlite3", output_dir=Path(tmp))
+        start = time.perf_counter()
+        index.upsert_many((e["filename"], e, e["mtime"], None) for e in history)
+        print(f"Indexed {args.entries:,} entries in {time.perf_counter() - start:.2f}s "
+              f"(fts5={'on' if index.fts_enabled else 'off'})\n")
+
+        print(f"{'query':<22}{'scan hits':>10}{'fts hits':>10}{'scan ms':>10}{'fts ms':>10}{'speedup':>9}")
+        for query in QUERIES:
+            scan_hits = len(filter_history(history, search=query))
+            fts_hits = index.query(search=query, limit=1).total
+            scan = _time(lambda: filter_history(history, search=query)[:args.per_page], args.repeat)
+            fts = _time(lambda: index.query(search=query, limit=args.per_page), args.repeat)
+            print(f"{query:<22}{scan_hits:>10,}{fts_hits:>10,}{scan * 1000:>10.2f}"
+                  f"{fts * 1000:>10.2f}{scan / fts:>8.1f}x")
+        print("\nThe scan matches one substring; FTS matches every token as a prefix and ranks"
+              " the hits.\nScan times exclude reading the sidecars, which the old gallery"
+              " route also did on every request.")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
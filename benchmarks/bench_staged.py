@@ -0,0 +1,101 @@
+"""Staged (pipelined) execution vs. back-to-back runs, with the synthetic backend.
+
+Runs --jobs generations one after another through run_batch_pipeline, then
+through a StagedPipeline, where upscaling and encoding of one job overlap
+diffusion of the next. Diffusion and upscaling are simulated (sleeps
+calibrated with flags), encoding is real. Both runs end when the last file
+is on disk. Checks that every job succeeded and that each job's progress
+events arrived in the same stage order in both runs.
+
+Usage:
+    python -m benchmarks.bench_staged [--jobs 20] [--step-ms 40] [--upscale-ms-per-mp 60] [--cleanup]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends import SyntheticBackend, register_backend
+from src.generator.orchestrator import (
+    GenerationRequest,
+    PipelineResult,
+    PipelineStage,
+    ProgressCallback,
+    run_batch_pipeline,
+)
+from src.generator.staged import StagedPipeline
+from src.utils.file_utils import delete_output
+
+
+def _recorder(log: list[str]) -> ProgressCallback:
+    def on_progress(stage: PipelineStage, frac: float, msg: str) -> None:
+        # SAVED comes from the encoder whenever the file lands, so its position varies
+        if stage != PipelineStage.SAVED and (not log or log[-1] != stage.value):
+            log.append(stage.value)
+    return on_progress
+
+
+def _run(requests: list[GenerationRequest], staged: StagedPipeline | None) -> tuple[float, list, list]:
+    logs: list[list[str]] = [[] for _ in requests]
+    start = time.perf_counter()
+    results: list[PipelineResult] = []
+    if staged is None:
+        for request, log in zip(requests, logs):
+            results += run_batch_pipeline([request], on_progress=[_recorder(log)])
+    else:
+        futures = [staged.submit([r], on_progress=[_recorder(log)]) for r, log in zip(requests, logs)]
+        results = [result for future in futures for result in future.result()]
+    for result in results:
+        result.wait_saved()
+    return time.perf_counter() - start, results, logs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--step-ms", type=float, default=40.0, help="Simulated cost per diffusion step")
+    parser.add_argument("--upscale-ms-per-mp", type=float, default=60.0, help="Simulated upscale cost per output MP")
+    parser.add_argument("--queue-size", type=int, default=1, help="Diffused batches waiting for the upscaler")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the generated images afterwards")
+    args = parser.parse_args()
+
+    register_backend("bench", lambda: SyntheticBackend(
+        step_ms=args.step_ms, step_ms_per_mp=0, upscale_ms_per_mp=args.upscale_ms_per_mp, load_ms=0,
+    ))
+    DEFAULT_SETTINGS["generator_backend"] = "bench"
+    # Keep the base cache out of the comparison
+    DEFAULT_SETTINGS["base_cache_mb"] = 0
+
+    requests = [
+        GenerationRequest(f"staged benchmark {i}", args.width, args.height, num_inference_steps=args.steps)
+        for i in range(args.jobs)
+    ]
+    sequential_seconds, sequential, sequential_logs = _run(requests, None)
+    staged = StagedPipeline(queue_size=args.queue_size)
+    try:
+        staged_seconds, pipelined, staged_logs = _run(requests, staged)
+    finally:
+        staged.stop()
+
+    failed = [r.error for r in sequential + pipelined if r.error is not None]
+    assert not failed, failed[0]
+    assert staged_logs == sequential_logs, "progress events arrived out of order"
+
+    print(f"{args.jobs} jobs at {args.width}x{args.height}, {args.steps} steps of {args.step_ms:g} ms, "
+          f"upscale {args.upscale_ms_per_mp:g} ms/MP\n")
+    print(f"{'':<12}{'seconds':>9}{'jobs/s':>9}")
+    for name, seconds in (("sequential", sequential_seconds), ("staged", staged_seconds)):
+        print(f"{name:<12}{seconds:>9.2f}{args.jobs / seconds:>9.2f}")
+    print(f"\nSpeedup: {sequential_seconds / staged_seconds:.2f}x")
+
+    if args.cleanup:
+        for result in sequential + pipelined:
+            delete_output(Path(result.output_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Time saved by right-sized upscaling, for every DEVICE_PRESETS entry.
+
+"Old" always runs the 4x model and Lanczos-resizes the 16x-pixel result down
+to the target; "new" runs the chain from plan_upscale_models("auto", ...).
+Both use small random RRDBNets on CPU, with base sizes scaled down by
+--base-size / 1024 so the run stays short; the ratio is what matters.
+
+Usage:
+    python -m benchmarks.bench_upscale_plan [--base-size 256]
+"""
+
+import argparse
+import time
+
+import torch
+from basicsr.archs.rrdbnet_arch import RRDBNet
+from PIL import Image
+
+from src.config.presets import calculate_base_resolution, get_all_presets
+from src.generator.tiling import TileConfig, TiledUpscaler
+from src.generator.upscaler import UPSCALER_MODELS, plan_upscale_models, upscale_image
+
+
+def _engines() -> dict[str, TiledUpscaler]:
+    torch.manual_seed(0)
+    engines = {}
+    for name, info in UPSCALER_MODELS.items():
+        model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=16, num_block=1, num_grow_ch=8,
+                        scale=info["scale"])
+        engines[name] = TiledUpscaler(
+            model, info["scale"], config=TileConfig(tile=128, overlap=8, batch_size=4), num_feat=16
+        )
+    return engines
+
+
+def _run_chain(engines: dict, models: list[str], image: Image.Image, width: int, height: int) -> float:
+    start = time.perf_counter()
+    for i, name in enumerate(models):
+        engine = engines[name]
+        last = i == len(models) - 1
+        size = (width, height) if last else (image.width * engine.scale, image.height * engine.scale)
+        image = upscale_image(engine, image, *size)
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.LANCZOS)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-size", type=int, default=256)
+    args = parser.parse_args()
+
+    engines = _engines()
+    shrink = args.base_size / 1024
+    print(f"{'preset':<26}{'base':>10}{'chain':>26}{'old px':>9}{'new px':>9}"
+          f"{'old s':>8}{'new s':>8}{'saved':>8}")
+    total_old = total_new = 0.0
+    for preset in get_all_presets():
+        base_w, base_h = calculate_base_resolution(preset.width, preset.height)
+        models = plan_upscale_models("auto", base_w, base_h, preset.width, preset.height)
+
+        # Scaled-down stand-ins, rounded to the network's size multiple
+        bw, bh = max(8, round(base_w * shrink) // 4 * 4), max(8, round(base_h * shrink) // 4 * 4)
+        tw, th = round(preset.width * shrink), round(preset.height * shrink)
+        image = Image.new("RGB", (bw, bh), (90, 120, 160))
+
+        old = _run_chain(engines, ["RealESRGAN_x4plus"], image, tw, th)
+        new = _run_chain(engines, models, image, tw, th)
+        total_old += old
+        total_new += new
+
+        factor = 1
+        for name in models:
+            factor *= UPSCALER_MODELS[name]["scale"]
+        chain = "+".join(m.replace("RealESRGAN_", "") for m in models) or "lanczos"
+        print(f"{preset.name:<26}{f'{base_w}x{base_h}':>10}{chain:>26}"
+              f"{16:>8}x{factor * factor:>8}x{old:>8.2f}{new:>8.2f}{1 - new / old:>8.0%}")
+    print(f"\nTotal: old {total_old:.2f}s, new {total_new:.2f}s "
+          f"({1 - total_new / total_old:.0%} saved). Pixel columns are intermediate size vs base.")
+
+
+if __name__ == "__main__":
+    main()
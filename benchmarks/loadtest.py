@@ -0,0 +1,180 @@
+"""Load-test the API with hundreds of concurrent clients and no GPU.
+
+Without --url the app is started in-process on a free port with the
+synthetic generator backend, so the whole serving path runs for real:
+WebSocket submission, the job queue and worker, event fan-out, encoding,
+derivatives and the gallery index. Each client opens /ws/generate with a
+unique prompt and seed, follows the job to its terminal event, then lists
+the gallery. Reports latency percentiles and throughput per phase, and the
+model cache stats from /api/config/stats. Exits with status 1 if any job or
+the stats request failed.
+
+Usage:
+    python -m benchmarks.loadtest [--clients 200] [--step-ms 20] [--cleanup]
+    python -m benchmarks.loadtest --url http://localhost:8000 --clients 50
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+import websockets
+
+from src.config.settings import DEFAULT_SETTINGS
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(step_ms: float, upscale_ms_per_mp: float) -> tuple[str, object]:
+    """Run the app with the synthetic backend in a background thread."""
+    import uvicorn
+
+    DEFAULT_SETTINGS["generator_backend"] = "synthetic"
+    DEFAULT_SETTINGS["synthetic_step_ms"] = step_ms
+    DEFAULT_SETTINGS["synthetic_upscale_ms_per_mp"] = upscale_ms_per_mp
+
+    from api.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="loadtest-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+def _get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        return json.load(resp)
+
+
+def _delete(url: str) -> None:
+    req = urllib.request.Request(url, method="DELETE")
+    with urllib.request.urlopen(req, timeout=60):
+        pass
+
+
+async def run_client(base_url: str, index: int, args: argparse.Namespace) -> dict:
+    ws_url = base_url.replace("http", "ws", 1) + "/ws/generate"
+    request = {
+        "prompt": f"load test {index} {uuid.uuid4().hex[:8]}",
+        "target_width": args.width,
+        "target_height": args.height,
+        "seed": index,
+        "num_inference_steps": args.steps,
+    }
+    start = time.perf_counter()
+    first_event = None
+    events = 0
+    async with websockets.connect(ws_url, max_size=None, open_timeout=60) as ws:
+        await ws.send(json.dumps(request))
+        async for message in ws:
+            event = json.loads(message)
+            events += 1
+            if first_event is None:
+                first_event = time.perf_counter() - start
+            if event["type"] in ("complete", "error"):
+                break
+    generate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.to_thread(_get_json, f"{base_url}/api/gallery?per_page=20")
+    gallery_seconds = time.perf_counter() - start
+
+    return {
+        "ok": event["type"] == "complete" and event.get("success", False),
+        "error": event.get("error"),
+        "filename": event.get("filename"),
+        "events": events,
+        "first_event": first_event,
+        "generate": generate_seconds,
+        "gallery": gallery_seconds,
+    }
+
+
+def _report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:16s} p50 {p50 * 1000:9.1f} ms  p99 {p99 * 1000:9.1f} ms  max {samples[-1] * 1000:9.1f} ms")
+
+
+async def run(base_url: str, args: argparse.Namespace) -> list[dict]:
+    semaphore = asyncio.Semaphore(args.clients)
+
+    async def _limited(i: int) -> dict:
+        async with semaphore:
+            try:
+                return await run_client(base_url, i, args)
+            except Exception as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    return await asyncio.gather(*(_limited(i) for i in range(args.requests or args.clients)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead of an in-process synthetic one")
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=0, help="Total jobs (default: one per client)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--step-ms", type=float, default=20.0, help="Synthetic backend: ms per diffusion step")
+    parser.add_argument("--upscale-ms-per-mp", type=float, default=20.0,
+                        help="Synthetic backend: ms per upscaled megapixel")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the generated images afterwards")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if base_url is None:
+        base_url, server = start_local_server(args.step_ms, args.upscale_ms_per_mp)
+
+    start = time.perf_counter()
+    results = asyncio.run(run(base_url, args))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    try:
+        stats = _get_json(f"{base_url}/api/config/stats")
+    except Exception as e:
+        failed.append({"ok": False, "error": f"GET /api/config/stats: {type(e).__name__}: {e}"})
+        stats = None
+    print(f"{len(results)} jobs from {args.clients} clients against {base_url} in {elapsed:.1f}s")
+    print(f"throughput       {len(ok) / elapsed:9.2f} jobs/s, {len(failed)} failed")
+    if ok:
+        _report("first event", [r["first_event"] for r in ok])
+        _report("job complete", [r["generate"] for r in ok])
+        _report("gallery list", [r["gallery"] for r in ok])
+        print(f"events per job   {statistics.mean(r['events'] for r in ok):9.1f}")
+    if stats is not None:
+        cache = stats["model_cache"]
+        print(f"model cache      {cache['hits']} hits, {cache['misses']} misses, "
+              f"{cache['resident_bytes'] / 1024**2:.0f} MB resident")
+    for r in failed[:5]:
+        print(f"  failed: {r['error']}")
+
+    if args.cleanup:
+        for r in ok:
+            if r["filename"]:
+                _delete(f"{base_url}/api/gallery/{r['filename']}")
+    if server is not None:
+        server.should_exit = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Reproducible timings of the generation and gallery hot paths, with baseline comparison.
+
+Groups (select with --only):
+
+- presets:  calculate_base_resolution over every DEVICE_PRESETS entry
+- upscale:  upscale_image's PIL/tensor conversions around a no-op network,
+            and the final Lanczos resize, at each preset size
+- history:  get_generation_history and filter_history over synthetic
+            galleries (empty image files plus real sidecars in a temp dir)
+- export:   batch_export_zip of incompressible "images" with sidecars
+- pipeline: run_pipeline end to end on a zero-latency synthetic backend, and
+            encoding the result in the default output format
+
+Every case is warmed up once, then timed --repeat times; tiny cases loop
+until a sample lasts at least --min-time. Results (seconds per call) are
+written as JSON. With --baseline, medians are compared against a saved run
+and the exit status is 1 if any case got slower than --tolerance allows.
+Inputs are seeded, so runs on the same machine are comparable.
+
+Usage:
+    python -m benchmarks.suite [--only presets,upscale] [--output results.json]
+    python -m benchmarks.suite --baseline benchmarks/baseline.json [--tolerance 0.15]
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --update-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator
+
+import torch
+from PIL import Image
+
+import src.utils.file_utils as file_utils
+from benchmarks.bench_search import QUERIES, synthetic_history
+from src.config.presets import calculate_base_resolution, get_all_presets
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends import SyntheticBackend, register_backend
+from src.generator.model_manager import set_model_manager
+from src.generator.orchestrator import run_pipeline
+from src.generator.tiling import TiledUpscaler
+from src.generator.upscaler import upscale_image
+from src.utils.encoding import EncodeOptions, write_image
+
+RESULTS_VERSION = 1
+
+Timed = Callable[[], object]
+Group = Callable[[argparse.Namespace], Iterator[tuple[str, Timed]]]
+
+GROUPS: dict[str, Group] = {}
+
+
+def benchmark(name: str) -> Callable[[Group], Group]:
+    """Register a group: a generator yielding (case name, function to time) pairs.
+
+    Cases are timed as they are yielded, so a group can build large inputs
+    one case at a time and clean up after its last yield.
+    """
+    def register(fn: Group) -> Group:
+        GROUPS[name] = fn
+        return fn
+    return register
+
+
+def _preset_sizes() -> list[tuple[int, int]]:
+    return list(dict.fromkeys((p.width, p.height) for p in get_all_presets()))
+
+
+@benchmark("presets")
+def presets(args: argparse.Namespace) -> Iterator[tuple[str, Timed]]:
+    all_presets = get_all_presets()
+
+    def run() -> None:
+        for preset in all_presets:
+            calculate_base_resolution(preset.width, preset.height)
+    yield "presets.base_resolution[all]", run
+
+
+class _PassThroughUpscaler(TiledUpscaler):
+    """Skips the network so only the conversions are timed.
+
+    Returns a fresh copy of a fixed output each call, standing in for the
+    frame the network allocates (the PIL conversion scales it in place).
+    """
+
+    def __init__(self, output: torch.Tensor):
+        self._output = output
+
+    def upscale_tensor(self, image: torch.Tensor, on_tile=None) -> torch.Tensor:
+        return self._output.clone()
+
+
+@benchmark("upscale")
+def upscale(args: argparse.Namespace) -> Iterator[tuple[str, Timed]]:
+    generator = torch.Generator().manual_seed(0)
+    for width, height in _preset_sizes():
+        base_w, base_h = calculate_base_resolution(width, height)
+        pixels = torch.randint(0, 256, (base_h, base_w, 3), dtype=torch.uint8, generator=generator)
+        base = Image.frombytes("RGB", (base_w, base_h), pixels.numpy().tobytes())
+        upscaler = _PassThroughUpscaler(torch.rand(1, 3, base_h * 4, base_w * 4, generator=generator))
+        yield f"upscale.convert[{width}x{height}]", lambda: upscale_image(upscaler, base, width, height)
+
+        native = base.resize((base_w * 4, base_h * 4), Image.NEAREST)
+        yield f"upscale.lanczos[{width}x{height}]", lambda: native.resize((width, height), Image.LANCZOS)
+        del upscaler, native
+
+
+@contextmanager
+def _temp_gallery(entries: list[dict]) -> Iterator[Path]:
+    """Write empty images and real sidecars to a temp dir and point file_utils at it."""
+    saved_dir = file_utils.OUTPUT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        for entry in entries:
+            image = out / entry["filename"]
+            image.touch()
+            os.utime(image, (entry["mtime"], entry["mtime"]))
+            meta = {k: v for k, v in entry.items() if k not in ("filename", "mtime")}
+            image.with_suffix(".json").write_text(json.dumps(meta), encoding="utf-8")
+        file_utils.OUTPUT_DIR = out
+        try:
+            yield out
+        finally:
+            file_utils.OUTPUT_DIR = saved_dir
+
+
+@benchmark("history")
+def history(args: argparse.Namespace) -> Iterator[tuple[str, Timed]]:
+    for size in args.gallery_sizes:
+        label = f"{size // 1000}k" if size % 1000 == 0 else str(size)
+        entries = synthetic_history(size)
+        with _temp_gallery(entries):
+            yield f"history.load[{label}]", file_utils.get_generation_history
+
+            loaded = file_utils.get_generation_history()
+
+            def run_filters() -> None:
+                for query in QUERIES:
+                    file_utils.filter_history(loaded, search=query)
+                file_utils.filter_history(loaded, resolution_filter="3840x2160")
+            yield f"history.filter[{label}]", run_filters
+
+
+@benchmark("export")
+def export(args: argparse.Namespace) -> Iterator[tuple[str, Timed]]:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.export_files):
+            path = Path(tmp) / f"{i:04d}_export_3840x2160.png"
+            path.write_bytes(rng.randbytes(args.export_mb * 1024**2))
+            path.with_suffix(".json").write_text(json.dumps({"prompt": f"export {i}"}), encoding="utf-8")
+            paths.append(path)
+        yield (
+            f"export.zip[{args.export_files}x{args.export_mb}MB]",
+            lambda: file_utils.batch_export_zip(paths, include_metadata=True),
+        )
+
+
+@contextmanager
+def _stub_models() -> Iterator[None]:
+    """Route run_pipeline to a zero-latency synthetic backend, bypassing the caches."""
+    saved = {k: DEFAULT_SETTINGS[k] for k in ("generator_backend", "base_cache_mb")}
+    register_backend("suite", lambda: SyntheticBackend(
+        step_ms=0, step_ms_per_mp=0, upscale_ms_per_mp=0, load_ms=0
+    ))
+    DEFAULT_SETTINGS.update(generator_backend="suite", base_cache_mb=0)
+    # Recreate the manager so its loaders come from the stub backend
+    set_model_manager(None)
+    try:
+        yield
+    finally:
+        DEFAULT_SETTINGS.update(saved)
+        set_model_manager(None)
+
+
+@benchmark("pipeline")
+def pipeline(args: argparse.Namespace) -> Iterator[tuple[str, Timed]]:
+    with _stub_models(), tempfile.TemporaryDirectory() as tmp:
+        encode = EncodeOptions.from_settings()
+        for width, height in ((1920, 1080), (3840, 2160), (1290, 2796)):
+            def run(width: int = width, height: int = height) -> Image.Image:
+                result = run_pipeline("benchmark prompt", width, height, seed=0, save_output=False)
+                if result.error is not None:
+                    raise RuntimeError(result.error)
+                return result.upscaled_image
+            yield f"pipeline.run[{width}x{height}]", run
+
+            image = run()
+            path = Path(tmp) / f"encode_{width}x{height}.{encode.ext}"
+            yield f"pipeline.encode[{width}x{height}]", lambda: write_image(image, path, encode)
+
+
+def _measure(fn: Timed, repeat: int, min_time: float) -> dict:
+    start = time.perf_counter()
+    fn()  # warm-up, and a first estimate of the cost
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "torch": torch.__version__,
+        "pillow": Image.__version__,
+        "commit": commit,
+    }
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print each case against the baseline; returns the names of regressed cases."""
+    if baseline.get("environment", {}).get("machine") != results["environment"]["machine"] or (
+        baseline.get("environment", {}).get("cpu_count") != results["environment"]["cpu_count"]
+    ):
+        print("warning: baseline was recorded on different hardware; ratios may not mean much\n")
+
+    regressions = []
+    print(f"{'case':<40}{'median':>12}{'baseline':>12}{'change':>9}")
+    for name, stats in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<40}{_format_seconds(stats['median']):>12}{'-':>12}{'new':>9}")
+            continue
+        ratio = stats["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{_format_seconds(stats['median']):>12}"
+              f"{_format_seconds(base['median']):>12}{(ratio - 1) * 100:>+8.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help=f"Comma-separated groups: {','.join(GROUPS)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--gallery-sizes", default="1000,10000,100000",
+                        type=lambda s: [int(n) for n in s.split(",")])
+    parser.add_argument("--export-files", type=int, default=20)
+    parser.add_argument("--export-mb", type=int, default=4, help="Size of each exported file")
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="Compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run as --baseline")
+    args = parser.parse_args()
+
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    random.seed(0)
+    torch.manual_seed(0)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "results": {},
+    }
+    for group in groups:
+        for name, fn in GROUPS[group](args):
+            stats = _measure(fn, args.repeat, args.min_time)
+            results["results"][name] = stats
+            print(f"{name:<40}{_format_seconds(stats['median']):>12}"
+                  f"  (min {_format_seconds(stats['min'])}, x{stats['number']})", flush=True)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline is None:
+        return
+    if args.update_baseline or not args.baseline.exists():
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    print()
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
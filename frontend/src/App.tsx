@@ -10,7 +10,7 @@ import Gallery from './components/Gallery'
 
 function App() {
   // Generation state
-  const { status, progress, result, error, generate, reset, isGenerating } = useGenerate()
+  const { status, progress, preview, result, error, generate, reset, isGenerating } = useGenerate()
 
   // Form state
   const [prompt, setPrompt] = useState('')
@@ -27,7 +27,7 @@ function App() {
   const [seed, setSeed] = useState(-1)
   const [seedInput, setSeedInput] = useState('-1')
   const [enableUpscaling, setEnableUpscaling] = useState(true)
-  const [upscaleModel, setUpscaleModel] = useState('RealESRGAN_x4plus')
+  const [upscaleModel, setUpscaleModel] = useState('auto')
   const [baseRes, setBaseRes] = useState<{ base_width: number; base_height: number } | null>(null)
 
   // Gallery refresh key
@@ -70,7 +70,7 @@ function App() {
     setSeed(item.seed ?? -1)
     setSeedInput(String(item.seed ?? -1))
     setEnableUpscaling(item.enable_upscaling ?? true)
-    setUpscaleModel(item.upscale_model || 'RealESRGAN_x4plus')
+    setUpscaleModel(item.upscale_model || 'auto')
     window.scrollTo({ top: 0, behavior: 'smooth' })
   }, [])
 
@@ -167,7 +167,7 @@ function App() {
               {/* Progress Bar */}
               {isGenerating && progress && (
                 <div className="flex-1 flex flex-col justify-center">
-                  <ProgressBar progress={progress} />
+                  <ProgressBar progress={progress} preview={preview} />
                 </div>
               )}
 
@@ -1,4 +1,4 @@
-import type { PresetsConfig, GalleryResponse, GenerateProgress, GenerateResult } from '../types'
+import type { PresetsConfig, GalleryResponse, GenerateProgress, GeneratePreview, GenerateResult } from '../types'
 
 export async function fetchPresets(): Promise<PresetsConfig> {
   const res = await fetch('/api/config/presets')
@@ -43,6 +43,7 @@ export function connectGenerate(
   onProgress: (data: GenerateProgress) => void,
   onComplete: (data: GenerateResult) => void,
   onError: (error: string) => void,
+  onPreview?: (data: GeneratePreview) => void,
 ): WebSocket {
   const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
   const ws = new WebSocket(`${protocol}//${window.location.host}/ws/generate`)
@@ -53,8 +54,17 @@ export function connectGenerate(
 
   ws.onmessage = (event) => {
     const data = JSON.parse(event.data)
-    if (data.type === 'progress') {
+    if (data.type === 'queued') {
+      onProgress({
+        type: 'progress',
+        stage: 'queued',
+        progress: 0,
+        message: data.position > 1 ? `Queued (position ${data.position})` : 'Starting...',
+      })
+    } else if (data.type === 'progress') {
       onProgress(data as GenerateProgress)
+    } else if (data.type === 'preview') {
+      onPreview?.(data as GeneratePreview)
     } else if (data.type === 'complete') {
       onComplete(data as GenerateResult)
     } else if (data.type === 'error') {
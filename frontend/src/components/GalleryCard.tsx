@@ -29,7 +29,7 @@ export default function GalleryCard({ item, onView, onDelete, onLoadConfig }: Ga
     <div className="bg-gray-900 rounded-lg overflow-hidden group">
       <div className="relative cursor-pointer" onClick={onView}>
         <img
-          src={item.image_url}
+          src={item.thumbnail_url ?? item.image_url}
           alt={item.prompt || 'Generated wallpaper'}
           className="w-full h-48 object-cover bg-gray-800"
           style={{ objectFit: item.target_resolution && item.target_resolution[1] > item.target_resolution[0] ? 'contain' : 'cover' }}
@@ -2,6 +2,7 @@ import type { GenerateProgress } from '../types'
 
 interface ProgressBarProps {
   progress: GenerateProgress | null
+  preview?: string | null
 }
 
 const STAGE_LABELS: Record<string, string> = {
@@ -11,10 +12,11 @@ const STAGE_LABELS: Record<string, string> = {
   loading_upscaler: 'Loading Upscaler',
   upscaling: 'Upscaling',
   saving: 'Saving',
+  saved: 'Saved',
   complete: 'Complete',
 }
 
-export default function ProgressBar({ progress }: ProgressBarProps) {
+export default function ProgressBar({ progress, preview }: ProgressBarProps) {
   if (!progress) return null
 
   const percent = Math.round(progress.progress * 100)
@@ -33,6 +35,13 @@ export default function ProgressBar({ progress }: ProgressBarProps) {
         />
       </div>
       <p className="text-xs text-gray-500 mt-1">{progress.message}</p>
+      {preview && progress.stage === 'generating' && (
+        <img
+          src={preview}
+          alt="Generation preview"
+          className="mt-2 w-full max-w-xs rounded-lg opacity-90"
+        />
+      )}
     </div>
   )
 }
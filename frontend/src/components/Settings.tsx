@@ -213,7 +213,7 @@ export default function Settings({
               <option value="__disabled__">Disabled</option>
               {Object.entries(config.upscaler_models).map(([name, model]) => (
                 <option key={name} value={name}>
-                  {name} ({model.scale}x) - {model.description}
+                  {name}{model.scale ? ` (${model.scale}x)` : ''} - {model.description}
                 </option>
               ))}
             </select>
@@ -7,6 +7,7 @@ type Status = 'idle' | 'generating' | 'complete' | 'error'
 export function useGenerate() {
   const [status, setStatus] = useState<Status>('idle')
   const [progress, setProgress] = useState<GenerateProgress | null>(null)
+  const [preview, setPreview] = useState<string | null>(null)
   const [result, setResult] = useState<GenerateResult | null>(null)
   const [error, setError] = useState<string | null>(null)
   const wsRef = useRef<WebSocket | null>(null)
@@ -14,6 +15,7 @@ export function useGenerate() {
   const generate = useCallback((request: Record<string, unknown>) => {
     setStatus('generating')
     setProgress(null)
+    setPreview(null)
     setResult(null)
     setError(null)
 
@@ -29,15 +31,17 @@ export function useGenerate() {
         setError(err)
         setStatus('error')
       },
+      (data) => setPreview(data.image),
     )
   }, [])
 
   const reset = useCallback(() => {
     setStatus('idle')
     setProgress(null)
+    setPreview(null)
     setResult(null)
     setError(null)
   }, [])
 
-  return { status, progress, result, error, generate, reset, isGenerating: status === 'generating' }
+  return { status, progress, preview, result, error, generate, reset, isGenerating: status === 'generating' }
 }
@@ -5,13 +5,23 @@ export interface DevicePreset {
 }
 
 export interface UpscalerModel {
-  scale: number
+  scale: number | null
+  description: string
+}
+
+export interface GenerationProfile {
+  name: string
+  scheduler: string
+  num_inference_steps: number
+  guidance_scale: number
   description: string
 }
 
 export interface PresetsConfig {
   presets: Record<string, DevicePreset[]>
   upscaler_models: Record<string, UpscalerModel>
+  profiles: Record<string, GenerationProfile>
+  schedulers: string[]
   default_settings: {
     num_inference_steps: number
     guidance_scale: number
@@ -32,6 +42,9 @@ export interface GenerationSettings {
   seed: number
   enable_upscaling: boolean
   upscale_model: string
+  profile?: string
+  scheduler?: string
+  force_regenerate?: boolean
 }
 
 export interface GenerateProgress {
@@ -41,6 +54,13 @@ export interface GenerateProgress {
   message: string
 }
 
+export interface GeneratePreview {
+  type: 'preview'
+  step: number
+  total_steps: number
+  image: string
+}
+
 export interface GenerateResult {
   type: 'complete'
   success: boolean
@@ -49,12 +69,15 @@ export interface GenerateResult {
   seed_used: number | null
   base_resolution: number[] | null
   target_resolution: number[] | null
+  cached?: boolean
   error: string | null
 }
 
 export interface GalleryItem {
   filename: string
   image_url: string
+  thumbnail_url: string | null
+  preview_url: string | null
   prompt: string | null
   negative_prompt: string | null
   seed: number | null
@@ -65,6 +88,7 @@ export interface GalleryItem {
   enable_upscaling: boolean | null
   upscale_model: string | null
   timestamp: string | null
+  snippet?: string | null
 }
 
 export interface GalleryResponse {
@@ -73,4 +97,5 @@ export interface GalleryResponse {
   page: number
   per_page: number
   total_pages: number
+  next_cursor: string | null
 }
@@ -8,11 +8,25 @@ from .presets import (
     validate_resolution,
     calculate_base_resolution,
     calculate_upscale_factor,
+    plan_upscale_passes,
+)
+from .profiles import (
+    GenerationProfile,
+    PROFILES,
+    SCHEDULERS,
+    get_profile,
 )
 from .settings import (
     PROJECT_ROOT,
     OUTPUT_DIR,
     MODEL_DIR,
+    DATA_DIR,
+    JOBS_DB_PATH,
+    GALLERY_INDEX_PATH,
+    CACHE_DIR,
+    DERIVATIVE_DIR,
+    EMBEDDING_DIR,
+    BASE_IMAGE_DIR,
     DEFAULT_SETTINGS,
     ensure_directories,
 )
@@ -106,14 +106,46 @@ def calculate_base_resolution(
     return base_w, base_h
 
 
+def plan_upscale_passes(
+    base_width: int,
+    base_height: int,
+    target_width: int,
+    target_height: int,
+    lanczos_threshold: float = 1.25,
+    model_scales: tuple[int, ...] = (2, 4),
+) -> list[int]:
+    """Plan the cheapest chain of model upscales that reaches the target.
+
+    Each pass uses the smallest model scale that covers the remaining factor
+    (or the largest one if none does). A remaining factor at or below
+    ``lanczos_threshold`` is left to the final Lanczos resize.
+
+    Returns:
+        Model scale of each pass in order; empty when Lanczos alone suffices.
+    """
+    remaining = max(target_width / base_width, target_height / base_height)
+    passes = []
+    while remaining > lanczos_threshold:
+        scale = next((s for s in sorted(model_scales) if s >= remaining), max(model_scales))
+        passes.append(scale)
+        remaining /= scale
+    return passes
+
+
 def calculate_upscale_factor(
-    base_width: int, base_height: int, target_width: int, target_height: int
+    base_width: int,
+    base_height: int,
+    target_width: int,
+    target_height: int,
+    lanczos_threshold: float = 1.25,
 ) -> int:
-    """Calculate the minimum integer upscale factor needed."""
-    factor_w = target_width / base_width
-    factor_h = target_height / base_height
-    factor = max(factor_w, factor_h)
-    # Round up to next supported factor (2 or 4)
-    if factor <= 2:
-        return 2
-    return 4
+    """Calculate the total model upscale factor needed (1, 2, 4, 8, ...).
+
+    1 means the target is close enough to the base that a Lanczos resize is enough.
+    """
+    factor = 1
+    for scale in plan_upscale_passes(
+        base_width, base_height, target_width, target_height, lanczos_threshold
+    ):
+        factor *= scale
+    return factor
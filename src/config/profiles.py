@@ -0,0 +1,48 @@
+"""Named speed/quality profiles: scheduler, step count and guidance.
+
+Schedulers are referenced by short names mapped to a diffusers class and
+its ``from_config`` overrides, so this module stays importable without
+diffusers. "default" keeps the scheduler the model ships with.
+"""
+
+from dataclasses import asdict, dataclass
+
+# name -> (diffusers scheduler class, from_config overrides)
+SCHEDULERS: dict[str, tuple[str, dict] | None] = {
+    "default": None,
+    "dpmpp_2m_karras": (
+        "DPMSolverMultistepScheduler", {"algorithm_type": "dpmsolver++", "use_karras_sigmas": True}
+    ),
+    "dpmpp_2m_sde_karras": (
+        "DPMSolverMultistepScheduler", {"algorithm_type": "sde-dpmsolver++", "use_karras_sigmas": True}
+    ),
+    "euler": ("EulerDiscreteScheduler", {}),
+    "euler_a": ("EulerAncestralDiscreteScheduler", {}),
+    "unipc": ("UniPCMultistepScheduler", {}),
+}
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    name: str
+    scheduler: str
+    num_inference_steps: int
+    guidance_scale: float
+    description: str
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+PROFILES: dict[str, GenerationProfile] = {
+    p.name: p for p in (
+        GenerationProfile("fast", "dpmpp_2m_karras", 12, 5.5, "DPM++ 2M Karras, 12 steps"),
+        GenerationProfile("balanced", "dpmpp_2m_karras", 20, 7.0, "DPM++ 2M Karras, 20 steps"),
+        GenerationProfile("quality", "dpmpp_2m_sde_karras", 40, 7.5, "DPM++ 2M SDE Karras, 40 steps"),
+    )
+}
+
+
+def get_profile(name: str) -> GenerationProfile | None:
+    """Find a profile by name. Returns None if not found."""
+    return PROFILES.get(name)
@@ -9,18 +9,77 @@ OUTPUT_DIR = PROJECT_ROOT / "outputs"
 # Model cache directory
 MODEL_DIR = PROJECT_ROOT / "models"
 
+# Local state (job queue, indexes, caches)
+DATA_DIR = PROJECT_ROOT / "data"
+
+# SQLite database backing the generation job queue
+JOBS_DB_PATH = DATA_DIR / "jobs.sqlite3"
+
+# SQLite index mirroring the gallery's metadata sidecars
+GALLERY_INDEX_PATH = DATA_DIR / "gallery.sqlite3"
+
+# Regenerable caches (thumbnails, previews, ...)
+CACHE_DIR = DATA_DIR / "cache"
+
+# Content-addressed thumbnail and preview derivatives of gallery images
+DERIVATIVE_DIR = CACHE_DIR / "derivatives"
+
+# On-disk tier of the prompt embedding cache
+EMBEDDING_DIR = CACHE_DIR / "embeddings"
+
+# Reusable SDXL base images, keyed by their generation inputs
+BASE_IMAGE_DIR = CACHE_DIR / "bases"
+
 # Default generation settings
 DEFAULT_SETTINGS = {
+    "generator_backend": "sdxl",  # sdxl, or synthetic for GPU-free load testing
     "model_id": "stabilityai/stable-diffusion-xl-base-1.0",
     "base_size": 1024,
     "num_inference_steps": 30,
     "guidance_scale": 7.5,
+    "scheduler": "default",  # Key of profiles.SCHEDULERS; "default" = the model's own
+    "profile": None,  # Profile applied when a request names none; None = the settings above
     "negative_prompt": "blurry, low quality, distorted, deformed, ugly, bad anatomy",
     "use_fp16": True,
+    "execution_mode": "auto",  # auto, cuda, model_offload, sequential_offload or cpu
+    "cpu_dtype": "float32",  # float32 or bfloat16 in cpu mode
     "enable_attention_slicing": True,
     "enable_upscaling": True,
-    "upscale_model": "RealESRGAN_x4plus",
-    "seed": -1,  # -1 means random
+    "upscale_model": "auto",  # "auto" = cheapest model chain that reaches the target
+    "seed": -1,  # -1 means random (a concrete seed is drawn and recorded)
+    "model_cache_budget_gb": None,  # None = derive from available VRAM
+    "low_memory_mode": False,  # Unload each model after use instead of caching
+    "max_batch_size": 4,  # Upper bound on images per batched diffusion pass
+    "upscale_tile": None,  # Upscaler tile size in input pixels; None = fit the memory budget
+    "upscale_tile_overlap": 16,  # Feathered overlap between upscaler tiles, in input pixels
+    "upscale_memory_budget_gb": None,  # None = half of free VRAM (1 GB on CPU)
+    "upscale_lanczos_threshold": 1.25,  # Remaining factors up to this use Lanczos, not a model
+    "output_format": "png",  # png, webp, jpeg or avif
+    "output_quality": 95,  # JPEG/AVIF/lossy WebP quality
+    "png_compress_level": 6,  # 0 (fastest) - 9 (smallest)
+    "output_lossless": False,  # Lossless WebP
+    "embed_metadata": True,  # Embed generation parameters in the image file
+    "encode_workers": 2,  # Background processes encoding final images
+    "progress_min_interval": 0.05,  # Seconds between progress updates sent to each client
+    "preview_every": 5,  # Minimum diffusion steps between latent previews; 0 = off
+    "preview_budget": 0.03,  # Max share of step time spent decoding previews
+    "embedding_cache_mb": 256,  # In-memory budget for cached prompt embeddings
+    "embedding_cache_disk": False,  # Also keep prompt embeddings under EMBEDDING_DIR
+    "base_cache_mb": 2048,  # Disk budget for reusable base images; 0 = off
+    "draft_count": 4,  # Seeds rendered by a draft grid when none are given
+    "draft_steps": 10,  # Denoising steps of a draft
+    "draft_base_size": 640,  # Long side of a draft's base resolution
+    "synthetic_step_ms": 20,  # Synthetic backend: latency of one diffusion step
+    "synthetic_step_ms_per_mp": 0,  # Synthetic backend: extra step latency per latent megapixel
+    "synthetic_upscale_ms_per_mp": 20,  # Synthetic backend: upscale latency per output megapixel
+    "synthetic_load_ms": 0,  # Synthetic backend: model load latency
+    "pipeline_stages": False,  # Upscale/encode one job while the next diffuses (models stay resident)
+    "stage_queue_size": 1,  # Diffused batches that may wait for the upscaler
+    "stage_max_pending_saves": 4,  # Images being encoded before upscaling pauses
+    "worker_devices": [],  # One worker process per entry ("cuda:0", "cpu", "cpu:0-7"); [] = in-process
+    "worker_heartbeat_seconds": 2.0,  # Interval between worker process heartbeats
+    "worker_heartbeat_timeout": 30.0,  # Silence after which a worker process is restarted
+    "worker_max_attempts": 2,  # Runs of a job whose worker crashed before it is failed
 }
 
 
@@ -28,3 +87,4 @@ def ensure_directories() -> None:
     """Create required directories if they don't exist."""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -1,4 +1,19 @@
-from .model import load_sdxl_pipeline, unload_pipeline
-from .pipeline import generate_base_image
+from .model import load_sdxl_pipeline, set_scheduler, unload_pipeline
+from .pipeline import generate_base_image, generate_base_images, max_batch_size
 from .upscaler import load_upscaler, upscale_image, unload_upscaler
-from .orchestrator import run_pipeline, PipelineStage, PipelineResult
+from .orchestrator import (
+    run_pipeline,
+    run_multi_target_pipeline,
+    run_batch_pipeline,
+    run_draft_grid,
+    GenerationRequest,
+    PipelineStage,
+    PipelineResult,
+    MultiTargetResult,
+    DraftGridResult,
+)
+from .model_manager import ModelManager, get_model_manager, set_model_manager
+from .embeddings import PromptEmbeddingCache, get_embedding_cache
+from .device import ExecutionBackend, ExecutionMode, detect_backend, get_execution_backend
+from .backends import GeneratorBackend, SDXLBackend, SyntheticBackend, get_backend, register_backend
+from .instrumentation import Span, Trace, get_stage_metrics
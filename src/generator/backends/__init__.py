@@ -0,0 +1,7 @@
+from .base import GENERATOR_KIND, UPSCALER_KIND, GeneratorBackend, StepCallback
+from .registry import backend_names, get_backend, register_backend
+from .sdxl import SDXLBackend
+from .synthetic import SyntheticBackend
+
+register_backend("sdxl", SDXLBackend)
+register_backend("synthetic", SyntheticBackend)
@@ -0,0 +1,70 @@
+"""The interface every generator backend implements."""
+
+from typing import Any, Callable, Protocol
+
+import torch
+
+from src.generator.tiling import TileCallback, TilingStats
+from src.utils.image_buffer import ImageBuffer
+
+# Model kinds a backend loads through the model manager
+GENERATOR_KIND = "sdxl"
+UPSCALER_KIND = "upscaler"
+
+StepCallback = Callable[[int, torch.Tensor | None], None]
+"""Callback signature: (finished step index, current latents or None)"""
+
+
+class GeneratorBackend(Protocol):
+    """Turns prompts into base images and upscales them.
+
+    Models are loaded and unloaded through ``load``/``unload`` by the model
+    manager, which caches them; ``generate`` and ``upscale`` receive the
+    loaded model. Images pass between them as ``ImageBuffer``s, so a backend
+    can hand its decoder output to its upscaler without a PIL round trip.
+    """
+
+    name: str
+
+    def load(self, kind: str, name: str) -> Any:
+        """Load the model ``name`` of the given kind (``GENERATOR_KIND`` or ``UPSCALER_KIND``)."""
+        ...
+
+    def unload(self, kind: str, model: Any) -> None:
+        ...
+
+    def model_bytes(self, kind: str, model: Any) -> int:
+        """Accelerator memory a loaded model occupies while cached."""
+        ...
+
+    def max_batch_size(self, base_width: int, base_height: int) -> int:
+        """How many base images of this size fit in one ``generate`` call."""
+        ...
+
+    def generate(
+        self,
+        model: Any,
+        prompts: list[str],
+        target_width: int,
+        target_height: int,
+        seeds: list[int | None],
+        negative_prompts: list[str | None],
+        num_inference_steps: int | None = None,
+        guidance_scale: float | None = None,
+        on_step: StepCallback | None = None,
+        base_size: int | None = None,
+        scheduler: str | None = None,
+    ) -> list[ImageBuffer]:
+        """Generate one base image per prompt, in a single batch."""
+        ...
+
+    def upscale(
+        self,
+        model: Any,
+        image: ImageBuffer,
+        target_width: int,
+        target_height: int,
+        on_tile: TileCallback | None = None,
+    ) -> tuple[ImageBuffer, TilingStats]:
+        """Upscale by the model's native factor, then resize to the exact target."""
+        ...
@@ -0,0 +1,33 @@
+"""Registry of generator backends, selected by the ``generator_backend`` setting."""
+
+import threading
+from typing import Callable
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends.base import GeneratorBackend
+
+_factories: dict[str, Callable[[], GeneratorBackend]] = {}
+_instances: dict[str, GeneratorBackend] = {}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], GeneratorBackend]) -> None:
+    """Make a backend available under ``name``; the factory runs on first use."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def backend_names() -> list[str]:
+    return list(_factories)
+
+
+def get_backend(name: str | None = None) -> GeneratorBackend:
+    """Return the (shared) backend instance. Defaults to the ``generator_backend`` setting."""
+    name = name or DEFAULT_SETTINGS["generator_backend"]
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise ValueError(f"Unknown generator backend: {name}. Choose from {list(_factories)}")
+            _instances[name] = _factories[name]()
+        return _instances[name]
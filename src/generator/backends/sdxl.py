@@ -0,0 +1,84 @@
+"""The production backend: diffusers SDXL and tiled Real-ESRGAN."""
+
+from typing import Any
+
+from src.generator.backends.base import GENERATOR_KIND, UPSCALER_KIND, StepCallback
+from src.generator.device import get_execution_backend
+from src.generator.model import load_sdxl_pipeline, set_scheduler, unload_pipeline
+from src.generator.model_manager import estimate_model_size
+from src.generator.pipeline import generate_base_buffers, max_batch_size
+from src.generator.tiling import TileCallback, TilingStats
+from src.generator.upscaler import load_upscaler, unload_upscaler, upscale_buffer
+from src.utils.image_buffer import ImageBuffer
+
+
+class SDXLBackend:
+    name = "sdxl"
+
+    def load(self, kind: str, name: str) -> Any:
+        if kind == GENERATOR_KIND:
+            return load_sdxl_pipeline(model_id=name)
+        if kind == UPSCALER_KIND:
+            return load_upscaler(model_name=name)
+        raise ValueError(f"Unknown model kind: {kind}")
+
+    def unload(self, kind: str, model: Any) -> None:
+        if kind == GENERATOR_KIND:
+            unload_pipeline(model)
+        else:
+            unload_upscaler(model)
+
+    def model_bytes(self, kind: str, model: Any) -> int:
+        if kind == GENERATOR_KIND:
+            # Offloaded pipelines keep their weights in system RAM between uses
+            return get_execution_backend().resident_bytes(model)
+        return estimate_model_size(model)
+
+    def max_batch_size(self, base_width: int, base_height: int) -> int:
+        return max_batch_size(base_width, base_height)
+
+    def generate(
+        self,
+        model: Any,
+        prompts: list[str],
+        target_width: int,
+        target_height: int,
+        seeds: list[int | None],
+        negative_prompts: list[str | None],
+        num_inference_steps: int | None = None,
+        guidance_scale: float | None = None,
+        on_step: StepCallback | None = None,
+        base_size: int | None = None,
+        scheduler: str | None = None,
+    ) -> list[ImageBuffer]:
+        # Swapping the scheduler keeps the cached weights
+        set_scheduler(model, scheduler)
+
+        def callback(pipe, step, timestep, callback_kwargs):
+            if on_step is not None:
+                on_step(step, callback_kwargs["latents"])
+            return callback_kwargs
+
+        return generate_base_buffers(
+            model,
+            prompts=prompts,
+            target_width=target_width,
+            target_height=target_height,
+            seeds=seeds,
+            negative_prompts=negative_prompts,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            callback=callback,
+            base_size=base_size,
+        )
+
+    def upscale(
+        self,
+        model: Any,
+        image: ImageBuffer,
+        target_width: int,
+        target_height: int,
+        on_tile: TileCallback | None = None,
+    ) -> tuple[ImageBuffer, TilingStats]:
+        result = upscale_buffer(model, image, target_width, target_height, on_tile=on_tile)
+        return result, model.last_stats
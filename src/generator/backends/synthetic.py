@@ -0,0 +1,132 @@
+"""A GPU-free backend that paints procedural images with configurable latency.
+
+Used to load-test the API, job queue, event bus, encoder and gallery on
+machines without model weights. Images are deterministic per prompt and
+seed, and every diffusion step yields small random latents, so previews,
+the result cache and the base-image cache behave as they do with SDXL.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import torch
+from PIL import Image, ImageOps
+
+from src.config.presets import calculate_base_resolution
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends.base import UPSCALER_KIND, StepCallback
+from src.generator.instrumentation import resolution_label, span
+from src.generator.tiling import TileCallback, TilingStats
+from src.generator.upscaler import UPSCALER_MODELS
+from src.utils.image_buffer import ImageBuffer
+
+
+@dataclass
+class SyntheticModel:
+    kind: str
+    name: str
+    scale: int = 1
+
+
+def _paint(prompt: str, seed: int | None, width: int, height: int) -> Image.Image:
+    rng = random.Random(f"{seed}:{prompt}")
+    linear = Image.linear_gradient("L").rotate(rng.uniform(0, 360)).resize((width, height))
+    radial = Image.radial_gradient("L").resize((width, height))
+    mix = Image.blend(linear, radial, rng.uniform(0.2, 0.8))
+    colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(3)]
+    return ImageOps.colorize(mix, black=colors[0], white=colors[1], mid=colors[2])
+
+
+def _seconds(ms: float | None, setting: str) -> float:
+    return (ms if ms is not None else DEFAULT_SETTINGS[setting]) / 1000
+
+
+class SyntheticBackend:
+    """Procedural stand-in for SDXL and Real-ESRGAN.
+
+    Args:
+        step_ms: Latency of one diffusion step for a whole batch. Defaults to settings.
+        step_ms_per_mp: Extra step latency per megapixel of latents in the
+            batch, so larger and batched renders cost more. Defaults to settings.
+        upscale_ms_per_mp: Upscale latency per output megapixel. Defaults to settings.
+        load_ms: Latency of loading a model. Defaults to settings.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        step_ms: float | None = None,
+        step_ms_per_mp: float | None = None,
+        upscale_ms_per_mp: float | None = None,
+        load_ms: float | None = None,
+    ):
+        self.step_seconds = _seconds(step_ms, "synthetic_step_ms")
+        self.step_seconds_per_mp = _seconds(step_ms_per_mp, "synthetic_step_ms_per_mp")
+        self.upscale_seconds_per_mp = _seconds(upscale_ms_per_mp, "synthetic_upscale_ms_per_mp")
+        self.load_seconds = _seconds(load_ms, "synthetic_load_ms")
+
+    def load(self, kind: str, name: str) -> Any:
+        time.sleep(self.load_seconds)
+        scale = UPSCALER_MODELS[name]["scale"] if kind == UPSCALER_KIND else 1
+        return SyntheticModel(kind, name, scale)
+
+    def unload(self, kind: str, model: Any) -> None:
+        pass
+
+    def model_bytes(self, kind: str, model: Any) -> int:
+        return 0
+
+    def max_batch_size(self, base_width: int, base_height: int) -> int:
+        return DEFAULT_SETTINGS["max_batch_size"]
+
+    def generate(
+        self,
+        model: Any,
+        prompts: list[str],
+        target_width: int,
+        target_height: int,
+        seeds: list[int | None],
+        negative_prompts: list[str | None],
+        num_inference_steps: int | None = None,
+        guidance_scale: float | None = None,
+        on_step: StepCallback | None = None,
+        base_size: int | None = None,
+        scheduler: str | None = None,
+    ) -> list[ImageBuffer]:
+        steps = num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
+        if base_size:
+            base_w, base_h = calculate_base_resolution(target_width, target_height, base_size)
+        else:
+            base_w, base_h = calculate_base_resolution(target_width, target_height)
+
+        resolution = resolution_label(base_w, base_h)
+        megapixels = len(prompts) * base_w * base_h / 1e6
+
+        generator = torch.Generator().manual_seed(seeds[0] if seeds and seeds[0] is not None else 0)
+        latents = torch.randn(len(prompts), 4, base_h // 8, base_w // 8, generator=generator)
+        for step in range(steps):
+            with span("denoise_step", resolution, step=step + 1, batch=len(prompts)):
+                time.sleep(self.step_seconds + self.step_seconds_per_mp * megapixels)
+            if on_step is not None:
+                on_step(step, latents)
+        with span("vae_decode", resolution, batch=len(prompts)):
+            return [ImageBuffer.from_pil(_paint(p, s, base_w, base_h)) for p, s in zip(prompts, seeds)]
+
+    def upscale(
+        self,
+        model: Any,
+        image: ImageBuffer,
+        target_width: int,
+        target_height: int,
+        on_tile: TileCallback | None = None,
+    ) -> tuple[ImageBuffer, TilingStats]:
+        start = time.perf_counter()
+        width, height = image.width * model.scale, image.height * model.scale
+        time.sleep(self.upscale_seconds_per_mp * width * height / 1e6)
+        result = ImageBuffer.from_pil(image.pil().resize((target_width, target_height), Image.BICUBIC))
+        if on_tile is not None:
+            on_tile(1, 1)
+        return result, TilingStats(tiles=1, batches=1, seconds=time.perf_counter() - start)
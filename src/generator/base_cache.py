@@ -0,0 +1,113 @@
+"""On-disk cache of SDXL base images, keyed by ``GenerationRequest.base_key``.
+
+Every generation has a concrete seed, so its base image is reproducible and
+can be kept: re-rendering a gallery image at another target with the same
+base resolution skips diffusion and only reruns upscaling. Only bases of
+caller-chosen seeds are stored (a drawn seed is practically never asked for
+again; promoted drafts carry theirs). Entries are lossless PNGs under
+``BASE_IMAGE_DIR``, pruned least-recently-used first to the ``base_cache_mb``
+budget once a running byte count passes it.
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image
+
+from src.config.settings import BASE_IMAGE_DIR, DEFAULT_SETTINGS
+from src.utils.encoding import EncodeOptions, get_image_saver
+
+# Fast, lossless: base images are ~1 MP and read back once or twice
+_BASE_ENCODE = EncodeOptions(format="png", png_compress_level=1, embed_metadata=False)
+
+_prune_lock = threading.Lock()
+# Bytes in the cache: scanned once, then kept up to date by stores and prunes.
+# Other processes sharing the directory are only seen at the next prune.
+_cache_bytes: int | None = None
+# A prune triggered by a store goes this far below the budget, so the next
+# few stores do not each rescan the directory
+_PRUNE_TO = 0.9
+
+
+def base_image_path(key: str) -> Path:
+    return BASE_IMAGE_DIR / key[:2] / f"{key}.png"
+
+
+def _enabled() -> bool:
+    return DEFAULT_SETTINGS["base_cache_mb"] > 0
+
+
+def load_base_image(key: str | None) -> Image.Image | None:
+    """Return the cached base image for ``key``, or None on a miss."""
+    if key is None or not _enabled():
+        return None
+    path = base_image_path(key)
+    try:
+        with Image.open(path) as img:
+            image = img.convert("RGB")
+    except (FileNotFoundError, OSError):
+        # Missing, or a partial file from a crash: regenerate it
+        return None
+    # Mark as recently used for pruning
+    os.utime(path)
+    return image
+
+
+def store_base_image(key: str | None, image: Image.Image) -> Future | None:
+    """Write a base image to the cache in the background encoder."""
+    if key is None or not _enabled():
+        return None
+    path = base_image_path(key)
+    if path.exists():
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return get_image_saver().save(image, path, _BASE_ENCODE, on_saved=_on_stored)
+
+
+def _on_stored(path: Path) -> None:
+    global _cache_bytes
+    with _prune_lock:
+        if _cache_bytes is None:
+            # The scan already includes the new file
+            _cache_bytes = sum(size for _, size, _ in _scan())
+        else:
+            _cache_bytes += path.stat().st_size
+        over = _cache_bytes > _max_bytes()
+    if over:
+        prune_base_images(int(_max_bytes() * _PRUNE_TO))
+
+
+def _max_bytes() -> int:
+    return int(DEFAULT_SETTINGS["base_cache_mb"] * 1024**2)
+
+
+def _scan() -> list[tuple[float, int, Path]]:
+    entries = []
+    for path in BASE_IMAGE_DIR.glob("*/*.png"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def prune_base_images(max_bytes: int | None = None) -> int:
+    """Delete least recently used base images until the cache fits; returns files removed."""
+    global _cache_bytes
+    if max_bytes is None:
+        max_bytes = _max_bytes()
+    with _prune_lock:
+        entries = _scan()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        _cache_bytes = total
+        return removed
@@ -0,0 +1,138 @@
+"""Where and in which precision the models run.
+
+Four execution modes, from fastest to most frugal:
+
+- ``cuda``: every model resident on the GPU.
+- ``model_offload``: SDXL submodules move to the GPU one at a time
+  (``enable_model_cpu_offload``); a little slower, roughly half the VRAM.
+- ``sequential_offload``: weights stream to the GPU layer by layer
+  (``enable_sequential_cpu_offload``); slow, but fits in a few GB.
+- ``cpu``: no GPU at all, in float32 or bfloat16. Practical for upscale-only
+  work, drafts and small previews (CI, cheap worker nodes).
+
+``detect_backend`` picks a mode from the hardware unless the
+``execution_mode`` setting names one.
+"""
+
+import threading
+from dataclasses import dataclass
+from enum import Enum
+
+import torch
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.model_manager import estimate_model_size
+
+# Total VRAM needed to keep SDXL resident (fp16), and to offload it per model
+_CUDA_MIN_BYTES = 12 * 1024**3
+_MODEL_OFFLOAD_MIN_BYTES = 8 * 1024**3
+
+_CPU_DTYPES = {"float32": torch.float32, "bfloat16": torch.bfloat16}
+
+
+class ExecutionMode(Enum):
+    CUDA = "cuda"
+    MODEL_OFFLOAD = "model_offload"
+    SEQUENTIAL_OFFLOAD = "sequential_offload"
+    CPU = "cpu"
+
+
+@dataclass(frozen=True)
+class ExecutionBackend:
+    """A resolved execution mode, precision and device."""
+    mode: ExecutionMode
+    dtype: torch.dtype
+    device_name: str
+    total_memory: int | None = None
+    reason: str = ""
+
+    @property
+    def uses_cuda(self) -> bool:
+        return self.mode != ExecutionMode.CPU
+
+    @property
+    def device(self) -> torch.device:
+        """Device inputs, generators and the upscaler live on."""
+        return torch.device("cuda" if self.uses_cuda else "cpu")
+
+    @property
+    def half_upscaler(self) -> bool:
+        return self.uses_cuda and self.dtype == torch.float16
+
+    def prepare_pipeline(self, pipe) -> None:
+        """Place a freshly loaded diffusers pipeline according to the mode."""
+        if self.mode == ExecutionMode.CUDA:
+            pipe.to("cuda")
+        elif self.mode == ExecutionMode.MODEL_OFFLOAD:
+            pipe.enable_model_cpu_offload()
+        elif self.mode == ExecutionMode.SEQUENTIAL_OFFLOAD:
+            pipe.enable_sequential_cpu_offload()
+        else:
+            pipe.to("cpu")
+
+    def resident_bytes(self, model) -> int:
+        """Accelerator memory a cached SDXL pipeline keeps while idle."""
+        return estimate_model_size(model) if self.mode == ExecutionMode.CUDA else 0
+
+    def as_dict(self) -> dict:
+        return {
+            "mode": self.mode.value,
+            "dtype": str(self.dtype).removeprefix("torch."),
+            "device": self.device_name,
+            "total_memory": self.total_memory,
+            "reason": self.reason,
+        }
+
+
+def detect_backend(mode: str | None = None, cpu_dtype: str | None = None) -> ExecutionBackend:
+    """Resolve the execution backend for this machine.
+
+    Args:
+        mode: An ``ExecutionMode`` value or "auto". Defaults to settings.
+        cpu_dtype: "float32" or "bfloat16" for the CPU mode. Defaults to settings.
+    """
+    mode = mode or DEFAULT_SETTINGS["execution_mode"]
+    cpu_dtype = cpu_dtype or DEFAULT_SETTINGS["cpu_dtype"]
+    if cpu_dtype not in _CPU_DTYPES:
+        raise ValueError(f"Unknown CPU dtype: {cpu_dtype}. Choose from {list(_CPU_DTYPES)}")
+    cuda_dtype = torch.float16 if DEFAULT_SETTINGS["use_fp16"] else torch.float32
+
+    if not torch.cuda.is_available():
+        reason = "no CUDA device" if mode == "auto" else f"{mode} requested but no CUDA device"
+        return ExecutionBackend(ExecutionMode.CPU, _CPU_DTYPES[cpu_dtype], "cpu", reason=reason)
+
+    props = torch.cuda.get_device_properties(0)
+    total = props.total_memory
+    vram = f"{total / 1024**3:.0f} GB VRAM"
+    if mode != "auto":
+        selected, reason = ExecutionMode(mode), "set by execution_mode"
+    elif total >= _CUDA_MIN_BYTES:
+        selected, reason = ExecutionMode.CUDA, vram
+    elif total >= _MODEL_OFFLOAD_MIN_BYTES:
+        selected, reason = ExecutionMode.MODEL_OFFLOAD, f"{vram}, too little to keep SDXL resident"
+    else:
+        selected, reason = ExecutionMode.SEQUENTIAL_OFFLOAD, f"{vram}, too little for per-model offload"
+
+    if selected == ExecutionMode.CPU:
+        return ExecutionBackend(selected, _CPU_DTYPES[cpu_dtype], "cpu", reason=reason)
+    return ExecutionBackend(selected, cuda_dtype, props.name, total, reason)
+
+
+_backend: ExecutionBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_execution_backend() -> ExecutionBackend:
+    """Return the process-wide execution backend, detecting it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = detect_backend()
+        return _backend
+
+
+def set_execution_backend(backend: ExecutionBackend | None) -> None:
+    """Replace the process-wide execution backend (None = detect again on next use)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,220 @@
+"""Cache of SDXL text-encoder outputs for repeated prompts.
+
+Re-rolling a prompt with a new seed, and the shared default negative prompt,
+would otherwise run both CLIP text encoders on every generation. Encoded
+prompts are kept in an in-memory LRU bounded in bytes (on the CPU, so they
+survive the pipeline being evicted) with an optional on-disk tier under
+``EMBEDDING_DIR``.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import torch
+
+from src.config.settings import DEFAULT_SETTINGS, EMBEDDING_DIR
+
+# Bump when the encoding call changes so stale disk entries are ignored
+_ENCODER_VERSION = 1
+
+
+@dataclass
+class PromptEmbedding:
+    """Per-prompt SDXL conditioning: token embeddings (1, 77, 2048) and pooled (1, 1280)."""
+    prompt_embeds: torch.Tensor
+    pooled_prompt_embeds: torch.Tensor
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.numel() * t.element_size() for t in (self.prompt_embeds, self.pooled_prompt_embeds))
+
+    def to(self, device: torch.device | str, dtype: torch.dtype | None = None) -> "PromptEmbedding":
+        return PromptEmbedding(
+            self.prompt_embeds.to(device, dtype),
+            self.pooled_prompt_embeds.to(device, dtype),
+        )
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    disk_enabled: bool = False
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "disk_enabled": self.disk_enabled,
+        }
+
+
+def embedding_key(model_id: str, text: str, dtype: torch.dtype, clip_skip: int | None = None) -> str:
+    """Cache key for one prompt under one model and encoder configuration."""
+    raw = f"{_ENCODER_VERSION}\0{model_id}\0{dtype}\0{clip_skip}\0{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def encode_prompt(pipe, text: str, clip_skip: int | None = None) -> PromptEmbedding:
+    """Run both SDXL text encoders on one prompt, without classifier-free guidance pairing."""
+    prompt_embeds, _, pooled, _ = pipe.encode_prompt(
+        prompt=text,
+        device=pipe._execution_device,
+        num_images_per_prompt=1,
+        do_classifier_free_guidance=False,
+        clip_skip=clip_skip,
+    )
+    return PromptEmbedding(prompt_embeds, pooled)
+
+
+class PromptEmbeddingCache:
+    """LRU cache of prompt embeddings bounded by total tensor bytes.
+
+    Args:
+        max_bytes: Memory budget for cached embeddings. 0 disables the memory tier.
+        disk_dir: Directory for the on-disk tier. None disables it.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Path | None = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict[str, PromptEmbedding] = OrderedDict()
+        self._bytes = 0
+        self._stats = EmbeddingCacheStats(max_bytes=max_bytes, disk_enabled=disk_dir is not None)
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            self._stats.bytes = self._bytes
+            return self._stats.as_dict()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pt"
+
+    def _remember(self, key: str, embedding: PromptEmbedding) -> None:
+        size = embedding.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats.evictions += 1
+            self._entries[key] = embedding
+            self._bytes += size
+
+    def _load_disk(self, key: str) -> PromptEmbedding | None:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        if not path.exists():
+            return None
+        try:
+            data = torch.load(path, map_location="cpu", weights_only=True)
+            return PromptEmbedding(data["prompt_embeds"], data["pooled_prompt_embeds"])
+        except Exception:
+            # Corrupt or incompatible entry: re-encode and overwrite it
+            return None
+
+    def _store_disk(self, key: str, embedding: PromptEmbedding) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        torch.save({
+            "prompt_embeds": embedding.prompt_embeds,
+            "pooled_prompt_embeds": embedding.pooled_prompt_embeds,
+        }, tmp)
+        tmp.replace(path)
+
+    def get_or_encode(self, pipe, model_id: str, text: str, clip_skip: int | None = None) -> PromptEmbedding:
+        """Return the embedding of ``text`` on the pipeline's device, encoding it on a miss."""
+        device = pipe._execution_device
+        dtype = pipe.text_encoder_2.dtype
+        key = embedding_key(model_id, text, dtype, clip_skip)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+        if cached is not None:
+            return cached.to(device)
+
+        cached = self._load_disk(key)
+        if cached is not None:
+            with self._lock:
+                self._stats.disk_hits += 1
+            self._remember(key, cached)
+            return cached.to(device)
+
+        with self._lock:
+            self._stats.misses += 1
+        embedding = encode_prompt(pipe, text, clip_skip)
+        on_cpu = embedding.to("cpu")
+        self._remember(key, on_cpu)
+        self._store_disk(key, on_cpu)
+        return embedding
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def encode_batch(
+    cache: PromptEmbeddingCache,
+    pipe,
+    model_id: str,
+    prompts: list[str],
+    negative_prompts: list[str],
+) -> dict[str, torch.Tensor]:
+    """Look up (or encode) every prompt and negative prompt.
+
+    Returns:
+        Batched conditioning tensors, as keyword arguments for the SDXL pipeline.
+    """
+    positives = [cache.get_or_encode(pipe, model_id, p) for p in prompts]
+    negatives = [cache.get_or_encode(pipe, model_id, n) for n in negative_prompts]
+    return {
+        "prompt_embeds": torch.cat([e.prompt_embeds for e in positives]),
+        "pooled_prompt_embeds": torch.cat([e.pooled_prompt_embeds for e in positives]),
+        "negative_prompt_embeds": torch.cat([e.prompt_embeds for e in negatives]),
+        "negative_pooled_prompt_embeds": torch.cat([e.pooled_prompt_embeds for e in negatives]),
+    }
+
+
+_cache: PromptEmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> PromptEmbeddingCache:
+    """Return the process-wide prompt embedding cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptEmbeddingCache(
+                max_bytes=int(DEFAULT_SETTINGS["embedding_cache_mb"] * 1024**2),
+                disk_dir=EMBEDDING_DIR if DEFAULT_SETTINGS["embedding_cache_disk"] else None,
+            )
+        return _cache
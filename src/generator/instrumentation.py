@@ -0,0 +1,300 @@
+"""Per-stage spans of a pipeline run: wall time, CPU time and peak memory.
+
+A ``Trace`` collects the spans of one run. Code running inside it opens
+spans with ``span()``/``start_span()``, which record into the trace
+activated with ``use_trace`` and do nothing otherwise, so the generator
+backends need no extra parameters. Every finished span is also folded into
+process-wide Prometheus histograms by stage and resolution (``/metrics``).
+
+Memory peaks are process-wide and sampled: current RSS is read, and CUDA's
+allocator peak collected and reset, whenever a span opens or closes and on
+``sample()`` (called per upscale tile), and credited to every open span.
+CPU time is process CPU time, so it includes torch's intra-op threads but
+also any other work that overlaps the span.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+import torch
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans range from sub-10 ms denoise steps to multi-minute upscales
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# Identity equality: open spans are tracked by object, and equal timings are common
+@dataclass(eq=False)
+class Span:
+    """One timed stage. ``resolution`` is the size the stage works at ("WxH")."""
+    name: str
+    resolution: str | None = None
+    wall_seconds: float = 0.0
+    cpu_seconds: float | None = None
+    peak_rss_bytes: int | None = None
+    peak_cuda_bytes: int | None = None
+    attrs: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None and v != {}}
+
+
+def resolution_label(width: int, height: int) -> str:
+    return f"{width}x{height}"
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes (Linux only; None elsewhere)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cuda_active() -> bool:
+    # Never initialize CUDA just to measure it
+    return torch.cuda.is_available() and torch.cuda.is_initialized()
+
+
+# Spans open anywhere in the process; memory samples are credited to all of them
+_open: list[Span] = []
+_open_lock = threading.Lock()
+
+
+def _fold_memory() -> None:
+    """Credit current RSS and the CUDA peak since the last fold to every open span.
+
+    Caller holds ``_open_lock``.
+    """
+    rss = current_rss()
+    cuda = None
+    if _cuda_active():
+        cuda = torch.cuda.max_memory_allocated()
+        torch.cuda.reset_peak_memory_stats()
+    for s in _open:
+        if rss is not None:
+            s.peak_rss_bytes = max(s.peak_rss_bytes or 0, rss)
+        if cuda is not None:
+            s.peak_cuda_bytes = max(s.peak_cuda_bytes or 0, cuda)
+
+
+def sample() -> None:
+    """Take a memory sample for the open spans (cheap; call from hot loops)."""
+    with _open_lock:
+        if _open:
+            _fold_memory()
+
+
+class ActiveSpan:
+    """A span that has started; ``end()`` records it, ``cancel()`` drops it."""
+
+    def __init__(self, trace: "Trace | None", span: Span):
+        self.trace = trace
+        self.span = span
+        if trace is None:
+            return
+        with _open_lock:
+            _fold_memory()
+            span.peak_rss_bytes = current_rss()
+            if _cuda_active():
+                span.peak_cuda_bytes = torch.cuda.memory_allocated()
+            _open.append(span)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def _close(self) -> bool:
+        if self.trace is None:
+            return False
+        with _open_lock:
+            if self.span not in _open:
+                return False
+            _fold_memory()
+            _open.remove(self.span)
+        return True
+
+    def end(self) -> Span:
+        if self._close():
+            self.span.wall_seconds = time.perf_counter() - self._wall
+            self.span.cpu_seconds = time.process_time() - self._cpu
+            self.trace.add(self.span)
+        return self.span
+
+    def cancel(self) -> None:
+        self._close()
+
+
+class Trace:
+    """The spans of one pipeline run, in completion order."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def start(self, name: str, resolution: str | None = None, **attrs) -> ActiveSpan:
+        return ActiveSpan(self, Span(name, resolution, attrs=attrs))
+
+    @contextmanager
+    def span(self, name: str, resolution: str | None = None, **attrs) -> Iterator[Span]:
+        active = self.start(name, resolution, **attrs)
+        try:
+            yield active.span
+        finally:
+            active.end()
+
+    def add(self, span: Span) -> None:
+        """Record a finished span (also one measured elsewhere, e.g. in the encoder)."""
+        with self._lock:
+            self.spans.append(span)
+        get_stage_metrics().observe(span)
+
+    def summary(self) -> dict[str, dict]:
+        """Totals per stage name: count, wall and CPU seconds, peak memory."""
+        with self._lock:
+            spans = list(self.spans)
+        stages: dict[str, dict] = {}
+        for s in spans:
+            entry = stages.setdefault(s.name, {"count": 0, "wall_seconds": 0.0})
+            entry["count"] += 1
+            entry["wall_seconds"] = round(entry["wall_seconds"] + s.wall_seconds, 6)
+            if s.cpu_seconds is not None:
+                entry["cpu_seconds"] = round(entry.get("cpu_seconds", 0.0) + s.cpu_seconds, 6)
+            for key in ("peak_rss_bytes", "peak_cuda_bytes"):
+                value = getattr(s, key)
+                if value is not None:
+                    entry[key] = max(entry.get(key, 0), value)
+        return stages
+
+
+_current: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def use_trace(trace: Trace) -> Iterator[Trace]:
+    """Record spans opened in this context (thread / task) into ``trace``."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def start_span(name: str, resolution: str | None = None, **attrs) -> ActiveSpan:
+    """Start a span in the current trace; a no-op span when there is none."""
+    return ActiveSpan(_current.get(), Span(name, resolution, attrs=attrs))
+
+
+@contextmanager
+def span(name: str, resolution: str | None = None, **attrs) -> Iterator[Span]:
+    """Time a block as a span of the current trace, if any."""
+    active = start_span(name, resolution, **attrs)
+    try:
+        yield active.span
+    finally:
+        active.end()
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(stage: str, resolution: str, le: float | None = None) -> str:
+    def esc(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    parts = [f'stage="{esc(stage)}"', f'resolution="{esc(resolution)}"']
+    if le is not None:
+        parts.append(f'le="{"+Inf" if math.isinf(le) else repr(float(le))}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class StageMetrics:
+    """Process-wide span aggregates by stage and resolution, in Prometheus text format."""
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._wall: dict[tuple[str, str], _Histogram] = {}
+        self._cpu: dict[tuple[str, str], _Histogram] = {}
+        self._rss: dict[tuple[str, str], int] = {}
+        self._cuda: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span) -> None:
+        key = (span.name, span.resolution or "")
+        with self._lock:
+            self._wall.setdefault(key, _Histogram(self.buckets)).observe(span.wall_seconds)
+            if span.cpu_seconds is not None:
+                self._cpu.setdefault(key, _Histogram(self.buckets)).observe(span.cpu_seconds)
+            if span.peak_rss_bytes is not None:
+                self._rss[key] = max(self._rss.get(key, 0), span.peak_rss_bytes)
+            if span.peak_cuda_bytes is not None:
+                self._cuda[key] = max(self._cuda.get(key, 0), span.peak_cuda_bytes)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, help_text, series in (
+                ("wallpaper_stage_seconds", "Wall time per pipeline stage.", self._wall),
+                ("wallpaper_stage_cpu_seconds", "Process CPU time per pipeline stage.", self._cpu),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (stage, resolution), hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{name}_bucket{_labels(stage, resolution, bound)} {count}")
+                    lines.append(f"{name}_bucket{_labels(stage, resolution, math.inf)} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(stage, resolution)} {hist.total!r}")
+                    lines.append(f"{name}_count{_labels(stage, resolution)} {hist.count}")
+            for name, help_text, values in (
+                ("wallpaper_stage_peak_rss_bytes", "Highest sampled process RSS during a stage.", self._rss),
+                ("wallpaper_stage_peak_cuda_bytes", "Highest CUDA allocation during a stage.", self._cuda),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                for (stage, resolution), value in sorted(values.items()):
+                    lines.append(f"{name}{_labels(stage, resolution)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics: StageMetrics | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_stage_metrics() -> StageMetrics:
+    """Return the process-wide stage metrics, creating them on first use."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = StageMetrics()
+        return _metrics
+
+
+def set_stage_metrics(metrics: StageMetrics | None) -> None:
+    """Replace the process-wide stage metrics (e.g. to forward spans from a worker process)."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = metrics
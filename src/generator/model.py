@@ -1,16 +1,24 @@
 import torch
+import diffusers
 from diffusers import StableDiffusionXLPipeline
 from pathlib import Path
 
+from src.config.profiles import SCHEDULERS
 from src.config.settings import MODEL_DIR, DEFAULT_SETTINGS
+from src.generator.device import ExecutionBackend, ExecutionMode, get_execution_backend
 
 
 def load_sdxl_pipeline(
     model_id: str | None = None,
     use_fp16: bool | None = None,
     enable_attention_slicing: bool | None = None,
+    backend: ExecutionBackend | None = None,
 ) -> StableDiffusionXLPipeline:
-    """Load and configure the Stable Diffusion XL pipeline on GPU."""
+    """Load and configure the Stable Diffusion XL pipeline for the execution backend.
+
+    ``use_fp16`` only applies on CUDA; the CPU precision comes from the backend.
+    """
+    backend = backend or get_execution_backend()
     model_id = model_id or DEFAULT_SETTINGS["model_id"]
     use_fp16 = use_fp16 if use_fp16 is not None else DEFAULT_SETTINGS["use_fp16"]
     enable_attention_slicing = (
@@ -19,7 +27,10 @@ def load_sdxl_pipeline(
         else DEFAULT_SETTINGS["enable_attention_slicing"]
     )
 
-    dtype = torch.float16 if use_fp16 else torch.float32
+    if backend.uses_cuda:
+        dtype = torch.float16 if use_fp16 else torch.float32
+    else:
+        dtype = backend.dtype
 
     pipe = StableDiffusionXLPipeline.from_pretrained(
         model_id,
@@ -27,9 +38,10 @@ def load_sdxl_pipeline(
         cache_dir=str(MODEL_DIR),
         use_safetensors=True,
     )
-    pipe = pipe.to("cuda")
+    backend.prepare_pipeline(pipe)
 
-    if enable_attention_slicing:
+    # Slicing saves VRAM at some speed cost; sequential offload already streams layers
+    if enable_attention_slicing and backend.mode != ExecutionMode.SEQUENTIAL_OFFLOAD:
         pipe.enable_attention_slicing()
 
     pipe.enable_vae_tiling()
@@ -37,6 +49,30 @@ def load_sdxl_pipeline(
     return pipe
 
 
+def set_scheduler(pipe: StableDiffusionXLPipeline, name: str | None = None) -> None:
+    """Swap the pipeline's scheduler in place; the model weights are untouched.
+
+    Args:
+        pipe: Loaded (possibly cached) SDXL pipeline.
+        name: Key of ``SCHEDULERS``. Defaults to settings.
+    """
+    name = name or DEFAULT_SETTINGS["scheduler"]
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}")
+    if getattr(pipe, "scheduler_name", "default") == name:
+        return
+    if not hasattr(pipe, "default_scheduler"):
+        pipe.default_scheduler = pipe.scheduler
+
+    if SCHEDULERS[name] is None:
+        pipe.scheduler = pipe.default_scheduler
+    else:
+        class_name, overrides = SCHEDULERS[name]
+        scheduler_cls = getattr(diffusers, class_name)
+        pipe.scheduler = scheduler_cls.from_config(pipe.default_scheduler.config, **overrides)
+    pipe.scheduler_name = name
+
+
 def unload_pipeline(pipe: StableDiffusionXLPipeline) -> None:
     """Unload pipeline and free GPU memory."""
     import gc
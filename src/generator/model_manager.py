@@ -0,0 +1,282 @@
+"""Process-wide cache that keeps generation models resident between requests.
+
+Models are registered by kind (e.g. "sdxl", "upscaler") with a loader, an
+unloader and an optional size estimator. ``ModelManager.get`` returns a warm
+model when one is cached and otherwise loads it, evicting least-recently-used
+models until the new one fits in the memory budget. In low-memory mode every
+``release`` unloads the model immediately, which reproduces the original
+load-generate-unload behaviour.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+from src.config.settings import DEFAULT_SETTINGS
+
+
+ModelKey = tuple[str, Hashable]
+
+
+@dataclass
+class ModelLoader:
+    """How to load, unload and size one kind of model."""
+    load: Callable[[Hashable], Any]
+    unload: Callable[[Any], None]
+    estimate_size: Callable[[Any], int] | None = None
+
+
+@dataclass
+class ModelManagerStats:
+    loads: dict[ModelKey, int] = field(default_factory=dict)
+    evictions: dict[ModelKey, int] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": {f"{k[0]}:{k[1]}": v for k, v in self.loads.items()},
+            "evictions": {f"{k[0]}:{k[1]}": v for k, v in self.evictions.items()},
+        }
+
+
+@dataclass
+class _CacheEntry:
+    model: Any
+    size_bytes: int
+    in_use: int = 0
+
+
+def estimate_model_size(model: Any) -> int:
+    """Estimate the memory footprint of a model from its torch parameters and buffers.
+
+    Understands diffusers pipelines (``components``), tiled upscalers (``model``) and
+    plain ``torch.nn.Module`` instances. Returns 0 for anything else.
+    """
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    def _module_bytes(module) -> int:
+        total = 0
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+        return total
+
+    if isinstance(model, torch.nn.Module):
+        return _module_bytes(model)
+    components = getattr(model, "components", None)
+    if isinstance(components, dict):
+        return sum(_module_bytes(c) for c in components.values() if isinstance(c, torch.nn.Module))
+    inner = getattr(model, "model", None)
+    if isinstance(inner, torch.nn.Module):
+        return _module_bytes(inner)
+    return 0
+
+
+def detect_memory_budget() -> int | None:
+    """Return the usable accelerator memory in bytes, or None if unbounded."""
+    budget_gb = DEFAULT_SETTINGS.get("model_cache_budget_gb")
+    if budget_gb is not None:
+        return int(budget_gb * 1024**3)
+    try:
+        import torch
+    except ImportError:
+        return None
+    if not torch.cuda.is_available():
+        return None
+    total = torch.cuda.get_device_properties(0).total_memory
+    # Leave headroom for activations during diffusion and upscaling
+    return int(total * 0.7)
+
+
+class ModelManager:
+    """LRU cache of loaded models bounded by a memory budget.
+
+    Args:
+        budget_bytes: Maximum combined size of resident models. None = unbounded.
+        low_memory: Unload every model as soon as it is released.
+    """
+
+    def __init__(self, budget_bytes: int | None = None, low_memory: bool = False):
+        self.budget_bytes = budget_bytes
+        self.low_memory = low_memory
+        self.stats = ModelManagerStats()
+        self._loaders: dict[str, ModelLoader] = {}
+        self._entries: OrderedDict[ModelKey, _CacheEntry] = OrderedDict()
+        # Last measured size of every model loaded so far, resident or not
+        self._sizes: dict[ModelKey, int] = {}
+        # Models being loaded outside the lock, set once each is in the cache (or failed)
+        self._loading: dict[ModelKey, threading.Event] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        kind: str,
+        load: Callable[[Hashable], Any],
+        unload: Callable[[Any], None],
+        estimate_size: Callable[[Any], int] | None = None,
+    ) -> None:
+        """Register the loader used for models of the given kind."""
+        self._loaders[kind] = ModelLoader(load, unload, estimate_size)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def loaded_models(self) -> list[ModelKey]:
+        """Return the keys of resident models, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def is_loaded(self, kind: str, name: Hashable) -> bool:
+        with self._lock:
+            return (kind, name) in self._entries
+
+    def get(self, kind: str, name: Hashable) -> Any:
+        """Return a loaded model, loading it (and evicting others) if necessary.
+
+        The cache lock is not held while a model loads, so lookups and other
+        models' ``get``/``release`` carry on; concurrent ``get`` calls for the
+        model being loaded wait for that load.
+
+        Every ``get`` must be paired with a ``release`` once the caller is done.
+        """
+        key = (kind, name)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.stats.hits += 1
+                    self._entries.move_to_end(key)
+                    entry.in_use += 1
+                    return entry.model
+                loading = self._loading.get(key)
+                if loading is None:
+                    if kind not in self._loaders:
+                        raise KeyError(f"No loader registered for model kind: {kind}")
+                    loader = self._loaders[kind]
+                    self.stats.misses += 1
+                    # Evict everything idle before loading in low-memory mode, so
+                    # only one model is ever resident at a time. Otherwise make room
+                    # for the new model's expected size first, so the old models and
+                    # the new one never overshoot the budget together while it loads.
+                    if self.low_memory:
+                        self._evict_until(0)
+                    elif self.budget_bytes is not None:
+                        expected = self._expected_size(key) + self._loading_bytes()
+                        self._evict_until(max(0, self.budget_bytes - expected))
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Another thread is loading this model; take it from the cache once it lands
+            loading.wait()
+
+        try:
+            model = loader.load(name)
+            size = (loader.estimate_size or estimate_model_size)(model)
+        except BaseException:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            self._sizes[key] = size
+            self.stats.loads[key] = self.stats.loads.get(key, 0) + 1
+            # Correct for a first load or a model that grew since it was measured
+            if self.budget_bytes is not None:
+                self._evict_until(max(0, self.budget_bytes - size - self._loading_bytes()))
+            self._entries[key] = _CacheEntry(model=model, size_bytes=size, in_use=1)
+        loading.set()
+        return model
+
+    def release(self, kind: str, name: Hashable) -> None:
+        """Mark a model as no longer in use. Unloads it in low-memory mode."""
+        key = (kind, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.in_use = max(0, entry.in_use - 1)
+            if self.low_memory and entry.in_use == 0:
+                self._evict(key)
+
+    def evict(self, kind: str, name: Hashable) -> bool:
+        """Unload a specific model if it is resident and idle."""
+        key = (kind, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.in_use:
+                return False
+            self._evict(key)
+            return True
+
+    def clear(self) -> None:
+        """Unload every idle model."""
+        with self._lock:
+            self._evict_until(0)
+
+    def _expected_size(self, key: ModelKey) -> int:
+        """Last measured size of a model, else the largest of its kind measured so far, else 0."""
+        if key in self._sizes:
+            return self._sizes[key]
+        return max((size for (kind, _), size in self._sizes.items() if kind == key[0]), default=0)
+
+    def _loading_bytes(self) -> int:
+        """Expected size of the models other threads are loading right now."""
+        return sum(self._expected_size(key) for key in self._loading)
+
+    def _evict_until(self, max_resident_bytes: int) -> None:
+        for key in list(self._entries):
+            if self.resident_bytes <= max_resident_bytes:
+                break
+            if self._entries[key].in_use:
+                continue
+            self._evict(key)
+
+    def _evict(self, key: ModelKey) -> None:
+        entry = self._entries.pop(key)
+        self.stats.evictions[key] = self.stats.evictions.get(key, 0) + 1
+        self._loaders[key[0]].unload(entry.model)
+
+
+_manager: ModelManager | None = None
+_manager_lock = threading.Lock()
+
+
+def _register_default_loaders(manager: ModelManager) -> None:
+    from src.generator.backends import GENERATOR_KIND, UPSCALER_KIND, get_backend
+
+    backend = get_backend()
+    for kind in (GENERATOR_KIND, UPSCALER_KIND):
+        manager.register(
+            kind,
+            load=lambda name, _kind=kind: backend.load(_kind, name),
+            unload=lambda model, _kind=kind: backend.unload(_kind, model),
+            estimate_size=lambda model, _kind=kind: backend.model_bytes(_kind, model),
+        )
+
+
+def get_model_manager() -> ModelManager:
+    """Return the process-wide model manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager(
+                budget_bytes=detect_memory_budget(),
+                low_memory=DEFAULT_SETTINGS.get("low_memory_mode", False),
+            )
+            _register_default_loaders(_manager)
+        return _manager
+
+
+def set_model_manager(manager: ModelManager | None) -> None:
+    """Replace the process-wide model manager (e.g. with stub loaders)."""
+    global _manager
+    with _manager_lock:
+        _manager = manager
@@ -1,23 +1,38 @@
 """Two-stage wallpaper generation pipeline orchestrator.
 
 Combines SDXL base generation and Real-ESRGAN upscaling into a single
-pipeline with state management, sequential model loading for memory
-optimization, and error handling.
+pipeline with state management, cached model loading via the model
+manager, and error handling.
 """
 
-from dataclasses import dataclass, field
+from concurrent.futures import Future
+import hashlib
+import json
+import secrets
+import time
+from dataclasses import dataclass, field, replace
 from enum import Enum
+from pathlib import Path
 from typing import Callable
 
 import torch
 from PIL import Image
 
 from src.config.settings import DEFAULT_SETTINGS, ensure_directories
-from src.config.presets import calculate_base_resolution
-from src.generator.model import load_sdxl_pipeline, unload_pipeline
-from src.generator.pipeline import generate_base_image
-from src.generator.upscaler import load_upscaler, upscale_image, unload_upscaler
+from src.config.presets import DevicePreset, calculate_base_resolution, get_preset_by_name
+from src.generator.base_cache import load_base_image, store_base_image
+from src.generator.backends import GENERATOR_KIND, UPSCALER_KIND, get_backend
+from src.generator.instrumentation import (
+    Span, Trace, current_trace, resolution_label, sample, span, use_trace,
+)
+from src.generator.model_manager import ModelManager, get_model_manager
+from src.generator.previews import PreviewThrottle, latents_to_jpegs
+from src.generator.upscaler import UPSCALER_MODELS, plan_upscale_models
+from src.utils.derivatives import generate_derivatives
+from src.utils.encoding import EncodeOptions, get_image_saver
 from src.utils.file_utils import get_output_path, save_metadata
+from src.utils.image_buffer import ImageBuffer, record_copy
+from src.utils.image_utils import create_thumbnail, image_to_bytes, resize_to_cover
 
 
 class PipelineStage(Enum):
@@ -28,6 +43,7 @@ class PipelineStage(Enum):
     LOADING_UPSCALER = "loading_upscaler"
     UPSCALING = "upscaling"
     SAVING = "saving"
+    SAVED = "saved"
     COMPLETE = "complete"
     ERROR = "error"
 
@@ -41,17 +57,455 @@ class PipelineResult:
     base_resolution: tuple[int, int] | None = None
     target_resolution: tuple[int, int] | None = None
     seed_used: int | None = None
+    preset_name: str | None = None
     error: str | None = None
+    # Resolves to the output path once the encoded file is on disk
+    saved: Future | None = None
+    # Per-stage timings; the encode and save spans are added when the file lands
+    spans: list[Span] = field(default_factory=list)
+
+    def wait_saved(self, timeout: float | None = None) -> Path | None:
+        """Block until the output file is written; raises if encoding failed."""
+        return self.saved.result(timeout) if self.saved is not None else None
+
+
+@dataclass
+class MultiTargetResult:
+    """Result of a multi-target run: one PipelineResult per requested preset."""
+    results: list[PipelineResult] = field(default_factory=list)
+    seed_used: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class Draft:
+    """One low-step, low-resolution render of a seed."""
+    seed: int
+    image: Image.Image
+    thumbnail: bytes  # JPEG
+
+
+@dataclass
+class DraftGridResult:
+    """Result of a draft grid: one Draft per seed, in seed order."""
+    drafts: list[Draft] = field(default_factory=list)
+    base_resolution: tuple[int, int] | None = None
+    num_inference_steps: int | None = None
+    error: str | None = None
+    spans: list[Span] = field(default_factory=list)
+
+
+@dataclass
+class GenerationRequest:
+    """Parameters of a single wallpaper generation."""
+    prompt: str
+    target_width: int
+    target_height: int
+    negative_prompt: str | None = None
+    num_inference_steps: int | None = None
+    guidance_scale: float | None = None
+    seed: int | None = None
+    enable_upscaling: bool | None = None
+    upscale_model: str | None = None
+    encode: EncodeOptions | None = None
+    preview_every: int | None = None
+    scheduler: str | None = None
+    profile: str | None = None
+    # Keep the base image in the base cache; cleared when the seed is drawn at random
+    cache_base: bool = True
+
+    @property
+    def base_resolution(self) -> tuple[int, int]:
+        return calculate_base_resolution(self.target_width, self.target_height)
+
+    def batch_key(self) -> str:
+        """Requests with equal keys can share one batched diffusion pass."""
+        base_w, base_h = self.base_resolution
+        steps = self.num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
+        guidance = self.guidance_scale or DEFAULT_SETTINGS["guidance_scale"]
+        scheduler = self.scheduler or DEFAULT_SETTINGS["scheduler"]
+        return f"{DEFAULT_SETTINGS['model_id']}:{base_w}x{base_h}:{steps}:{guidance}:{scheduler}"
+
+    def base_key(self) -> str | None:
+        """Identity of the diffusion output; None unless the seed is fixed.
+
+        Covers everything that determines the base image: backend, model,
+        prompts, seed, scheduler, steps, guidance and base resolution.
+        """
+        if self.seed is None or self.seed < 0:
+            return None
+        return _result_key({
+            "backend": DEFAULT_SETTINGS["generator_backend"],
+            "model_id": DEFAULT_SETTINGS["model_id"],
+            "prompt": self.prompt.strip(),
+            "negative_prompt": (self.negative_prompt or DEFAULT_SETTINGS["negative_prompt"]).strip(),
+            "seed": self.seed,
+            "scheduler": self.scheduler or DEFAULT_SETTINGS["scheduler"],
+            "num_inference_steps": self.num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"],
+            "guidance_scale": float(self.guidance_scale or DEFAULT_SETTINGS["guidance_scale"]),
+            "base_resolution": list(self.base_resolution),
+        })
+
+    def content_key(self, upscale_to: tuple[int, int] | None = None) -> str | None:
+        """Identity of the final image; None unless the seed is fixed.
+
+        Adds the target and the resolved upscaler chain to ``base_key``. The
+        output format is not part of the key: a different format is a re-encode.
+
+        Args:
+            upscale_to: Size the base image is upscaled to before the final
+                crop, when it differs from the target (multi-target covers).
+        """
+        base_key = self.base_key()
+        if base_key is None:
+            return None
+        base_w, base_h = self.base_resolution
+        upscale_w, upscale_h = upscale_to or (self.target_width, self.target_height)
+        enable_upscaling = self.enable_upscaling
+        if enable_upscaling is None:
+            enable_upscaling = DEFAULT_SETTINGS["enable_upscaling"]
+        upscale_model = self.upscale_model or DEFAULT_SETTINGS["upscale_model"]
+        return _result_key({
+            "base_key": base_key,
+            "target_resolution": [self.target_width, self.target_height],
+            "upscale_to": [upscale_w, upscale_h],
+            "upscale_passes": (
+                plan_upscale_models(upscale_model, base_w, base_h, upscale_w, upscale_h)
+                if enable_upscaling else []
+            ),
+        })
+
+
+# Bump when the pipeline changes in ways that alter outputs for the same inputs
+_RESULT_KEY_VERSION = 1
+
+
+def _result_key(fields: dict) -> str:
+    raw = json.dumps({"version": _RESULT_KEY_VERSION, **fields}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
 ProgressCallback = Callable[[PipelineStage, float, str], None]
 """Callback signature: (stage, progress 0-1, message)"""
 
+PreviewCallback = Callable[[int, int, bytes], None]
+"""Callback signature: (step, total steps, JPEG bytes)"""
+
+DraftCallback = Callable[[int, int, bytes], None]
+"""Callback signature: (draft index, seed, JPEG thumbnail)"""
+
+DRAFT_THUMBNAIL_SIZE = (384, 384)
+
+MAX_SEED = 2**32 - 1
+
+OOM_MESSAGE = "Out of GPU memory. Try a smaller resolution or close other GPU applications."
+
 
 def _default_progress(stage: PipelineStage, progress: float, message: str) -> None:
     pass
 
 
+def resolve_seed(seed: int | None) -> int:
+    """Return ``seed``, or a freshly drawn one when it is None or negative.
+
+    Every image gets a concrete seed so it can be reproduced (and cached).
+    """
+    if _seed_given(seed):
+        return seed
+    return secrets.randbelow(MAX_SEED + 1)
+
+
+def _seed_given(seed: int | None) -> bool:
+    return seed is not None and seed >= 0
+
+
+def _preview_throttle(requests: list[GenerationRequest]) -> PreviewThrottle:
+    """Throttle for a batch: the most frequent preview rate any request asked for."""
+    rates = [
+        r.preview_every if r.preview_every is not None else DEFAULT_SETTINGS["preview_every"]
+        for r in requests
+    ]
+    wanted = [rate for rate in rates if rate > 0]
+    return PreviewThrottle(min(wanted) if wanted else 0, budget=DEFAULT_SETTINGS["preview_budget"])
+
+
+def _generate_stage(
+    manager: ModelManager,
+    model_id: str,
+    progress: ProgressCallback,
+    requests: list[GenerationRequest],
+    previews: list[PreviewCallback | None] | None = None,
+) -> list[ImageBuffer]:
+    """Stage 1: base images for compatible requests, reused from the base cache
+    when possible and otherwise generated in one SDXL batch.
+
+    ``previews`` holds one optional callback per request that receives JPEG
+    previews decoded from the latents while diffusion runs.
+    """
+    previews = previews or [None] * len(requests)
+    base_images: list[ImageBuffer | None] = []
+    for r in requests:
+        cached = load_base_image(r.base_key())
+        base_images.append(ImageBuffer.from_pil(cached) if cached is not None else None)
+    missing = [i for i, image in enumerate(base_images) if image is None]
+    if len(missing) < len(requests):
+        reused = len(requests) - len(missing)
+        progress(PipelineStage.GENERATING, 0.0, f"Reusing {reused} cached base image(s)...")
+    if not missing:
+        progress(PipelineStage.GENERATING, 1.0, "Base image reused.")
+        return base_images
+
+    generated = _diffuse(
+        manager, model_id, progress,
+        [requests[i] for i in missing], [previews[i] for i in missing],
+    )
+    for i, image in zip(missing, generated):
+        base_images[i] = image
+        if requests[i].cache_base:
+            store_base_image(requests[i].base_key(), image.pil())
+    return base_images
+
+
+def _diffuse(
+    manager: ModelManager,
+    model_id: str,
+    progress: ProgressCallback,
+    requests: list[GenerationRequest],
+    previews: list[PreviewCallback | None],
+) -> list[ImageBuffer]:
+    """Run one batched diffusion pass for the given requests."""
+    first = requests[0]
+    base_w, base_h = first.base_resolution
+    resolution = resolution_label(base_w, base_h)
+
+    cached = manager.is_loaded(GENERATOR_KIND, model_id)
+    if cached:
+        progress(PipelineStage.LOADING_MODEL, 0.0, "Using cached SDXL model...")
+    else:
+        progress(PipelineStage.LOADING_MODEL, 0.0, "Loading SDXL model...")
+    with span("load_model", resolution, model=model_id, cached=cached):
+        pipe = manager.get(GENERATOR_KIND, model_id)
+    try:
+        progress(PipelineStage.LOADING_MODEL, 1.0, "Model loaded.")
+        what = "base image" if len(requests) == 1 else f"batch of {len(requests)} base images"
+        progress(PipelineStage.GENERATING, 0.0, f"Generating {base_w}x{base_h} {what}...")
+
+        # Forward per-step progress and throttled latent previews
+        step_count = first.num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
+
+        throttle = _preview_throttle(requests) if any(previews) else PreviewThrottle(0)
+
+        def _on_step(step: int, latents: torch.Tensor | None) -> None:
+            frac = (step + 1) / step_count
+            progress(PipelineStage.GENERATING, frac, f"Step {step + 1}/{step_count}")
+            if latents is not None and throttle.should_preview(step) and step + 1 < step_count:
+                start = time.perf_counter()
+                frames = latents_to_jpegs(latents)
+                for on_preview, frame in zip(previews, frames):
+                    if on_preview is not None:
+                        on_preview(step + 1, step_count, frame)
+                throttle.record(step, time.perf_counter() - start)
+
+        base_images = get_backend().generate(
+            pipe,
+            prompts=[r.prompt for r in requests],
+            target_width=first.target_width,
+            target_height=first.target_height,
+            seeds=[r.seed for r in requests],
+            negative_prompts=[r.negative_prompt for r in requests],
+            num_inference_steps=first.num_inference_steps,
+            guidance_scale=first.guidance_scale,
+            on_step=_on_step,
+            scheduler=first.scheduler,
+        )
+        progress(PipelineStage.GENERATING, 1.0, "Base image generated.")
+    finally:
+        # Release the pipeline; the manager frees VRAM only in low-memory mode
+        # or when the upscaler needs the space.
+        with span("unload_model", resolution, model=model_id):
+            manager.release(GENERATOR_KIND, model_id)
+    progress(PipelineStage.UNLOADING_MODEL, 1.0, "Generation model released.")
+    return base_images
+
+
+def _upscale_stage(
+    manager: ModelManager,
+    models: list[str],
+    progress: ProgressCallback,
+    image: ImageBuffer,
+    target_width: int,
+    target_height: int,
+) -> ImageBuffer:
+    """Stage 2: upscale an image through a chain of (cached) Real-ESRGAN models.
+
+    Intermediate passes keep the model's native scale; the last pass is
+    resized to the exact target. An empty chain is a plain Lanczos resize.
+    Passes hand each other tensors; nothing is converted to PIL in between.
+    """
+    if not models:
+        progress(PipelineStage.UPSCALING, 0.0, f"Resizing to {target_width}x{target_height}...")
+        with span("upscale", resolution_label(target_width, target_height), model="lanczos"):
+            resized = _lanczos(image, target_width, target_height)
+        progress(PipelineStage.UPSCALING, 1.0, "Lanczos resize complete (no model needed).")
+        return resized
+
+    for index, model_name in enumerate(models):
+        step = f"[pass {index + 1}/{len(models)}] " if len(models) > 1 else ""
+        progress(PipelineStage.LOADING_UPSCALER, 0.0, f"{step}Loading {model_name}...")
+        with span("load_upscaler", model=model_name):
+            upscaler = manager.get(UPSCALER_KIND, model_name)
+        try:
+            progress(PipelineStage.LOADING_UPSCALER, 1.0, f"{step}Upscaler loaded.")
+            if index == len(models) - 1:
+                pass_w, pass_h = target_width, target_height
+            else:
+                scale = UPSCALER_MODELS[model_name]["scale"]
+                pass_w, pass_h = image.width * scale, image.height * scale
+            progress(
+                PipelineStage.UPSCALING, index / len(models),
+                f"{step}Upscaling to {pass_w}x{pass_h}...",
+            )
+
+            def _on_tile(done: int, total: int) -> None:
+                sample()
+                progress(
+                    PipelineStage.UPSCALING, (index + done / total) / len(models),
+                    f"{step}Upscaling tile {done}/{total}...",
+                )
+
+            with span("upscale", resolution_label(pass_w, pass_h), model=model_name, step=index + 1):
+                image, stats = get_backend().upscale(upscaler, image, pass_w, pass_h, on_tile=_on_tile)
+            progress(
+                PipelineStage.UPSCALING, (index + 1) / len(models),
+                f"{step}Upscaling complete ({stats.tiles} tiles, {stats.tiles_per_second:.1f} tiles/s).",
+            )
+        finally:
+            with span("unload_upscaler", model=model_name):
+                manager.release(UPSCALER_KIND, model_name)
+    return image
+
+
+def _lanczos(image: ImageBuffer, width: int, height: int) -> ImageBuffer:
+    resized = image.pil().resize((width, height), Image.LANCZOS)
+    record_copy(resized)
+    return ImageBuffer.from_pil(resized)
+
+
+def _passes_factor(models: list[str]) -> int:
+    """Total model upscale factor of a pass chain (1 = Lanczos only)."""
+    factor = 1
+    for name in models:
+        factor *= UPSCALER_MODELS[name]["scale"]
+    return factor
+
+
+def _save_stage(
+    image: Image.Image,
+    prompt: str,
+    metadata: dict,
+    progress: ProgressCallback,
+    encode: EncodeOptions | None = None,
+) -> tuple[Path, Future]:
+    """Hand the final image to the background encoder.
+
+    The sidecar, gallery index entry and derivatives are written once the
+    file is on disk, followed by a SAVED progress event. When a trace is
+    active, the encode and save spans are added to it and the sidecar gets
+    the per-stage totals under "timings".
+
+    Returns:
+        (planned output path, future resolving when the file is saved)
+    """
+    encode = encode or EncodeOptions.from_settings()
+    width, height = image.size
+    progress(PipelineStage.SAVING, 0.0, f"Encoding {width}x{height} {encode.format.upper()}...")
+    ensure_directories()
+    output_path = get_output_path(prompt, width, height, ext=encode.ext)
+    metadata = {**metadata, "output_format": encode.format}
+    # Captured now; the callback runs later, on the saver's thread
+    trace = current_trace()
+    resolution = resolution_label(width, height)
+    queued = time.perf_counter()
+
+    def _write_sidecar(path: Path, extra: dict) -> None:
+        # Build gallery thumbnails while the decoded image is still in memory
+        digest = generate_derivatives(path, image=image)
+        save_metadata(path, {**metadata, **extra, "content_hash": digest})
+
+    def _on_saved(path: Path) -> None:
+        if trace is None:
+            _write_sidecar(path, {})
+        else:
+            # Wall time from hand-off to file on disk; the CPU work is in an encoder process
+            trace.add(Span(
+                "encode", resolution, wall_seconds=time.perf_counter() - queued,
+                attrs={"format": encode.format},
+            ))
+            with trace.span("save", resolution):
+                _write_sidecar(path, {"timings": trace.summary()})
+        progress(PipelineStage.SAVED, 1.0, f"Saved to {path.name}")
+
+    saved = get_image_saver().save(image, output_path, encode, metadata, on_saved=_on_saved)
+    progress(PipelineStage.SAVING, 1.0, f"Encoding {output_path.name} in the background")
+    return output_path, saved
+
+
+def _finish_stage(
+    manager: ModelManager,
+    request: GenerationRequest,
+    result: PipelineResult,
+    base: ImageBuffer,
+    progress: ProgressCallback,
+    save_output: bool,
+) -> None:
+    """Upscale (or resize) a generated base image and optionally save it.
+
+    The upscaled frame becomes a PIL image here, once, for the encoder.
+    """
+    target_width, target_height = request.target_width, request.target_height
+    enable_upscaling = request.enable_upscaling
+    if enable_upscaling is None:
+        enable_upscaling = DEFAULT_SETTINGS["enable_upscaling"]
+    upscale_model = request.upscale_model or DEFAULT_SETTINGS["upscale_model"]
+    base_w, base_h = result.base_resolution
+    passes = (
+        plan_upscale_models(upscale_model, base_w, base_h, target_width, target_height)
+        if enable_upscaling else []
+    )
+
+    # --- Stage 2: Upscaling ---
+    if enable_upscaling:
+        upscaled = _upscale_stage(manager, passes, progress, base, target_width, target_height)
+    else:
+        # No upscaling — resize base image to target with Lanczos
+        with span("upscale", resolution_label(target_width, target_height), model="lanczos"):
+            upscaled = _lanczos(base, target_width, target_height)
+    result.upscaled_image = upscaled.pil()
+
+    # --- Save output ---
+    if save_output:
+        output_path, result.saved = _save_stage(result.upscaled_image, request.prompt, {
+            "prompt": request.prompt,
+            "negative_prompt": request.negative_prompt or "",
+            "seed": result.seed_used,
+            "num_inference_steps": request.num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"],
+            "guidance_scale": request.guidance_scale or DEFAULT_SETTINGS["guidance_scale"],
+            "base_resolution": list(result.base_resolution),
+            "target_resolution": [target_width, target_height],
+            "enable_upscaling": enable_upscaling,
+            "upscale_model": upscale_model,
+            "upscale_passes": passes,
+            "upscale_factor": _passes_factor(passes),
+            "backend": DEFAULT_SETTINGS["generator_backend"],
+            "model_id": DEFAULT_SETTINGS["model_id"],
+            "scheduler": request.scheduler or DEFAULT_SETTINGS["scheduler"],
+            "profile": request.profile,
+            "content_key": request.content_key(),
+            "base_key": request.base_key(),
+        }, progress, request.encode)
+        result.output_path = str(output_path)
+
+
 def run_pipeline(
     prompt: str,
     target_width: int,
@@ -62,15 +516,22 @@ def run_pipeline(
     seed: int | None = None,
     enable_upscaling: bool | None = None,
     upscale_model: str | None = None,
+    encode: EncodeOptions | None = None,
+    preview_every: int | None = None,
+    scheduler: str | None = None,
+    profile: str | None = None,
     save_output: bool = True,
     on_progress: ProgressCallback | None = None,
+    on_preview: PreviewCallback | None = None,
 ) -> PipelineResult:
     """Run the full two-stage wallpaper generation pipeline.
 
     Stage 1: Generate a base image at aspect-matched resolution using SDXL.
     Stage 2: Upscale to the target resolution using Real-ESRGAN.
 
-    Models are loaded and unloaded sequentially to minimize peak VRAM usage.
+    Models are obtained from the process-wide model manager, which keeps them
+    resident between calls. In low-memory mode each model is unloaded as soon
+    as its stage finishes to minimize peak VRAM usage.
 
     Args:
         prompt: Text prompt for image generation.
@@ -79,132 +540,533 @@ def run_pipeline(
         negative_prompt: Things to avoid in the generated image.
         num_inference_steps: Number of denoising steps.
         guidance_scale: Classifier-free guidance scale.
-        seed: Random seed (-1 or None for random).
+        seed: Random seed. -1 or None draws one; the seed used is returned.
         enable_upscaling: Whether to run the upscaling stage. Defaults to settings.
-        upscale_model: Name of the upscaler model (e.g. "RealESRGAN_x4plus").
+        upscale_model: Upscaler model name (e.g. "RealESRGAN_x4plus"), or "auto"
+            for the cheapest chain that reaches the target.
+        encode: Output format options. Defaults to settings.
+        preview_every: Minimum steps between latent previews; 0 disables them.
+            Defaults to settings.
+        scheduler: Scheduler name (see ``SCHEDULERS``). Defaults to settings.
+        profile: Name of the profile the parameters came from, for the metadata.
         save_output: Whether to save the final image to disk.
         on_progress: Optional callback for progress updates.
+        on_preview: Optional callback receiving JPEG previews during diffusion.
 
     Returns:
-        PipelineResult with generated images and metadata.
+        PipelineResult with generated images and metadata. The image is
+        encoded in the background; use ``wait_saved()`` to wait for the file.
+    """
+    request = GenerationRequest(
+        prompt=prompt,
+        target_width=target_width,
+        target_height=target_height,
+        negative_prompt=negative_prompt,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=guidance_scale,
+        seed=resolve_seed(seed),
+        enable_upscaling=enable_upscaling,
+        upscale_model=upscale_model,
+        encode=encode,
+        preview_every=preview_every,
+        scheduler=scheduler,
+        profile=profile,
+        cache_base=_seed_given(seed),
+    )
+    progress = on_progress or _default_progress
+    trace = Trace()
+    result = PipelineResult(
+        target_resolution=(target_width, target_height),
+        base_resolution=request.base_resolution,
+        seed_used=request.seed,
+        spans=trace.spans,
+    )
+
+    manager = get_model_manager()
+    model_id = DEFAULT_SETTINGS["model_id"]
+
+    try:
+        with use_trace(trace):
+            # --- Stage 1: Base image generation ---
+            base = _generate_stage(manager, model_id, progress, [request], [on_preview])[0]
+            result.base_image = base.pil()
+
+            _finish_stage(manager, request, result, base, progress, save_output)
+
+        progress(PipelineStage.COMPLETE, 1.0, "Pipeline complete.")
+        return result
+
+    except torch.cuda.OutOfMemoryError:
+        # Drop every idle cached model so the next request starts from a clean slate
+        manager.clear()
+        result.error = OOM_MESSAGE
+        progress(PipelineStage.ERROR, 0.0, result.error)
+        return result
+    except Exception as e:
+        result.error = str(e)
+        progress(PipelineStage.ERROR, 0.0, f"Pipeline error: {e}")
+        return result
+    finally:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+def group_presets_by_base_resolution(
+    presets: list[DevicePreset],
+) -> dict[tuple[int, int], list[DevicePreset]]:
+    """Group presets that share a base generation resolution.
+
+    Presets with the same ``aspect_ratio`` always share a base resolution;
+    near-identical ratios (e.g. the iPhone 14 family) usually do too, so one
+    diffusion run can serve all of them.
+    """
+    groups: dict[tuple[int, int], list[DevicePreset]] = {}
+    for preset in presets:
+        key = calculate_base_resolution(preset.width, preset.height)
+        groups.setdefault(key, []).append(preset)
+    return groups
+
+
+def _cover_size(base_w: int, base_h: int, presets: list[DevicePreset]) -> tuple[int, int]:
+    """Smallest base-aspect size that covers every preset in a group."""
+    scale = max(max(p.width / base_w, p.height / base_h) for p in presets)
+    return round(base_w * scale), round(base_h * scale)
+
+
+def run_multi_target_pipeline(
+    prompt: str,
+    preset_names: list[str],
+    negative_prompt: str | None = None,
+    num_inference_steps: int | None = None,
+    guidance_scale: float | None = None,
+    seed: int | None = None,
+    enable_upscaling: bool | None = None,
+    upscale_model: str | None = None,
+    encode: EncodeOptions | None = None,
+    preview_every: int | None = None,
+    scheduler: str | None = None,
+    profile: str | None = None,
+    on_progress: ProgressCallback | None = None,
+    on_preview: PreviewCallback | None = None,
+) -> MultiTargetResult:
+    """Generate one image per aspect-ratio group and derive every preset from it.
+
+    Presets are grouped by base resolution. Each group runs diffusion once and
+    upscaling once (to the smallest size that covers all of its presets), then
+    every preset is center-cropped and resized from that image and saved with
+    its own metadata sidecar.
+
+    Args:
+        prompt: Text prompt for image generation.
+        preset_names: Names of ``DevicePreset`` entries to render.
+        negative_prompt: Things to avoid in the generated image.
+        num_inference_steps: Number of denoising steps.
+        guidance_scale: Classifier-free guidance scale.
+        seed: Random seed shared by every group. -1 or None draws one.
+        enable_upscaling: Whether to run the upscaling stage. Defaults to settings.
+        upscale_model: Upscaler model name (e.g. "RealESRGAN_x4plus"), or "auto"
+            for the cheapest chain that reaches the target.
+        encode: Output format options. Defaults to settings.
+        preview_every: Minimum steps between latent previews; 0 disables them.
+            Defaults to settings.
+        scheduler: Scheduler name (see ``SCHEDULERS``). Defaults to settings.
+        profile: Name of the profile the parameters came from, for the metadata.
+        on_progress: Optional callback for progress updates.
+        on_preview: Optional callback receiving JPEG previews during diffusion.
+
+    Returns:
+        MultiTargetResult with one PipelineResult per preset, in request order.
+        Each file is encoded in the background (see ``PipelineResult.saved``).
     """
     if enable_upscaling is None:
         enable_upscaling = DEFAULT_SETTINGS["enable_upscaling"]
 
     progress = on_progress or _default_progress
-    result = PipelineResult(target_resolution=(target_width, target_height))
-    base_w, base_h = calculate_base_resolution(target_width, target_height)
-    result.base_resolution = (base_w, base_h)
+    multi = MultiTargetResult()
+    trace = Trace()
 
-    pipe = None
-    upscaler = None
+    presets = []
+    for name in preset_names:
+        preset = get_preset_by_name(name)
+        if preset is None:
+            multi.error = f"Unknown device preset: {name}"
+            progress(PipelineStage.ERROR, 0.0, multi.error)
+            return multi
+        presets.append(preset)
+
+    manager = get_model_manager()
+    model_id = DEFAULT_SETTINGS["model_id"]
+    upscale_model = upscale_model or DEFAULT_SETTINGS["upscale_model"]
+    cache_base = _seed_given(seed)
+    seed = multi.seed_used = resolve_seed(seed)
+    groups = group_presets_by_base_resolution(presets)
+    by_preset: dict[str, PipelineResult] = {}
 
     try:
-        # --- Stage 1: Base image generation ---
-        progress(PipelineStage.LOADING_MODEL, 0.0, "Loading SDXL model...")
-        pipe = load_sdxl_pipeline()
-        progress(PipelineStage.LOADING_MODEL, 1.0, "Model loaded.")
+        with use_trace(trace):
+            for index, ((base_w, base_h), group) in enumerate(groups.items(), start=1):
+                label = f"[{index}/{len(groups)}] "
 
-        progress(PipelineStage.GENERATING, 0.0, f"Generating {base_w}x{base_h} base image...")
+                def group_progress(stage: PipelineStage, frac: float, msg: str) -> None:
+                    progress(stage, frac, label + msg)
 
-        # Wrap the diffusers callback to forward progress
-        step_count = num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
+                # Any preset in the group yields the same base resolution
+                group_request = GenerationRequest(
+                    prompt=prompt,
+                    target_width=group[0].width,
+                    target_height=group[0].height,
+                    negative_prompt=negative_prompt,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale,
+                    seed=seed,
+                    enable_upscaling=enable_upscaling,
+                    upscale_model=upscale_model,
+                    preview_every=preview_every,
+                    scheduler=scheduler,
+                    profile=profile,
+                    cache_base=cache_base,
+                )
+                base = _generate_stage(
+                    manager, model_id, group_progress, [group_request], [on_preview]
+                )[0]
+                base_image = base.pil()
 
-        def _step_callback(pipe_obj, step, timestep, callback_kwargs):
-            frac = (step + 1) / step_count
-            progress(PipelineStage.GENERATING, frac, f"Step {step + 1}/{step_count}")
-            return callback_kwargs
+                cover_w, cover_h = _cover_size(base_w, base_h, group)
+                passes = (
+                    plan_upscale_models(upscale_model, base_w, base_h, cover_w, cover_h)
+                    if enable_upscaling else []
+                )
+                if enable_upscaling:
+                    source = _upscale_stage(
+                        manager, passes, group_progress, base, cover_w, cover_h
+                    ).pil()
+                else:
+                    with span("upscale", resolution_label(cover_w, cover_h), model="lanczos"):
+                        source = base_image.resize((cover_w, cover_h), Image.LANCZOS)
 
-        base_image = generate_base_image(
-            pipe,
-            prompt=prompt,
-            target_width=target_width,
-            target_height=target_height,
-            negative_prompt=negative_prompt,
-            num_inference_steps=num_inference_steps,
-            guidance_scale=guidance_scale,
-            seed=seed,
-            callback=_step_callback,
-        )
-        result.base_image = base_image
+                for preset in group:
+                    final_image = resize_to_cover(source, preset.width, preset.height)
+                    preset_request = replace(
+                        group_request, target_width=preset.width, target_height=preset.height
+                    )
+                    output_path, saved = _save_stage(final_image, prompt, {
+                        "prompt": prompt,
+                        "negative_prompt": negative_prompt or "",
+                        "seed": multi.seed_used,
+                        "num_inference_steps": num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"],
+                        "guidance_scale": guidance_scale or DEFAULT_SETTINGS["guidance_scale"],
+                        "base_resolution": [base_w, base_h],
+                        "target_resolution": [preset.width, preset.height],
+                        "enable_upscaling": enable_upscaling,
+                        "upscale_model": upscale_model,
+                        "upscale_passes": passes,
+                        "upscale_factor": _passes_factor(passes),
+                        "backend": DEFAULT_SETTINGS["generator_backend"],
+                        "model_id": model_id,
+                        "scheduler": scheduler or DEFAULT_SETTINGS["scheduler"],
+                        "profile": profile,
+                        "preset": preset.name,
+                        "content_key": preset_request.content_key(upscale_to=(cover_w, cover_h)),
+                        "base_key": preset_request.base_key(),
+                    }, group_progress, encode)
+                    by_preset[preset.name] = PipelineResult(
+                        base_image=base_image,
+                        upscaled_image=final_image,
+                        output_path=str(output_path),
+                        base_resolution=(base_w, base_h),
+                        target_resolution=(preset.width, preset.height),
+                        seed_used=multi.seed_used,
+                        preset_name=preset.name,
+                        saved=saved,
+                        # The run's spans, shared by every preset
+                        spans=trace.spans,
+                    )
 
-        # Capture actual seed used
-        if seed is not None and seed >= 0:
-            result.seed_used = seed
-        else:
-            result.seed_used = -1  # random
+        multi.results = [by_preset[p.name] for p in presets]
+        progress(PipelineStage.COMPLETE, 1.0, f"Rendered {len(presets)} targets.")
+        return multi
 
-        progress(PipelineStage.GENERATING, 1.0, "Base image generated.")
+    except torch.cuda.OutOfMemoryError:
+        manager.clear()
+        multi.results = list(by_preset.values())
+        multi.error = OOM_MESSAGE
+        progress(PipelineStage.ERROR, 0.0, multi.error)
+        return multi
+    except Exception as e:
+        multi.results = list(by_preset.values())
+        multi.error = str(e)
+        progress(PipelineStage.ERROR, 0.0, f"Pipeline error: {e}")
+        return multi
+    finally:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
 
-        # Free VRAM before upscaling
-        progress(PipelineStage.UNLOADING_MODEL, 0.0, "Freeing generation model VRAM...")
-        unload_pipeline(pipe)
-        pipe = None
-        progress(PipelineStage.UNLOADING_MODEL, 1.0, "VRAM freed.")
-
-        # --- Stage 2: Upscaling ---
-        if enable_upscaling:
-            progress(PipelineStage.LOADING_UPSCALER, 0.0, "Loading upscaler...")
-            upscaler = load_upscaler(model_name=upscale_model or DEFAULT_SETTINGS["upscale_model"])
-            progress(PipelineStage.LOADING_UPSCALER, 1.0, "Upscaler loaded.")
-
-            progress(PipelineStage.UPSCALING, 0.0, f"Upscaling to {target_width}x{target_height}...")
-            upscaled = upscale_image(upscaler, base_image, target_width, target_height)
-            result.upscaled_image = upscaled
-            progress(PipelineStage.UPSCALING, 1.0, "Upscaling complete.")
-
-            # Free upscaler VRAM
-            unload_upscaler(upscaler)
-            upscaler = None
-        else:
-            # No upscaling — resize base image to target with Lanczos
-            result.upscaled_image = base_image.resize(
-                (target_width, target_height), Image.LANCZOS
-            )
 
-        # --- Save output ---
-        final_image = result.upscaled_image
-        if save_output:
-            progress(PipelineStage.SAVING, 0.0, "Saving wallpaper...")
-            ensure_directories()
-            output_path = get_output_path(prompt, target_width, target_height)
-            final_image.save(str(output_path), quality=95)
-            result.output_path = str(output_path)
-            save_metadata(output_path, {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt or "",
-                "seed": result.seed_used,
-                "num_inference_steps": num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"],
-                "guidance_scale": guidance_scale or DEFAULT_SETTINGS["guidance_scale"],
-                "base_resolution": list(result.base_resolution),
-                "target_resolution": [target_width, target_height],
-                "enable_upscaling": enable_upscaling,
-                "upscale_model": upscale_model or DEFAULT_SETTINGS["upscale_model"],
-            })
-            progress(PipelineStage.SAVING, 1.0, f"Saved to {output_path.name}")
+def run_draft_grid(
+    prompt: str,
+    target_width: int,
+    target_height: int,
+    count: int | None = None,
+    seeds: list[int] | None = None,
+    negative_prompt: str | None = None,
+    num_inference_steps: int | None = None,
+    guidance_scale: float | None = None,
+    base_size: int | None = None,
+    scheduler: str | None = None,
+    on_progress: ProgressCallback | None = None,
+    on_draft: DraftCallback | None = None,
+) -> DraftGridResult:
+    """Render several seeds cheaply to pick a composition before a full render.
 
-        progress(PipelineStage.COMPLETE, 1.0, "Pipeline complete.")
-        return result
+    Each seed is diffused at a reduced step count and base size, in batches
+    as large as memory allows, with no upscaling and nothing saved. Promote
+    a seed by passing it to ``run_pipeline`` with the same prompt; the
+    composition carries over, with full-step detail.
+
+    Args:
+        prompt: Text prompt for image generation.
+        target_width: Final width, used for the aspect ratio.
+        target_height: Final height, used for the aspect ratio.
+        count: Number of random seeds to draw when ``seeds`` is not given.
+            Defaults to settings.
+        seeds: Seeds to render. -1 entries are drawn at random.
+        negative_prompt: Things to avoid in the generated image.
+        num_inference_steps: Draft denoising steps. Defaults to settings.
+        guidance_scale: Classifier-free guidance scale.
+        base_size: Long side of the draft base resolution. Defaults to settings.
+        scheduler: Scheduler name; promote with the same one to keep the
+            composition. Defaults to settings.
+        on_progress: Optional callback for progress updates.
+        on_draft: Optional callback receiving each draft's JPEG thumbnail as
+            soon as its batch finishes.
+
+    Returns:
+        DraftGridResult with one Draft per seed.
+    """
+    progress = on_progress or _default_progress
+    if seeds is None:
+        seeds = [-1] * (count or DEFAULT_SETTINGS["draft_count"])
+    seeds = [resolve_seed(seed) for seed in seeds]
+    steps = num_inference_steps or DEFAULT_SETTINGS["draft_steps"]
+    base_size = base_size or DEFAULT_SETTINGS["draft_base_size"]
+    base_w, base_h = calculate_base_resolution(target_width, target_height, base_size)
+    trace = Trace()
+    grid = DraftGridResult(base_resolution=(base_w, base_h), num_inference_steps=steps, spans=trace.spans)
+    resolution = resolution_label(base_w, base_h)
+
+    manager = get_model_manager()
+    model_id = DEFAULT_SETTINGS["model_id"]
+    backend = get_backend()
+    batch = backend.max_batch_size(base_w, base_h)
+    chunks = [seeds[i:i + batch] for i in range(0, len(seeds), batch)]
+
+    try:
+        with use_trace(trace):
+            progress(PipelineStage.LOADING_MODEL, 0.0, "Loading SDXL model...")
+            with span("load_model", resolution, model=model_id):
+                pipe = manager.get(GENERATOR_KIND, model_id)
+            try:
+                progress(PipelineStage.LOADING_MODEL, 1.0, "Model loaded.")
+                for chunk in chunks:
+                    done = len(grid.drafts)
+
+                    def _on_step(step: int, latents: torch.Tensor | None, _n: int = len(chunk)) -> None:
+                        frac = (done + _n * (step + 1) / steps) / len(seeds)
+                        progress(
+                            PipelineStage.GENERATING, frac,
+                            f"Drafting {done + 1}-{done + _n} of {len(seeds)} (step {step + 1}/{steps})",
+                        )
+
+                    images = backend.generate(
+                        pipe,
+                        prompts=[prompt] * len(chunk),
+                        target_width=target_width,
+                        target_height=target_height,
+                        seeds=chunk,
+                        negative_prompts=[negative_prompt] * len(chunk),
+                        num_inference_steps=steps,
+                        guidance_scale=guidance_scale,
+                        on_step=_on_step,
+                        base_size=base_size,
+                        scheduler=scheduler,
+                    )
+                    for seed, buffer in zip(chunk, images):
+                        image = buffer.pil()
+                        thumbnail = image_to_bytes(create_thumbnail(image, DRAFT_THUMBNAIL_SIZE), "JPEG", 80)
+                        grid.drafts.append(Draft(seed=seed, image=image, thumbnail=thumbnail))
+                        if on_draft is not None:
+                            on_draft(len(grid.drafts) - 1, seed, thumbnail)
+            finally:
+                with span("unload_model", resolution, model=model_id):
+                    manager.release(GENERATOR_KIND, model_id)
+
+        progress(PipelineStage.COMPLETE, 1.0, f"Rendered {len(seeds)} drafts.")
+        return grid
 
     except torch.cuda.OutOfMemoryError:
-        result.error = "Out of GPU memory. Try a smaller resolution or close other GPU applications."
-        progress(PipelineStage.ERROR, 0.0, result.error)
-        return result
+        manager.clear()
+        grid.error = OOM_MESSAGE
+        progress(PipelineStage.ERROR, 0.0, grid.error)
+        return grid
     except Exception as e:
-        result.error = str(e)
+        grid.error = str(e)
         progress(PipelineStage.ERROR, 0.0, f"Pipeline error: {e}")
-        return result
+        return grid
     finally:
-        # Ensure GPU memory is always freed
-        if pipe is not None:
-            try:
-                unload_pipeline(pipe)
-            except Exception:
-                pass
-        if upscaler is not None:
-            try:
-                unload_upscaler(upscaler)
-            except Exception:
-                pass
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
+
+
+def _skip_failed(result: PipelineResult, on_preview: PreviewCallback | None) -> PreviewCallback | None:
+    """Stop sending previews for a batch item once it has failed or been cancelled."""
+    if on_preview is None:
+        return None
+
+    def guarded(step: int, total: int, frame: bytes) -> None:
+        if result.error is None:
+            on_preview(step, total, frame)
+    return guarded
+
+
+@dataclass
+class DiffusedBatch:
+    """A batch between its diffusion and upscale stages (see ``diffuse_batch``)."""
+    requests: list[GenerationRequest]
+    results: list[PipelineResult]
+    callbacks: list[ProgressCallback]
+    # Diffusion spans, shared by every request's trace
+    trace: Trace
+    # None when diffusion failed; every result then carries the error
+    base_images: list[ImageBuffer] | None = None
+
+    def report(self, index: int, stage: PipelineStage, frac: float, msg: str) -> None:
+        # A raising callback (e.g. a cancelled job) only fails its own request
+        if self.results[index].error is not None:
+            return
+        try:
+            self.callbacks[index](stage, frac, msg)
+        except Exception as e:
+            self.results[index].error = str(e) or type(e).__name__
+
+
+def diffuse_batch(
+    requests: list[GenerationRequest],
+    on_progress: list[ProgressCallback | None] | None = None,
+    on_preview: list[PreviewCallback | None] | None = None,
+) -> DiffusedBatch:
+    """First half of ``run_batch_pipeline``: one batched diffusion pass.
+
+    Never raises for pipeline errors; they are recorded on the results.
+    """
+    if len({r.batch_key() for r in requests}) > 1:
+        raise ValueError("Batched requests must share base resolution, steps and guidance")
+
+    requests = [
+        replace(r, seed=resolve_seed(r.seed), cache_base=r.cache_base and _seed_given(r.seed))
+        for r in requests
+    ]
+    batch = DiffusedBatch(
+        requests=requests,
+        results=[
+            PipelineResult(
+                target_resolution=(r.target_width, r.target_height),
+                base_resolution=r.base_resolution,
+                seed_used=r.seed,
+            )
+            for r in requests
+        ],
+        callbacks=[cb or _default_progress for cb in (on_progress or [None] * len(requests))],
+        trace=Trace(),
+    )
+    results = batch.results
+
+    def _broadcast(stage: PipelineStage, frac: float, msg: str) -> None:
+        for i in range(len(requests)):
+            batch.report(i, stage, frac, msg)
+        if all(r.error is not None for r in results):
+            raise RuntimeError("Every request in the batch was cancelled or failed.")
+
+    manager = get_model_manager()
+    model_id = DEFAULT_SETTINGS["model_id"]
+
+    try:
+        previews = [
+            _skip_failed(results[i], cb) for i, cb in enumerate(on_preview or [None] * len(requests))
+        ]
+        with use_trace(batch.trace):
+            batch.base_images = _generate_stage(manager, model_id, _broadcast, requests, previews)
+        return batch
+    except torch.cuda.OutOfMemoryError:
+        manager.clear()
+        error = OOM_MESSAGE
+    except Exception as e:
+        error = f"Pipeline error: {e}"
+    for i, result in enumerate(results):
+        batch.report(i, PipelineStage.ERROR, 0.0, error)
+        if result.error is None:
+            result.error = error
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return batch
+
+
+def finish_batch(batch: DiffusedBatch, save_output: bool = True) -> list[PipelineResult]:
+    """Second half of ``run_batch_pipeline``: upscale and hand off each request.
+
+    Each request gets its own trace, starting with the shared diffusion spans.
+    """
+    if batch.base_images is None:
+        return batch.results
+    manager = get_model_manager()
+    for i, (request, result, base) in enumerate(zip(batch.requests, batch.results, batch.base_images)):
+        if result.error is not None:
+            continue
+        result.base_image = base.pil()
+        trace = Trace()
+        trace.spans.extend(batch.trace.spans)
+        result.spans = trace.spans
+
+        def item_progress(stage: PipelineStage, frac: float, msg: str, _i: int = i) -> None:
+            batch.callbacks[_i](stage, frac, msg)
+
+        try:
+            with use_trace(trace):
+                _finish_stage(manager, request, result, base, item_progress, save_output)
+            batch.report(i, PipelineStage.COMPLETE, 1.0, "Pipeline complete.")
+        except torch.cuda.OutOfMemoryError:
+            manager.clear()
+            result.error = OOM_MESSAGE
+            batch.report(i, PipelineStage.ERROR, 0.0, result.error)
+        except Exception as e:
+            result.error = str(e)
+            batch.report(i, PipelineStage.ERROR, 0.0, f"Pipeline error: {e}")
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return batch.results
+
+
+def run_batch_pipeline(
+    requests: list[GenerationRequest],
+    on_progress: list[ProgressCallback | None] | None = None,
+    save_output: bool = True,
+    on_preview: list[PreviewCallback | None] | None = None,
+) -> list[PipelineResult]:
+    """Run several compatible requests with a single batched diffusion pass.
+
+    All requests must share a ``batch_key`` (base resolution, steps, guidance).
+    Diffusion runs once for the whole batch; upscaling and encoding hand-off then
+    run per request. A failure or cancellation of one request after diffusion does not
+    affect the others. ``staged.StagedPipeline`` runs the two halves
+    (``diffuse_batch``, ``finish_batch``) on separate threads.
+
+    Args:
+        requests: Requests to generate, all with the same batch key.
+        on_progress: Optional per-request progress callbacks.
+        save_output: Whether to save the final images to disk.
+        on_preview: Optional per-request latent preview callbacks.
+
+    Returns:
+        One PipelineResult per request, in request order.
+    """
+    return finish_batch(diffuse_batch(requests, on_progress, on_preview), save_output)
@@ -4,6 +4,210 @@ from diffusers import StableDiffusionXLPipeline
 
 from src.config.settings import DEFAULT_SETTINGS
 from src.config.presets import calculate_base_resolution
+from src.generator.embeddings import PromptEmbeddingCache, encode_batch, get_embedding_cache
+from src.generator.instrumentation import resolution_label, span, start_span
+from src.utils.image_buffer import ImageBuffer
+
+# Rough peak activation memory per base-resolution pixel for one image with
+# classifier-free guidance (UNet + VAE decode, fp16, attention slicing on).
+_BYTES_PER_PIXEL = 1536
+
+
+def max_batch_size(
+    base_width: int,
+    base_height: int,
+    free_bytes: int | None = None,
+    limit: int | None = None,
+) -> int:
+    """Choose how many images of the given base resolution fit in one forward pass.
+
+    Args:
+        base_width: Base generation width.
+        base_height: Base generation height.
+        free_bytes: Free accelerator memory. Queried from CUDA when omitted.
+        limit: Upper bound on the batch size. Defaults to settings.
+    """
+    limit = limit or DEFAULT_SETTINGS["max_batch_size"]
+    if free_bytes is None:
+        if not torch.cuda.is_available():
+            return 1
+        free_bytes, _ = torch.cuda.mem_get_info()
+    per_image = base_width * base_height * _BYTES_PER_PIXEL
+    return max(1, min(limit, free_bytes // per_image))
+
+
+def _make_generator(seed: int | None, device: torch.device | str) -> torch.Generator:
+    generator = torch.Generator(device=device)
+    if seed is not None and seed >= 0:
+        generator.manual_seed(seed)
+    else:
+        generator.seed()
+    return generator
+
+
+def decode_latents(pipe: StableDiffusionXLPipeline, latents: torch.Tensor) -> torch.Tensor:
+    """Decode final SDXL latents to a (B, 3, H, W) RGB tensor in [0, 1].
+
+    Mirrors the tail of ``StableDiffusionXLPipeline.__call__``: fp16 VAEs that
+    need it are upcast for the decode, latents are unscaled (and
+    de-normalized when the VAE config has latent statistics), and the
+    invisible watermark is applied when the pipeline has one. The result
+    stays on the VAE's device, ready for the upscaler.
+    """
+    vae = pipe.vae
+    needs_upcasting = vae.dtype == torch.float16 and vae.config.force_upcast
+    if needs_upcasting:
+        pipe.upcast_vae()
+        latents = latents.to(next(iter(vae.post_quant_conv.parameters())).dtype)
+    elif latents.dtype != vae.dtype:
+        latents = latents.to(vae.dtype)
+
+    mean = getattr(vae.config, "latents_mean", None)
+    std = getattr(vae.config, "latents_std", None)
+    if mean is not None and std is not None:
+        mean = torch.tensor(mean).view(1, 4, 1, 1).to(latents.device, latents.dtype)
+        std = torch.tensor(std).view(1, 4, 1, 1).to(latents.device, latents.dtype)
+        latents = latents * std / vae.config.scaling_factor + mean
+    else:
+        latents = latents / vae.config.scaling_factor
+
+    with torch.no_grad():
+        decoded = vae.decode(latents, return_dict=False)[0]
+    if needs_upcasting:
+        vae.to(dtype=torch.float16)
+
+    if getattr(pipe, "watermark", None) is not None:
+        decoded = pipe.watermark.apply_watermark(decoded)
+    return pipe.image_processor.postprocess(decoded, output_type="pt")
+
+
+def generate_base_buffers(
+    pipe: StableDiffusionXLPipeline,
+    prompts: list[str],
+    target_width: int,
+    target_height: int,
+    seeds: list[int | None] | None = None,
+    negative_prompts: list[str | None] | None = None,
+    num_inference_steps: int | None = None,
+    guidance_scale: float | None = None,
+    callback=None,
+    embedding_cache: PromptEmbeddingCache | None = None,
+    base_size: int | None = None,
+) -> list[ImageBuffer]:
+    """Generate several base images in a single batched SDXL forward pass.
+
+    All images share the base resolution, step count and guidance scale; each
+    gets its own prompt, negative prompt and seeded ``torch.Generator`` so the
+    result for a given seed matches an unbatched run.
+
+    Args:
+        pipe: Loaded SDXL pipeline.
+        prompts: One text prompt per image.
+        target_width: Final desired width (used for aspect ratio calculation).
+        target_height: Final desired height.
+        seeds: Per-image seeds. -1 or None entries are random.
+        negative_prompts: Per-image negative prompts. None entries use the default.
+        num_inference_steps: Number of denoising steps.
+        guidance_scale: Classifier-free guidance scale.
+        callback: Optional progress callback (step, timestep, latents).
+        embedding_cache: Cache for text-encoder outputs. Defaults to the
+            process-wide cache.
+        base_size: Long side of the base resolution (e.g. smaller for drafts).
+
+    Returns:
+        Base images as tensor-backed buffers, in prompt order; they reach
+        the upscaler without a PIL round trip.
+
+    Prompt encoding, every denoising step and the VAE decode are recorded as
+    spans of the current trace (see ``instrumentation``).
+    """
+    count = len(prompts)
+    seeds = seeds or [None] * count
+    negative_prompts = negative_prompts or [None] * count
+    if len(seeds) != count or len(negative_prompts) != count:
+        raise ValueError("prompts, seeds and negative_prompts must have the same length")
+
+    negative_prompts = [n or DEFAULT_SETTINGS["negative_prompt"] for n in negative_prompts]
+    num_inference_steps = num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
+    guidance_scale = guidance_scale or DEFAULT_SETTINGS["guidance_scale"]
+
+    if base_size:
+        base_w, base_h = calculate_base_resolution(target_width, target_height, base_size)
+    else:
+        base_w, base_h = calculate_base_resolution(target_width, target_height)
+
+    resolution = resolution_label(base_w, base_h)
+
+    # Repeated prompts and the shared default negative prompt skip the text encoders
+    with span("encode_prompt", resolution, batch=count):
+        embeddings = encode_batch(
+            embedding_cache or get_embedding_cache(),
+            pipe,
+            pipe.name_or_path,
+            prompts,
+            negative_prompts,
+        )
+
+    # One span per step, closed before the caller's callback (previews) runs
+    step_span = start_span("denoise_step", resolution, step=1, batch=count)
+
+    def _step_callback(pipe_obj, step, timestep, callback_kwargs):
+        nonlocal step_span
+        step_span.end()
+        if callback is not None:
+            callback_kwargs = callback(pipe_obj, step, timestep, callback_kwargs)
+        step_span = start_span("denoise_step", resolution, step=step + 2, batch=count)
+        return callback_kwargs
+
+    try:
+        result = pipe(
+            **embeddings,
+            width=base_w,
+            height=base_h,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            # Offloaded pipelines still execute (and draw noise) on the GPU
+            generator=[_make_generator(seed, pipe._execution_device) for seed in seeds],
+            callback_on_step_end=_step_callback,
+            # Decode separately so the VAE shows up as its own stage
+            output_type="latent",
+        )
+    finally:
+        step_span.cancel()
+
+    with span("vae_decode", resolution, batch=count):
+        decoded = decode_latents(pipe, result.images)
+    return [ImageBuffer.from_tensor(image) for image in decoded]
+
+
+def generate_base_images(
+    pipe: StableDiffusionXLPipeline,
+    prompts: list[str],
+    target_width: int,
+    target_height: int,
+    seeds: list[int | None] | None = None,
+    negative_prompts: list[str | None] | None = None,
+    num_inference_steps: int | None = None,
+    guidance_scale: float | None = None,
+    callback=None,
+    embedding_cache: PromptEmbeddingCache | None = None,
+    base_size: int | None = None,
+) -> list[Image.Image]:
+    """``generate_base_buffers`` returning PIL Images at base resolution."""
+    buffers = generate_base_buffers(
+        pipe,
+        prompts=prompts,
+        target_width=target_width,
+        target_height=target_height,
+        seeds=seeds,
+        negative_prompts=negative_prompts,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=guidance_scale,
+        callback=callback,
+        embedding_cache=embedding_cache,
+        base_size=base_size,
+    )
+    return [buffer.pil() for buffer in buffers]
 
 
 def generate_base_image(
@@ -33,26 +237,14 @@ def generate_base_image(
     Returns:
         Generated PIL Image at base resolution.
     """
-    negative_prompt = negative_prompt or DEFAULT_SETTINGS["negative_prompt"]
-    num_inference_steps = num_inference_steps or DEFAULT_SETTINGS["num_inference_steps"]
-    guidance_scale = guidance_scale or DEFAULT_SETTINGS["guidance_scale"]
-    seed = seed if seed is not None else DEFAULT_SETTINGS["seed"]
-
-    base_w, base_h = calculate_base_resolution(target_width, target_height)
-
-    generator = None
-    if seed >= 0:
-        generator = torch.Generator(device="cuda").manual_seed(seed)
-
-    result = pipe(
-        prompt=prompt,
-        negative_prompt=negative_prompt,
-        width=base_w,
-        height=base_h,
+    return generate_base_images(
+        pipe,
+        prompts=[prompt],
+        target_width=target_width,
+        target_height=target_height,
+        seeds=[seed],
+        negative_prompts=[negative_prompt],
         num_inference_steps=num_inference_steps,
         guidance_scale=guidance_scale,
-        generator=generator,
-        callback_on_step_end=callback,
-    )
-
-    return result.images[0]
+        callback=callback,
+    )[0]
@@ -0,0 +1,106 @@
+"""Cheap in-progress previews decoded straight from SDXL latents.
+
+Instead of running the full VAE, each 4-channel latent pixel is projected to
+RGB with a fixed linear map (the approximation popularised by ComfyUI and
+A1111 for SDXL). The result is 1/8 of the output resolution and costs well
+under a millisecond on the GPU, which is plenty for a progress thumbnail.
+"""
+
+import io
+import math
+import time
+
+import torch
+from PIL import Image
+
+# Linear projection of SDXL latent channels onto RGB, and its bias
+SDXL_LATENT_RGB_FACTORS = (
+    (0.3651, 0.4232, 0.4341),
+    (-0.2533, -0.0042, 0.1068),
+    (0.1076, 0.1111, -0.0362),
+    (-0.3165, -0.2492, -0.2188),
+)
+SDXL_LATENT_RGB_BIAS = (0.1084, -0.0175, -0.0011)
+
+PREVIEW_MAX_SIZE = 256
+PREVIEW_QUALITY = 70
+
+
+def latents_to_rgb(latents: torch.Tensor) -> torch.Tensor:
+    """Project latents (B, 4, h, w) or (4, h, w) to uint8 RGB (B, h, w, 3) on the CPU."""
+    if latents.dim() == 3:
+        latents = latents[None]
+    factors = torch.tensor(SDXL_LATENT_RGB_FACTORS, device=latents.device, dtype=torch.float32)
+    bias = torch.tensor(SDXL_LATENT_RGB_BIAS, device=latents.device, dtype=torch.float32)
+    rgb = torch.nn.functional.linear(latents.float().movedim(1, -1), factors.T, bias)
+    rgb = ((rgb + 1.0) / 2.0).clamp_(0.0, 1.0)
+    return (rgb * 255).round_().to(torch.uint8).cpu()
+
+
+def rgb_to_jpeg(
+    rgb: torch.Tensor, max_size: int = PREVIEW_MAX_SIZE, quality: int = PREVIEW_QUALITY
+) -> bytes:
+    """Encode one (h, w, 3) uint8 preview as a small JPEG, upscaled to ``max_size`` at most."""
+    height, width = rgb.shape[0], rgb.shape[1]
+    image = Image.frombytes("RGB", (width, height), rgb.contiguous().numpy().tobytes())
+    scale = min(max_size / width, max_size / height)
+    if scale > 1:
+        image = image.resize((round(width * scale), round(height * scale)), Image.BILINEAR)
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def latents_to_jpegs(latents: torch.Tensor, max_size: int = PREVIEW_MAX_SIZE) -> list[bytes]:
+    """One JPEG preview per image in a latent batch."""
+    return [rgb_to_jpeg(rgb, max_size) for rgb in latents_to_rgb(latents)]
+
+
+class PreviewThrottle:
+    """Decide on which diffusion steps to emit a preview.
+
+    Previews are produced every ``every`` steps at most, and further spaced
+    out so their measured cost stays under ``budget`` (a fraction) of the
+    measured step time.
+
+    Args:
+        every: Minimum number of steps between previews. 0 disables previews.
+        budget: Maximum share of step time to spend on previews.
+    """
+
+    def __init__(self, every: int, budget: float = 0.03):
+        self.every = every
+        self.budget = budget
+        self.interval = every
+        self.emitted = 0
+        self._last_step: int | None = None
+        self._last_time: float | None = None
+        self._step_seconds = 0.0
+        self._preview_seconds = 0.0
+        self._last_preview_step = -math.inf
+
+    @property
+    def enabled(self) -> bool:
+        return self.every > 0
+
+    def should_preview(self, step: int) -> bool:
+        """Record that ``step`` finished; return whether to preview it."""
+        now = time.perf_counter()
+        if self._last_time is not None and step > self._last_step:
+            elapsed = (now - self._last_time) / (step - self._last_step)
+            # Exponential moving average; preview time is excluded by record()
+            self._step_seconds = elapsed if not self._step_seconds else 0.7 * self._step_seconds + 0.3 * elapsed
+        self._last_step, self._last_time = step, now
+        return self.enabled and step - self._last_preview_step >= self.interval
+
+    def record(self, step: int, seconds: float) -> None:
+        """Record the cost of the preview emitted on ``step`` and adapt the interval."""
+        self.emitted += 1
+        self._last_preview_step = step
+        self._preview_seconds = seconds if not self._preview_seconds else 0.7 * self._preview_seconds + 0.3 * seconds
+        # Don't bill the preview to the next step's duration
+        if self._last_time is not None:
+            self._last_time += seconds
+        if self._step_seconds > 0:
+            needed = math.ceil(self._preview_seconds / (self.budget * self._step_seconds))
+            self.interval = max(self.every, needed)
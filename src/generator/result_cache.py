@@ -0,0 +1,111 @@
+"""Answer seeded requests from existing outputs instead of regenerating them.
+
+A request with a fixed seed is deterministic, so its ``content_key`` (see
+``GenerationRequest``) identifies the final image. Outputs record their keys
+in the sidecar and gallery index; before a job is queued the index is
+checked for:
+
+1. the same content key: the existing file is returned as is, or re-encoded
+   when another output format was asked for;
+2. the same ``base_key`` (same diffusion inputs) at a target at least as
+   large in both dimensions: that output is cropped and downscaled.
+"""
+
+from pathlib import Path
+
+from PIL import Image
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.orchestrator import GenerationRequest, PipelineResult
+from src.utils.derivatives import generate_derivatives
+from src.utils.encoding import EncodeOptions, write_image
+from src.utils.file_utils import get_output_path, save_metadata
+from src.utils.gallery_index import get_gallery_index
+from src.utils.image_utils import resize_to_cover
+
+# Index-only fields that must not be copied into a derived output's sidecar
+_ENTRY_ONLY_FIELDS = ("path", "filename", "timestamp", "content_hash", "preset")
+
+
+def _existing(entries: list[dict]) -> list[dict]:
+    return [e for e in entries if Path(e["path"]).exists()]
+
+
+def _covers(entry: dict, width: int, height: int) -> bool:
+    target = entry.get("target_resolution") or [0, 0]
+    return target[0] >= width and target[1] >= height
+
+
+def _same_upscaler(entry: dict, request: GenerationRequest) -> bool:
+    enable_upscaling = request.enable_upscaling
+    if enable_upscaling is None:
+        enable_upscaling = DEFAULT_SETTINGS["enable_upscaling"]
+    upscale_model = request.upscale_model or DEFAULT_SETTINGS["upscale_model"]
+    return (
+        entry.get("enable_upscaling") == enable_upscaling
+        and (not enable_upscaling or entry.get("upscale_model") == upscale_model)
+    )
+
+
+def _materialize(request: GenerationRequest, source: dict, encode: EncodeOptions) -> Path:
+    """Write the requested target and format from an existing output."""
+    width, height = request.target_width, request.target_height
+    source_path = Path(source["path"])
+    with Image.open(source_path) as img:
+        image = resize_to_cover(img, width, height) if img.size != (width, height) else img.copy()
+
+    metadata = {k: v for k, v in source.items() if k not in _ENTRY_ONLY_FIELDS}
+    metadata.update({
+        "target_resolution": [width, height],
+        "output_format": encode.format,
+        "content_key": request.content_key(),
+        "base_key": request.base_key(),
+        "derived_from": source_path.name,
+    })
+    output_path = get_output_path(request.prompt, width, height, ext=encode.ext)
+    write_image(image, output_path, encode, metadata)
+    digest = generate_derivatives(output_path, image=image)
+    save_metadata(output_path, {**metadata, "content_hash": digest})
+    return output_path
+
+
+def find_cached_result(request: GenerationRequest) -> PipelineResult | None:
+    """Return a finished result for ``request`` from existing outputs, if possible.
+
+    Exact hits in the requested format only touch the index; re-encodes and
+    resizes write a new output (with sidecar and derivatives) synchronously.
+
+    Returns:
+        PipelineResult without images, or None when the request must run.
+    """
+    content_key = request.content_key()
+    if content_key is None:
+        return None
+    encode = request.encode or EncodeOptions.from_settings()
+    index = get_gallery_index()
+
+    exact = _existing(index.find_by_content_key(content_key))
+    same_format = [e for e in exact if Path(e["path"]).suffix[1:] == encode.ext]
+    if same_format:
+        output_path = Path(same_format[0]["path"])
+    else:
+        if exact:
+            source = exact[0]
+        else:
+            width, height = request.target_width, request.target_height
+            larger = [
+                e for e in _existing(index.find_by_base_key(request.base_key()))
+                if _covers(e, width, height) and _same_upscaler(e, request)
+            ]
+            if not larger:
+                return None
+            # The smallest covering render needs the least resampling
+            source = min(larger, key=lambda e: e["target_resolution"][0] * e["target_resolution"][1])
+        output_path = _materialize(request, source, encode)
+
+    return PipelineResult(
+        output_path=str(output_path),
+        base_resolution=request.base_resolution,
+        target_resolution=(request.target_width, request.target_height),
+        seed_used=request.seed,
+    )
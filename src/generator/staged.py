@@ -0,0 +1,167 @@
+"""Pipelined execution: upscale and encode one batch while the next diffuses.
+
+``run_batch_pipeline`` runs its stages back to back, so the GPU idles while
+a batch is upscaled, and the diffusion model idles while the next one
+waits. ``StagedPipeline`` gives diffusion and upscaling a thread each
+(encoding already runs in the image saver's processes) and connects them
+with bounded hand-offs:
+
+- ``wait_ready`` blocks until the diffusion thread is idle, waiting for
+  work; a caller claiming jobs from a queue waits for it before claiming,
+  so the next job is fixed only when diffusion can start it at once (and
+  until then it can still be batched with later arrivals or overtaken by
+  a higher priority);
+- at most ``queue_size`` diffused batches wait for the upscaler; beyond
+  that, diffusion pauses;
+- upscaling pauses while ``max_pending_saves`` images are still being
+  encoded.
+
+Each request moves through the stages in order, so its progress events
+keep their order; events of different requests interleave. Both models are
+in use at once, so this pays off only when they fit in memory together.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.orchestrator import (
+    DiffusedBatch,
+    GenerationRequest,
+    PipelineResult,
+    PreviewCallback,
+    ProgressCallback,
+    diffuse_batch,
+    finish_batch,
+)
+
+_STOP = object()
+
+
+class StagedPipeline:
+    """Diffusion and upscale stages on their own threads, with backpressure.
+
+    Args:
+        queue_size: Diffused batches that may wait for the upscaler. Defaults to settings.
+        max_pending_saves: Images being encoded before upscaling pauses. Defaults to settings.
+        save_output: Whether to save the final images to disk.
+    """
+
+    def __init__(
+        self,
+        queue_size: int | None = None,
+        max_pending_saves: int | None = None,
+        save_output: bool = True,
+    ):
+        self.queue_size = queue_size or DEFAULT_SETTINGS["stage_queue_size"]
+        self.max_pending_saves = max_pending_saves or DEFAULT_SETTINGS["stage_max_pending_saves"]
+        self.save_output = save_output
+        self._diffusion: queue.Queue = queue.Queue(maxsize=1)
+        self._upscale: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._pending_saves = 0
+        self._saves_done = threading.Condition()
+        self._diffusion_idle = False
+        self._idle_changed = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._diffusion_loop, name="stage-diffusion", daemon=True),
+                threading.Thread(target=self._upscale_loop, name="stage-upscale", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Finish the batches already submitted, then stop the stage threads."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        self._diffusion.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait until the diffusion stage is idle; False if ``timeout`` passed first."""
+        self.start()
+        with self._idle_changed:
+            return self._idle_changed.wait_for(lambda: self._diffusion_idle, timeout)
+
+    def submit(
+        self,
+        requests: list[GenerationRequest],
+        on_progress: list[ProgressCallback | None] | None = None,
+        on_preview: list[PreviewCallback | None] | None = None,
+    ) -> Future:
+        """Queue a batch of compatible requests (see ``run_batch_pipeline``).
+
+        Blocks until the diffusion stage takes the batch, which is at once
+        after ``wait_ready``. The returned future resolves to one
+        ``PipelineResult`` per request once every image has been handed to the
+        encoder, as ``run_batch_pipeline`` returns.
+        """
+        self.start()
+        future: Future = Future()
+        self._diffusion.put((requests, on_progress, on_preview, future))
+        # Rendezvous: the diffusion thread marks the batch done as it takes it
+        self._diffusion.join()
+        return future
+
+    def _diffusion_loop(self) -> None:
+        while True:
+            self._set_idle(True)
+            item = self._diffusion.get()
+            # Not idle any more by the time submit() returns
+            self._set_idle(False)
+            self._diffusion.task_done()
+            if item is _STOP:
+                self._upscale.put(_STOP)
+                return
+            requests, on_progress, on_preview, future = item
+            try:
+                batch = diffuse_batch(requests, on_progress, on_preview)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            # Blocks while queue_size batches already wait for the upscaler
+            self._upscale.put((batch, future))
+
+    def _set_idle(self, idle: bool) -> None:
+        with self._idle_changed:
+            self._diffusion_idle = idle
+            self._idle_changed.notify_all()
+
+    def _upscale_loop(self) -> None:
+        while True:
+            item = self._upscale.get()
+            if item is _STOP:
+                return
+            batch, future = item
+            with self._saves_done:
+                self._saves_done.wait_for(lambda: self._pending_saves < self.max_pending_saves)
+            try:
+                results = self._finish(batch)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(results)
+
+    def _finish(self, batch: DiffusedBatch) -> list[PipelineResult]:
+        results = finish_batch(batch, self.save_output)
+        for result in results:
+            if result.saved is not None:
+                with self._saves_done:
+                    self._pending_saves += 1
+                result.saved.add_done_callback(self._on_saved)
+        return results
+
+    def _on_saved(self, _: Future) -> None:
+        with self._saves_done:
+            self._pending_saves -= 1
+            self._saves_done.notify_all()
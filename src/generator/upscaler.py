@@ -1,11 +1,12 @@
-import numpy as np
 import torch
 from PIL import Image
 from basicsr.archs.rrdbnet_arch import RRDBNet
-from realesrgan import RealESRGANer
 
-from src.config.settings import MODEL_DIR
-from src.config.presets import calculate_upscale_factor
+from src.config.settings import DEFAULT_SETTINGS, MODEL_DIR
+from src.config.presets import plan_upscale_passes
+from src.generator.device import ExecutionBackend, get_execution_backend
+from src.generator.tiling import TileCallback, TileConfig, TiledUpscaler
+from src.utils.image_buffer import ImageBuffer, record_copy
 
 
 UPSCALER_MODELS = {
@@ -23,17 +24,58 @@ UPSCALER_MODELS = {
     },
 }
 
+# Model used for each pass scale when upscale_model is "auto"
+UPSCALER_BY_SCALE = {
+    2: "RealESRGAN_x2plus",
+    4: "RealESRGAN_x4plus",
+}
+
+AUTO_UPSCALE_MODEL = "auto"
+
+
+def plan_upscale_models(
+    upscale_model: str,
+    base_width: int,
+    base_height: int,
+    target_width: int,
+    target_height: int,
+) -> list[str]:
+    """Return the upscaler models to run, in order, to take a base image to the target.
+
+    ``"auto"`` picks the cheapest chain (possibly none, leaving a plain Lanczos
+    resize); an explicit model name always runs that single model.
+    """
+    if upscale_model != AUTO_UPSCALE_MODEL:
+        return [upscale_model]
+    passes = plan_upscale_passes(
+        base_width, base_height, target_width, target_height,
+        lanczos_threshold=DEFAULT_SETTINGS["upscale_lanczos_threshold"],
+        model_scales=tuple(UPSCALER_BY_SCALE),
+    )
+    return [UPSCALER_BY_SCALE[scale] for scale in passes]
+
 
 def load_upscaler(
-    model_name: str = "RealESRGAN_x4plus", tile: int = 512, half: bool = True
-) -> RealESRGANer:
-    """Load RealESRGAN upscaler.
+    model_name: str = "RealESRGAN_x4plus",
+    tile: int | None = None,
+    half: bool = True,
+    overlap: int | None = None,
+    batch_size: int | None = None,
+    backend: ExecutionBackend | None = None,
+) -> TiledUpscaler:
+    """Load a Real-ESRGAN upscaler wrapped in the tiled inference engine.
 
     Args:
         model_name: Name of the upscaler model to load.
-        tile: Tile size for processing large images. 0 = no tiling.
-        half: Use fp16 for lower VRAM usage.
+        tile: Tile size for processing large images. None = settings, then
+            chosen per image from the memory budget.
+        half: Use fp16 for lower VRAM usage (CUDA only).
+        overlap: Overlap between neighbouring tiles, in input pixels. None = settings.
+        batch_size: Tiles per forward pass. None = as many as the budget allows.
+        backend: Execution backend. Defaults to the detected one. The upscaler
+            is small, so it stays on the GPU in both offload modes.
     """
+    backend = backend or get_execution_backend()
     if model_name not in UPSCALER_MODELS:
         raise ValueError(f"Unknown upscaler model: {model_name}. Choose from {list(UPSCALER_MODELS)}")
 
@@ -53,50 +95,60 @@ def load_upscaler(
         MODEL_DIR.mkdir(parents=True, exist_ok=True)
         load_file_from_url(model_url, model_dir=str(MODEL_DIR), file_name=f"{model_name}.pth")
 
-    upscaler = RealESRGANer(
-        scale=native_scale,
-        model_path=str(model_path),
-        dni_weight=None,
-        model=model,
-        tile=tile,
-        tile_pad=10,
-        pre_pad=0,
-        half=half,
-        gpu_id=0,
-    )
+    state = torch.load(model_path, map_location="cpu")
+    keyname = "params_ema" if "params_ema" in state else "params"
+    model.load_state_dict(state[keyname], strict=True)
 
-    return upscaler
+    tile = tile if tile is not None else DEFAULT_SETTINGS["upscale_tile"]
+    overlap = overlap if overlap is not None else DEFAULT_SETTINGS["upscale_tile_overlap"]
+    config = None
+    if tile:
+        # Capped like choose_tile_config: tiles must advance by a positive step
+        config = TileConfig(tile=tile, overlap=min(overlap, tile // 4), batch_size=batch_size or 1)
+
+    return TiledUpscaler(
+        model, native_scale, device=backend.device, half=half and backend.half_upscaler, config=config
+    )
 
 
 def upscale_image(
-    upscaler: RealESRGANer,
+    upscaler: TiledUpscaler,
     image: Image.Image,
     target_width: int,
     target_height: int,
+    on_tile: TileCallback | None = None,
 ) -> Image.Image:
     """Upscale a PIL image to the target resolution using Real-ESRGAN.
 
-    The image is upscaled by the model's native factor (4x), then resized
-    to the exact target resolution.
+    The image is upscaled by the model's native factor (4x) in batched,
+    feather-blended tiles, then resized to the exact target resolution.
     """
-    # Convert PIL to BGR numpy (OpenCV format expected by RealESRGAN)
-    img_rgb = np.array(image)
-    img_bgr = img_rgb[:, :, ::-1]
+    return upscale_buffer(
+        upscaler, ImageBuffer.from_pil(image), target_width, target_height, on_tile=on_tile
+    ).pil()
 
-    output_bgr, _ = upscaler.enhance(img_bgr, outscale=upscaler.scale)
 
-    # Convert back to PIL RGB
-    output_rgb = output_bgr[:, :, ::-1]
-    result = Image.fromarray(output_rgb)
+def upscale_buffer(
+    upscaler: TiledUpscaler,
+    image: ImageBuffer,
+    target_width: int,
+    target_height: int,
+    on_tile: TileCallback | None = None,
+) -> ImageBuffer:
+    """Like ``upscale_image``, but tensor in, tensor out when no resize is needed.
 
-    # Resize to exact target resolution
+    A tensor input (e.g. the VAE output) goes straight into the tiler; the
+    network output only becomes a PIL image for the final Lanczos resize.
+    """
+    result = upscaler.upscale_buffer(image, on_tile=on_tile)
     if result.size != (target_width, target_height):
-        result = result.resize((target_width, target_height), Image.LANCZOS)
-
+        resized = result.pil().resize((target_width, target_height), Image.LANCZOS)
+        record_copy(resized)
+        result = ImageBuffer.from_pil(resized)
     return result
 
 
-def unload_upscaler(upscaler: RealESRGANer) -> None:
+def unload_upscaler(upscaler: TiledUpscaler) -> None:
     """Free GPU memory used by the upscaler."""
     import gc
     del upscaler
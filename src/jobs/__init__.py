@@ -0,0 +1,5 @@
+from .events import EventBus, Subscription
+from .store import Job, JobStatus, JobStore
+from .worker import JobWorker, STAGE_WEIGHTS, JOB_HANDLERS
+from .pool import WorkerDevice, WorkerPool
+from .service import JobService, get_job_service
@@ -0,0 +1,177 @@
+"""Push-based event bus from pipeline threads to asyncio subscribers.
+
+Publishers (the worker thread, the image saver) may call ``publish`` from
+any thread. Each subscriber keeps at most one pending event per coalescable
+kind (progress, preview), so a burst of step updates collapses into the
+newest one, and delivers those at most every ``min_interval`` seconds. The
+replacement takes the tail of the queue, behind anything published since.
+Every other event (saved, complete, error, ...) is queued and delivered in
+order, immediately. Subscribers sleep on an ``asyncio.Event`` woken through
+``loop.call_soon_threadsafe``; nothing polls.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+from src.config.settings import DEFAULT_SETTINGS
+
+# Event types where only the newest pending event matters
+COALESCED_TYPES = frozenset({"progress", "preview"})
+# Progress stages that must never be coalesced away
+_DURABLE_STAGES = frozenset({"saved"})
+TERMINAL_TYPES = frozenset({"complete", "error"})
+
+
+def coalesce_key(event: dict) -> str | None:
+    """Slot an event shares with newer events of the same kind, or None if it is durable."""
+    if event["type"] in COALESCED_TYPES and event.get("stage") not in _DURABLE_STAGES:
+        return event["type"]
+    return None
+
+
+class Subscription:
+    """One consumer's view of a job's events. Read it from its own event loop."""
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop, min_interval: float = 0.0):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.delivered = 0
+        self.coalesced = 0
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._wake = asyncio.Event()
+        self._wake_scheduled = False
+        # Entries are [key, event]; a newer coalesced event replaces its key's entry
+        self._pending: deque[list] = deque()
+        self._slots: dict[str, list] = {}
+        self._durable = 0
+        self._last_sent: dict[str, float] = {}
+        self._closed = False
+
+    def push(self, event: dict) -> None:
+        """Queue an event. Safe to call from any thread."""
+        key = coalesce_key(event)
+        with self._lock:
+            if self._closed:
+                return
+            slot = self._slots.get(key) if key else None
+            if slot is not None:
+                self.coalesced += 1
+                if self._pending[-1] is slot:
+                    slot[1] = event
+                else:
+                    # Move to the tail so it stays behind events published before it
+                    self._pending.remove(slot)
+                    slot = self._slots[key] = [key, event]
+                    self._pending.append(slot)
+            else:
+                entry = [key, event]
+                self._pending.append(entry)
+                if key:
+                    self._slots[key] = entry
+                else:
+                    self._durable += 1
+            if self._wake_scheduled:
+                return
+            self._wake_scheduled = True
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Subscriber's event loop has already shut down
+            pass
+
+    def _pop_locked(self, now: float) -> tuple[dict | None, float | None]:
+        """Next deliverable event, or (None, seconds until a rate-limited one is due)."""
+        if not self._pending:
+            return None, None
+        key, event = self._pending[0]
+        if key and not self._durable:
+            # Only coalesced events pending: respect the delivery rate
+            due = self._last_sent.get(key, 0.0) + self.min_interval
+            if now < due:
+                return None, due - now
+        self._pending.popleft()
+        if key:
+            del self._slots[key]
+            self._last_sent[key] = now
+        else:
+            self._durable -= 1
+        return event, None
+
+    async def get(self) -> dict:
+        """Wait for the next event."""
+        while True:
+            with self._lock:
+                event, delay = self._pop_locked(time.monotonic())
+                if event is None:
+                    self._wake.clear()
+                    self._wake_scheduled = False
+            if event is not None:
+                self.delivered += 1
+                return event
+            if delay is None:
+                await self._wake.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            self._slots.clear()
+
+
+class EventBus:
+    """Fans out job events from worker threads to any number of subscribers per job."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, list[Subscription]] = {}
+        self._latest: dict[str, dict] = {}
+
+    def subscribe(self, job_id: str, min_interval: float | None = None) -> Subscription:
+        """Follow a job. Must be called from the subscriber's event loop.
+
+        Args:
+            job_id: Job to follow.
+            min_interval: Minimum seconds between coalesced (progress/preview)
+                deliveries. Defaults to the ``progress_min_interval`` setting.
+        """
+        if min_interval is None:
+            min_interval = DEFAULT_SETTINGS["progress_min_interval"]
+        sub = Subscription(job_id, asyncio.get_running_loop(), min_interval)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(sub)
+            latest = self._latest.get(job_id)
+        if latest is not None:
+            sub.push(latest)
+        return sub
+
+    def unsubscribe(self, job_id: str, sub: Subscription) -> None:
+        sub.close()
+        with self._lock:
+            subs = [s for s in self._subscribers.get(job_id, []) if s is not sub]
+            if subs:
+                self._subscribers[job_id] = subs
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id: str, event: dict) -> None:
+        """Deliver an event to every subscriber of a job. Safe to call from any thread."""
+        with self._lock:
+            if event["type"] == "progress":
+                self._latest[job_id] = event
+            elif event["type"] in TERMINAL_TYPES:
+                self._latest.pop(job_id, None)
+            subs = list(self._subscribers.get(job_id, []))
+        for sub in subs:
+            sub.push(event)
+
+    def subscriber_count(self, job_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(job_id, []))
@@ -0,0 +1,515 @@
+"""Worker processes, one per device, fed by a central scheduler.
+
+``JobWorker`` runs every job on one thread of the server process.
+``WorkerPool`` has the same interface but runs jobs in spawned processes,
+one per entry of the ``worker_devices`` setting, each pinned to a GPU
+("cuda:1") or a slice of CPU cores ("cpu:0-7"). A scheduler thread in the
+server claims jobs from the store and sends each to an idle worker,
+preferring one that already has the job's generator and upscalers loaded.
+Only the server touches the store; workers talk to it over a pipe each.
+
+Workers send back their progress events (published to the event bus),
+finished spans (folded into the server's ``/metrics``), their resident
+models, and a heartbeat. A worker that exits or goes silent is killed and
+respawned, and its unfinished jobs are requeued; a job that has taken down
+``worker_max_attempts`` workers is failed instead.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable
+
+import torch
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.backends import GENERATOR_KIND, UPSCALER_KIND
+from src.generator.instrumentation import Span, StageMetrics, get_stage_metrics, set_stage_metrics
+from src.generator.model_manager import ModelKey, get_model_manager
+from src.generator.upscaler import plan_upscale_models
+from src.jobs.events import EventBus
+from src.jobs.store import Job, JobStatus, JobStore
+from src.jobs.worker import BATCH_HANDLERS, JobWorker, batch_limit, final_event, request_from_params
+from src.utils.encoding import shutdown_image_saver
+
+# spawn, not fork: CUDA cannot be re-initialized in a forked child
+_CONTEXT = multiprocessing.get_context("spawn")
+
+# Allowance for a new worker to import torch and report ready
+_STARTUP_SECONDS = 120.0
+
+
+@dataclass(frozen=True)
+class WorkerDevice:
+    """Where one worker process runs: a CUDA device, or CPU cores."""
+    kind: str  # "cuda" or "cpu"
+    index: int | None = None  # CUDA device ordinal
+    cores: tuple[int, ...] = ()  # CPU cores to pin to; () = all of them
+
+    @classmethod
+    def parse(cls, spec: str) -> "WorkerDevice":
+        """Parse "cuda:N", "cpu", or "cpu:" followed by cores ("0-7", "0,2,4")."""
+        kind, _, rest = spec.partition(":")
+        try:
+            if kind == "cuda":
+                return cls("cuda", int(rest))
+            if kind == "cpu":
+                cores: list[int] = []
+                for part in filter(None, rest.split(",")):
+                    first, _, last = part.partition("-")
+                    cores.extend(range(int(first), int(last or first) + 1))
+                return cls("cpu", cores=tuple(cores))
+        except ValueError:
+            pass
+        raise ValueError(f"Unknown worker device: {spec!r}. Use cuda:N, cpu or cpu:FIRST-LAST")
+
+    def __str__(self) -> str:
+        if self.kind == "cuda":
+            return f"cuda:{self.index}"
+        return "cpu:" + ",".join(map(str, self.cores)) if self.cores else "cpu"
+
+    def pin(self) -> None:
+        """Restrict the current process to this device. Call before CUDA is used."""
+        if self.kind == "cuda":
+            # Read when CUDA initializes, so the device is cuda:0 inside the worker
+            os.environ["CUDA_VISIBLE_DEVICES"] = str(self.index)
+            return
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+        DEFAULT_SETTINGS["execution_mode"] = "cpu"
+        if self.cores:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, self.cores)
+            torch.set_num_threads(len(self.cores))
+
+
+def required_models(job: Job) -> list[ModelKey]:
+    """Models a job loads: the generator first, then a ``generate`` job's upscaler chain."""
+    models = [(GENERATOR_KIND, DEFAULT_SETTINGS["model_id"])]
+    if job.kind == "generate":
+        request = request_from_params(job.params)
+        enable_upscaling = request.enable_upscaling
+        if enable_upscaling is None:
+            enable_upscaling = DEFAULT_SETTINGS["enable_upscaling"]
+        if enable_upscaling:
+            base_w, base_h = request.base_resolution
+            chain = plan_upscale_models(
+                request.upscale_model or DEFAULT_SETTINGS["upscale_model"],
+                base_w, base_h, request.target_width, request.target_height,
+            )
+            models += [(UPSCALER_KIND, name) for name in chain]
+    return models
+
+
+def _affinity(models: list[ModelKey], loaded: list[ModelKey]) -> tuple[bool, int]:
+    """How warm a worker is for a job: generator loaded, then upscalers loaded."""
+    resident = set(loaded)
+    return models[0] in resident, sum(m in resident for m in models[1:])
+
+
+# --- Worker process side ---
+
+class _Outbox:
+    """A worker's end of its pipe to the server, shared by the worker's threads."""
+
+    def __init__(self, conn: Connection):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def put(self, *message: Any) -> None:
+        with self._lock:
+            self._conn.send(message)
+
+
+class _OutboxBus:
+    """Stands in for the event bus in a worker: events are published by the server."""
+
+    def __init__(self, outbox: _Outbox):
+        self._outbox = outbox
+
+    def publish(self, job_id: str, event: dict) -> None:
+        self._outbox.put("event", job_id, event)
+
+
+class _ForwardingMetrics(StageMetrics):
+    """Sends each finished span to the server, whose ``/metrics`` covers every worker."""
+
+    def __init__(self, outbox: _Outbox):
+        super().__init__()
+        self._outbox = outbox
+
+    def observe(self, span: Span) -> None:
+        self._outbox.put("span", span.as_dict())
+
+
+class _ProcessWorker(JobWorker):
+    """Runs the jobs the server sends and reports their outcomes instead of storing them."""
+
+    def __init__(self, outbox: _Outbox):
+        # The server owns the store
+        super().__init__(store=None, bus=_OutboxBus(outbox))
+        self.outbox = outbox
+
+    def _finish(self, job: Job, payload: dict | None, error: str | None) -> None:
+        status = self._outcome(job.id, error)
+        self.outbox.put("finished", job.id, status.value, payload, error)
+
+
+def _loaded_models() -> list[ModelKey]:
+    return get_model_manager().loaded_models()
+
+
+def _worker_main(
+    device: WorkerDevice,
+    settings: dict,
+    inbox: Connection,
+    outbox_conn: Connection,
+    initializer: Callable[[], None] | None,
+) -> None:
+    """Entry point of a worker process."""
+    DEFAULT_SETTINGS.update(settings)
+    device.pin()
+    if initializer is not None:
+        initializer()
+    outbox = _Outbox(outbox_conn)
+    set_stage_metrics(_ForwardingMetrics(outbox))
+    worker = _ProcessWorker(outbox)
+    runs: list = []
+    batches: list = []
+    arrived = threading.Condition()
+    stopping = threading.Event()
+
+    def _read() -> None:
+        # Cancel requests must get through while a job runs, so the inbox has its own thread
+        while True:
+            try:
+                message = inbox.recv()
+            except (EOFError, OSError):
+                # The server is gone; nobody is left to report to
+                os._exit(1)
+            if message[0] == "cancel":
+                worker.request_cancel(message[1])
+                continue
+            with arrived:
+                (batches if message[0] == "batch" else runs).append(message)
+                arrived.notify_all()
+
+    def _next(queue: list) -> tuple:
+        with arrived:
+            arrived.wait_for(lambda: queue)
+            return queue.pop(0)
+
+    def _beat() -> None:
+        while not stopping.wait(DEFAULT_SETTINGS["worker_heartbeat_seconds"]):
+            outbox.put("heartbeat", _loaded_models())
+
+    threading.Thread(target=_read, name="worker-inbox", daemon=True).start()
+    threading.Thread(target=_beat, name="worker-heartbeat", daemon=True).start()
+    outbox.put("ready", _loaded_models())
+    try:
+        while True:
+            message = _next(runs)
+            if message[0] == "stop":
+                break
+            job = message[1]
+            jobs = [job]
+            if job.batch_key and job.kind in BATCH_HANDLERS:
+                # Only this process can see how much memory its device has free
+                limit = batch_limit(job)
+                if limit > 1:
+                    outbox.put("claim", job.id, limit - 1)
+                    jobs += _next(batches)[1]
+            worker._execute(jobs)
+            # With staged execution, only report idle once diffusion can take the next job
+            worker.wait_ready()
+            outbox.put("idle", _loaded_models())
+    finally:
+        # Drain the staged pipeline and let background saves land, so every job is reported
+        worker.stop()
+        shutdown_image_saver(wait=True)
+        stopping.set()
+
+
+# --- Server side ---
+
+@dataclass
+class _Worker:
+    """The server's view of one worker process."""
+    index: int
+    device: WorkerDevice
+    process: Any = None
+    pid: int | None = None
+    inbox: Connection | None = None
+    outbox: Connection | None = None
+    ready: bool = False
+    busy: bool = False
+    # Jobs sent to the worker and not yet finished (including background saves)
+    jobs: dict[str, Job] = field(default_factory=dict)
+    models: list[ModelKey] = field(default_factory=list)
+    last_seen: float = 0.0
+    restarts: int = 0
+    last_failure: str | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, *message: Any) -> None:
+        try:
+            self.inbox.send(message)
+        except (OSError, AttributeError):
+            # Dead or not running; the health check takes care of it
+            pass
+
+
+def _kill(process, grace: float = 5.0) -> None:
+    process.terminate()
+    process.join(grace)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+class WorkerPool:
+    """Runs jobs in worker processes; a drop-in replacement for ``JobWorker``.
+
+    Args:
+        store: The job queue. Only this (server) process touches it.
+        bus: Event bus that worker events are published to.
+        devices: One worker per entry, as ``WorkerDevice`` or its string
+            form. Defaults to the ``worker_devices`` setting.
+        initializer: Called in each worker process before it takes jobs,
+            e.g. to register a stub backend. Must be picklable.
+        poll_interval: Seconds between queue checks when nothing wakes the scheduler.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        bus: EventBus,
+        devices: list[WorkerDevice | str] | None = None,
+        initializer: Callable[[], None] | None = None,
+        poll_interval: float = 1.0,
+    ):
+        devices = DEFAULT_SETTINGS["worker_devices"] if devices is None else devices
+        if not devices:
+            raise ValueError("WorkerPool needs at least one worker device")
+        self.store = store
+        self.bus = bus
+        self.initializer = initializer
+        self.poll_interval = poll_interval
+        self.workers = [
+            _Worker(i, d if isinstance(d, WorkerDevice) else WorkerDevice.parse(d))
+            for i, d in enumerate(devices)
+        ]
+        # Crashes per job, for jobs that have been requeued
+        self._attempts: dict[str, int] = {}
+        self._control, self._control_writer = _CONTEXT.Pipe(duplex=False)
+        self._control_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def current_job_ids(self) -> list[str]:
+        with self._lock:
+            return [job_id for w in self.workers for job_id in w.jobs]
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        with self._lock:
+            for worker in self.workers:
+                if not worker.alive:
+                    self._spawn(worker)
+        self._thread = threading.Thread(target=self._run, name="worker-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Let every worker finish its current job and saves, then stop it.
+
+        Workers still running after ``timeout`` are killed; their jobs are
+        requeued when the service next starts.
+        """
+        self._stopping.set()
+        with self._lock:
+            for worker in self.workers:
+                worker.send("stop")
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for worker in self.workers:
+            if worker.alive:
+                _kill(worker.process)
+
+    def notify(self) -> None:
+        """Wake the scheduler after a job has been submitted."""
+        self._send_control("notify")
+
+    def request_cancel(self, job_id: str) -> None:
+        self._send_control("cancel", job_id)
+
+    def status(self) -> list[dict]:
+        """One entry per worker: where it runs, its jobs, its resident models and its health."""
+        with self._lock:
+            return [{
+                "index": w.index,
+                "device": str(w.device),
+                "pid": w.pid,
+                "alive": w.alive,
+                "ready": w.ready,
+                "busy": w.busy,
+                "jobs": list(w.jobs),
+                "models": [f"{kind}:{name}" for kind, name in w.models],
+                "restarts": w.restarts,
+                "last_failure": w.last_failure,
+            } for w in self.workers]
+
+    def _send_control(self, *message: Any) -> None:
+        with self._control_lock:
+            self._control_writer.send(message)
+
+    def _spawn(self, worker: _Worker) -> None:
+        inbox_reader, inbox = _CONTEXT.Pipe(duplex=False)
+        outbox, outbox_writer = _CONTEXT.Pipe(duplex=False)
+        # Not a daemon: the worker runs its own encoder processes
+        worker.process = _CONTEXT.Process(
+            target=_worker_main,
+            args=(worker.device, dict(DEFAULT_SETTINGS), inbox_reader, outbox_writer, self.initializer),
+            name=f"wallpaper-worker-{worker.index}",
+        )
+        worker.process.start()
+        # Keep only our ends, so the outbox reports EOF when the worker exits
+        inbox_reader.close()
+        outbox_writer.close()
+        worker.pid = worker.process.pid
+        worker.inbox, worker.outbox = inbox, outbox
+        worker.ready = worker.busy = False
+        worker.models = []
+        worker.last_seen = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            outboxes = {w.outbox: w for w in self.workers if w.outbox is not None}
+            if self._stopping.is_set() and not outboxes:
+                return
+            ready = wait([self._control, *outboxes], timeout=self.poll_interval)
+            with self._lock:
+                for conn in ready:
+                    if conn is self._control:
+                        self._handle_control(*conn.recv())
+                        continue
+                    worker = outboxes[conn]
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        # Exited; the health check reaps it
+                        conn.close()
+                        worker.outbox = None
+                        continue
+                    worker.last_seen = time.monotonic()
+                    self._handle(worker, *message)
+                if not self._stopping.is_set():
+                    self._check_health()
+                    self._dispatch()
+
+    def _handle_control(self, kind: str, *args: Any) -> None:
+        if kind == "cancel":
+            (job_id,) = args
+            for worker in self.workers:
+                if job_id in worker.jobs:
+                    worker.send("cancel", job_id)
+
+    def _handle(self, worker: _Worker, kind: str, *args: Any) -> None:
+        if kind == "event":
+            job_id, event = args
+            self.bus.publish(job_id, event)
+        elif kind == "span":
+            get_stage_metrics().observe(Span(**args[0]))
+        elif kind == "heartbeat":
+            worker.models = args[0]
+        elif kind in ("ready", "idle"):
+            worker.models = args[0]
+            worker.ready, worker.busy = True, False
+        elif kind == "claim":
+            # The worker sized a batch around a job; hand it compatible queued jobs
+            job_id, limit = args
+            lead = worker.jobs[job_id]
+            extra = [] if self._stopping.is_set() else self.store.claim_compatible(
+                lead.kind, lead.batch_key, limit
+            )
+            worker.jobs.update((job.id, job) for job in extra)
+            worker.send("batch", extra)
+        elif kind == "finished":
+            job_id, status, payload, error = args
+            job = worker.jobs.pop(job_id, None)
+            if job is not None:
+                self._attempts.pop(job_id, None)
+                self._record(job, JobStatus(status), payload, error)
+
+    def _record(self, job: Job, status: JobStatus, payload: dict | None, error: str | None) -> None:
+        self.store.finish(job.id, status, result=payload, error=error)
+        job.status, job.result, job.error = status, payload, error
+        self.bus.publish(job.id, final_event(job))
+
+    def _dispatch(self) -> None:
+        """Send queued jobs to idle workers, each to the warmest one."""
+        while True:
+            idle = [w for w in self.workers if w.ready and not w.busy and w.alive]
+            if not idle:
+                return
+            job = self.store.claim_next()
+            if job is None:
+                return
+            models = required_models(job)
+            # Ties go to the lowest index, so a lone job keeps landing on the same worker
+            worker = max(idle, key=lambda w: _affinity(models, w.models))
+            worker.busy = True
+            worker.jobs[job.id] = job
+            worker.send("run", job)
+
+    def _check_health(self) -> None:
+        now = time.monotonic()
+        timeout = DEFAULT_SETTINGS["worker_heartbeat_timeout"]
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            if not worker.process.is_alive():
+                self._recover(worker, f"exited with code {worker.process.exitcode}")
+                continue
+            limit = timeout if worker.ready else max(timeout, _STARTUP_SECONDS)
+            if now - worker.last_seen > limit:
+                self._recover(worker, f"no heartbeat for {limit:.0f}s")
+
+    def _recover(self, worker: _Worker, reason: str) -> None:
+        """Replace a dead or hung worker and requeue the jobs it held."""
+        _kill(worker.process)
+        for conn in (worker.inbox, worker.outbox):
+            if conn is not None:
+                conn.close()
+        worker.inbox = worker.outbox = None
+        worker.last_failure = f"worker {worker.index} ({worker.device}) {reason}"
+        for job in worker.jobs.values():
+            self._requeue(job, worker.last_failure)
+        worker.jobs.clear()
+        if not worker.ready:
+            # Died before taking a job: a broken device or setup, restarting won't help
+            worker.process = None
+            worker.ready = worker.busy = False
+            return
+        worker.restarts += 1
+        self._spawn(worker)
+
+    def _requeue(self, job: Job, reason: str) -> None:
+        attempts = self._attempts.get(job.id, 0) + 1
+        if attempts >= DEFAULT_SETTINGS["worker_max_attempts"]:
+            self._attempts.pop(job.id, None)
+            error = f"Job failed {attempts} time(s) with its worker: {reason}"
+            self._record(job, JobStatus.FAILED, {"success": False, "error": error}, error)
+            return
+        self._attempts[job.id] = attempts
+        if self.store.requeue(job.id) == JobStatus.CANCELLED:
+            job.status = JobStatus.CANCELLED
+            self.bus.publish(job.id, final_event(job))
@@ -0,0 +1,97 @@
+"""Process-wide job service tying together the store, worker and event bus."""
+
+import threading
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.result_cache import find_cached_result
+from src.jobs.events import EventBus, Subscription
+from src.jobs.pool import WorkerPool
+from src.jobs.store import Job, JobStatus, JobStore
+from src.jobs.worker import (
+    JobWorker,
+    batch_key_for,
+    final_event,
+    pipeline_result_payload,
+    request_from_params,
+)
+from src.utils.encoding import shutdown_image_saver
+
+
+class JobService:
+    """Submit, inspect, cancel and follow generation jobs."""
+
+    def __init__(self, store: JobStore | None = None):
+        self.store = store or JobStore()
+        self.bus = EventBus()
+        # Worker processes when devices are configured, else a thread of this process
+        if DEFAULT_SETTINGS["worker_devices"]:
+            self.worker: JobWorker | WorkerPool = WorkerPool(self.store, self.bus)
+        else:
+            self.worker = JobWorker(self.store, self.bus)
+
+    def start(self) -> None:
+        """Recover jobs interrupted by a restart and start the worker."""
+        self.store.requeue_interrupted()
+        self.worker.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Stop the worker, then flush images still being encoded."""
+        self.worker.stop(timeout)
+        shutdown_image_saver(wait=True)
+
+    def submit(self, kind: str, params: dict, priority: int = 0) -> Job:
+        """Queue a job, or complete it at once when an existing output answers it.
+
+        Seeded ``generate`` jobs are looked up in the result cache unless
+        ``params["force_regenerate"]`` is set.
+        """
+        if kind == "generate" and not params.get("force_regenerate"):
+            cached = find_cached_result(request_from_params(params))
+            if cached is not None:
+                payload = {**pipeline_result_payload(cached), "cached": True}
+                return self.store.record_complete(kind, params, payload, priority=priority)
+        job = self.store.submit(
+            kind, params, priority=priority, batch_key=batch_key_for(kind, params)
+        )
+        self.worker.notify()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.store.get(job_id)
+
+    def position(self, job_id: str) -> int | None:
+        return self.store.position(job_id)
+
+    def cancel(self, job_id: str) -> JobStatus | None:
+        """Cancel a job; returns its resulting status, or None if unknown."""
+        status = self.store.cancel(job_id)
+        if status == JobStatus.CANCELLED:
+            job = self.store.get(job_id)
+            self.bus.publish(job_id, final_event(job))
+        elif status == JobStatus.RUNNING:
+            self.worker.request_cancel(job_id)
+        return status
+
+    def subscribe(self, job_id: str, min_interval: float | None = None) -> Subscription:
+        """Follow a job's events. Finished jobs yield their terminal event at once."""
+        sub = self.bus.subscribe(job_id, min_interval)
+        job = self.store.get(job_id)
+        if job is not None and job.status.is_terminal:
+            sub.push(final_event(job))
+        return sub
+
+    def unsubscribe(self, job_id: str, sub: Subscription) -> None:
+        self.bus.unsubscribe(job_id, sub)
+
+
+_service: JobService | None = None
+_service_lock = threading.Lock()
+
+
+def get_job_service() -> JobService:
+    """Return the process-wide job service, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = JobService()
+        return _service
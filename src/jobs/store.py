@@ -0,0 +1,335 @@
+"""SQLite-backed persistent job queue.
+
+Jobs are ordered by priority (higher first) and then by submission order.
+The database lives in a local file so queued jobs survive a restart; jobs
+that were running when the process died are put back in the queue.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+
+from src.config.settings import JOBS_DB_PATH, ensure_directories
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (JobStatus.COMPLETE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: dict
+    status: JobStatus
+    priority: int = 0
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
+    cancel_requested: bool = False
+    batch_key: str | None = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    batch_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, seq);
+"""
+
+# Columns added after the first release, applied to existing databases on open
+_MIGRATIONS = {
+    "batch_key": "ALTER TABLE jobs ADD COLUMN batch_key TEXT",
+}
+
+_COLUMNS = (
+    "seq, id, kind, params, status, priority, created_at, started_at, "
+    "finished_at, result, error, cancel_requested, batch_key"
+)
+
+
+def _row_to_job(row: tuple) -> Job:
+    (_, job_id, kind, params, status, priority, created_at, started_at,
+     finished_at, result, error, cancel_requested, batch_key) = row
+    return Job(
+        id=job_id,
+        kind=kind,
+        params=json.loads(params),
+        status=JobStatus(status),
+        priority=priority,
+        created_at=created_at,
+        started_at=started_at,
+        finished_at=finished_at,
+        result=json.loads(result) if result else None,
+        error=error,
+        cancel_requested=bool(cancel_requested),
+        batch_key=batch_key,
+    )
+
+
+class JobStore:
+    """Persistent FIFO/priority queue of generation jobs."""
+
+    def __init__(self, db_path: Path | str | None = None):
+        if db_path is None:
+            ensure_directories()
+            db_path = JOBS_DB_PATH
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        if self.db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in existing:
+                self._conn.execute(statement)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def submit(
+        self, kind: str, params: dict, priority: int = 0, batch_key: str | None = None
+    ) -> Job:
+        """Add a job to the queue and return it.
+
+        Jobs with the same non-null ``batch_key`` may be claimed together.
+        """
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            params=params,
+            status=JobStatus.QUEUED,
+            priority=priority,
+            created_at=time.time(),
+            batch_key=batch_key,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, priority, created_at, batch_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, kind, json.dumps(params), job.status.value, priority,
+                 job.created_at, batch_key),
+            )
+        return job
+
+    def record_complete(self, kind: str, params: dict, result: dict, priority: int = 0) -> Job:
+        """Store a job that was answered without running (e.g. from the result cache)."""
+        now = time.time()
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            params=params,
+            status=JobStatus.COMPLETE,
+            priority=priority,
+            created_at=now,
+            started_at=now,
+            finished_at=now,
+            result=result,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, priority, created_at, started_at, "
+                "finished_at, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, kind, json.dumps(params), job.status.value, priority, now, now, now,
+                 json.dumps(result)),
+            )
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list_jobs(self, statuses: list[JobStatus] | None = None, limit: int = 100) -> list[Job]:
+        """Return jobs in queue order, optionally restricted to some statuses."""
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        args: list = []
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            args.extend(s.value for s in statuses)
+        query += " ORDER BY priority DESC, seq LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def claim_next(self) -> Job | None:
+        """Atomically move the next queued job to running and return it."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = ? "
+                    "ORDER BY priority DESC, seq LIMIT 1",
+                    (JobStatus.QUEUED.value,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                started = time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE seq = ?",
+                    (JobStatus.RUNNING.value, started, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = _row_to_job(row)
+        job.status = JobStatus.RUNNING
+        job.started_at = started
+        return job
+
+    def claim_compatible(self, kind: str, batch_key: str, limit: int) -> list[Job]:
+        """Atomically claim up to ``limit`` queued jobs sharing a kind and batch key."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = ? AND kind = ? AND batch_key = ? "
+                    "ORDER BY priority DESC, seq LIMIT ?",
+                    (JobStatus.QUEUED.value, kind, batch_key, limit),
+                ).fetchall()
+                started = time.time()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE seq = ?",
+                    [(JobStatus.RUNNING.value, started, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        jobs = [_row_to_job(r) for r in rows]
+        for job in jobs:
+            job.status = JobStatus.RUNNING
+            job.started_at = started
+        return jobs
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Record the terminal state of a job."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status.value, time.time(), json.dumps(result) if result else None, error, job_id),
+            )
+
+    def cancel(self, job_id: str) -> JobStatus | None:
+        """Cancel a job. Queued jobs are cancelled immediately; running jobs are flagged.
+
+        Returns the job's status after the call, or None if it does not exist.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            status = JobStatus(row[0])
+            if status == JobStatus.QUEUED:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                    (JobStatus.CANCELLED.value, time.time(), job_id),
+                )
+                return JobStatus.CANCELLED
+            if status == JobStatus.RUNNING:
+                self._conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,)
+                )
+            return status
+
+    def position(self, job_id: str) -> int | None:
+        """Return the 1-based queue position of a queued job, 0 if running, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, status, priority FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            seq, status, priority = row
+            if status == JobStatus.RUNNING.value:
+                return 0
+            if status != JobStatus.QUEUED.value:
+                return None
+            (ahead,) = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? "
+                "AND (priority > ? OR (priority = ? AND seq < ?))",
+                (JobStatus.QUEUED.value, priority, priority, seq),
+            ).fetchone()
+        return ahead + 1
+
+    def requeue(self, job_id: str) -> JobStatus | None:
+        """Put a running job whose worker died back in the queue.
+
+        A job with a pending cancel request is cancelled instead. Returns the
+        job's new status, or None if it was not running.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row[0] != JobStatus.RUNNING.value:
+                return None
+            if row[1]:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                    (JobStatus.CANCELLED.value, time.time(), job_id),
+                )
+                return JobStatus.CANCELLED
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE id = ?",
+                (JobStatus.QUEUED.value, job_id),
+            )
+            return JobStatus.QUEUED
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a previous process back in the queue."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL "
+                "WHERE status = ? AND cancel_requested = 0",
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE status = ?",
+                (JobStatus.CANCELLED.value, time.time(), JobStatus.RUNNING.value),
+            )
+        return cur.rowcount
@@ -0,0 +1,438 @@
+"""Single GPU worker that drains the job queue and publishes progress."""
+
+import base64
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable
+
+from src.config.settings import DEFAULT_SETTINGS
+from src.generator.orchestrator import (
+    DraftCallback,
+    DraftGridResult,
+    GenerationRequest,
+    MultiTargetResult,
+    PipelineResult,
+    PipelineStage,
+    PreviewCallback,
+    run_batch_pipeline,
+    run_draft_grid,
+    run_multi_target_pipeline,
+    run_pipeline,
+)
+from src.generator.backends import get_backend
+from src.generator.model_manager import get_model_manager
+from src.generator.staged import StagedPipeline
+from src.jobs.events import EventBus
+from src.utils.encoding import EncodeOptions
+from src.jobs.store import Job, JobStatus, JobStore
+
+# Overall progress range covered by each pipeline stage
+STAGE_WEIGHTS = {
+    "loading_model": (0.0, 0.15),
+    "generating": (0.15, 0.65),
+    "unloading_model": (0.65, 0.70),
+    "loading_upscaler": (0.70, 0.75),
+    "upscaling": (0.75, 0.95),
+    "saving": (0.95, 0.99),
+    "complete": (0.99, 0.99),
+    "saved": (1.0, 1.0),
+}
+
+
+class JobCancelled(Exception):
+    """Raised from the progress callback to abort a cancelled job."""
+
+
+JobProgress = Callable[[PipelineStage, float, str], None]
+JobOutput = tuple[dict, list[Future]]
+"""Result payload with 'success' and 'error', plus the job's pending background saves"""
+JobHandler = Callable[[Job, JobProgress, PreviewCallback], JobOutput]
+"""Handler signature: (job, on_progress, on_preview) -> (payload, pending saves)"""
+BatchHandler = Callable[[list[Job], list[JobProgress], list[PreviewCallback]], list[JobOutput]]
+"""Batch handler signature: (jobs, per-job on_progress, per-job on_preview) -> one output per job"""
+
+
+def pipeline_result_payload(result: PipelineResult) -> dict:
+    """Convert a PipelineResult into the JSON payload sent to clients."""
+    filename = Path(result.output_path).name if result.output_path else None
+    return {
+        "success": result.error is None,
+        "image_url": f"/images/{filename}" if filename else None,
+        "filename": filename,
+        "seed_used": result.seed_used,
+        "base_resolution": list(result.base_resolution) if result.base_resolution else None,
+        "target_resolution": list(result.target_resolution) if result.target_resolution else None,
+        "error": result.error,
+    }
+
+
+def multi_target_payload(multi: MultiTargetResult) -> dict:
+    """Convert a MultiTargetResult into the JSON payload sent to clients."""
+    outputs = []
+    for result in multi.results:
+        item = pipeline_result_payload(result)
+        item["preset"] = result.preset_name
+        outputs.append(item)
+    return {
+        "success": multi.error is None,
+        "seed_used": multi.seed_used,
+        "outputs": outputs,
+        "error": multi.error,
+    }
+
+
+def _data_url(jpeg: bytes) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+
+
+def draft_grid_payload(grid: DraftGridResult) -> dict:
+    """Convert a DraftGridResult into the JSON payload sent to clients."""
+    return {
+        "success": grid.error is None,
+        "seeds": [d.seed for d in grid.drafts],
+        "drafts": [
+            {"index": i, "seed": d.seed, "image": _data_url(d.thumbnail)}
+            for i, d in enumerate(grid.drafts)
+        ],
+        "base_resolution": list(grid.base_resolution) if grid.base_resolution else None,
+        "num_inference_steps": grid.num_inference_steps,
+        "error": grid.error,
+    }
+
+
+def _pending_saves(results: list[PipelineResult]) -> list[Future]:
+    return [r.saved for r in results if r.saved is not None]
+
+
+def encode_from_params(params: dict) -> EncodeOptions:
+    """Build output encoding options from stored job parameters."""
+    return EncodeOptions.from_settings(
+        format=params.get("output_format"),
+        quality=params.get("output_quality"),
+        png_compress_level=params.get("png_compress_level"),
+        lossless=params.get("output_lossless"),
+        embed_metadata=params.get("embed_metadata"),
+    )
+
+
+def request_from_params(params: dict) -> GenerationRequest:
+    """Build a GenerationRequest from stored ``generate`` job parameters."""
+    seed = params.get("seed", -1)
+    return GenerationRequest(
+        prompt=params["prompt"],
+        target_width=params["target_width"],
+        target_height=params["target_height"],
+        negative_prompt=params.get("negative_prompt"),
+        num_inference_steps=params.get("num_inference_steps"),
+        guidance_scale=params.get("guidance_scale"),
+        seed=seed if seed is not None and seed >= 0 else None,
+        enable_upscaling=params.get("enable_upscaling"),
+        upscale_model=params.get("upscale_model"),
+        encode=encode_from_params(params),
+        preview_every=params.get("preview_every"),
+        scheduler=params.get("scheduler"),
+        profile=params.get("profile"),
+    )
+
+
+def run_generate_job(job: Job, on_progress: JobProgress, on_preview: PreviewCallback) -> JobOutput:
+    request = request_from_params(job.params)
+    result = run_pipeline(**vars(request), on_progress=on_progress, on_preview=on_preview)
+    return pipeline_result_payload(result), _pending_saves([result])
+
+
+def run_generate_batch(
+    jobs: list[Job], on_progress: list[JobProgress], on_preview: list[PreviewCallback]
+) -> list[JobOutput]:
+    requests = [request_from_params(job.params) for job in jobs]
+    results = run_batch_pipeline(requests, on_progress=on_progress, on_preview=on_preview)
+    return [(pipeline_result_payload(r), _pending_saves([r])) for r in results]
+
+
+def run_multi_target_job(job: Job, on_progress: JobProgress, on_preview: PreviewCallback) -> JobOutput:
+    p = job.params
+    seed = p.get("seed", -1)
+    multi = run_multi_target_pipeline(
+        prompt=p["prompt"],
+        preset_names=p["presets"],
+        negative_prompt=p.get("negative_prompt"),
+        num_inference_steps=p.get("num_inference_steps"),
+        guidance_scale=p.get("guidance_scale"),
+        seed=seed if seed is not None and seed >= 0 else None,
+        enable_upscaling=p.get("enable_upscaling"),
+        upscale_model=p.get("upscale_model"),
+        encode=encode_from_params(p),
+        preview_every=p.get("preview_every"),
+        scheduler=p.get("scheduler"),
+        profile=p.get("profile"),
+        on_progress=on_progress,
+        on_preview=on_preview,
+    )
+    return multi_target_payload(multi), _pending_saves(multi.results)
+
+
+def run_draft_grid_job(job: Job, on_progress: JobProgress, on_draft: DraftCallback) -> JobOutput:
+    # The worker hands draft-grid jobs a draft callback in the preview slot
+    p = job.params
+    grid = run_draft_grid(
+        prompt=p["prompt"],
+        target_width=p["target_width"],
+        target_height=p["target_height"],
+        count=p.get("count"),
+        seeds=p.get("seeds"),
+        negative_prompt=p.get("negative_prompt"),
+        num_inference_steps=p.get("num_inference_steps"),
+        guidance_scale=p.get("guidance_scale"),
+        base_size=p.get("base_size"),
+        scheduler=p.get("scheduler"),
+        on_progress=on_progress,
+        on_draft=on_draft,
+    )
+    return draft_grid_payload(grid), []
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {
+    "generate": run_generate_job,
+    "multi_target": run_multi_target_job,
+    "draft_grid": run_draft_grid_job,
+}
+
+BATCH_HANDLERS: dict[str, BatchHandler] = {
+    "generate": run_generate_batch,
+}
+
+
+def batch_key_for(kind: str, params: dict) -> str | None:
+    """Return the key under which a job may be batched with others, if any."""
+    if kind == "generate":
+        return request_from_params(params).batch_key()
+    return None
+
+
+def batch_limit(job: Job) -> int:
+    """Largest batch the worker should build around this job."""
+    if job.kind == "generate":
+        return get_backend().max_batch_size(*request_from_params(job.params).base_resolution)
+    return 1
+
+
+def final_event(job: Job) -> dict:
+    """Build the terminal event for a finished job."""
+    if job.status == JobStatus.CANCELLED:
+        return {"type": "error", "job_id": job.id, "cancelled": True, "error": "Job was cancelled."}
+    payload = job.result or {"success": False, "error": job.error}
+    return {"type": "complete", "job_id": job.id, **payload}
+
+
+class JobWorker:
+    """Background thread that runs queued jobs one at a time.
+
+    With the ``pipeline_stages`` setting, ``generate`` jobs go through a
+    ``StagedPipeline`` instead: the worker claims the next job as soon as
+    diffusion is idle, while earlier jobs are still upscaling and encoding.
+    """
+
+    def __init__(self, store: JobStore, bus: EventBus, poll_interval: float = 1.0):
+        self.store = store
+        self.bus = bus
+        self.poll_interval = poll_interval
+        self.current_job_ids: list[str] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._cancelled: set[str] = set()
+        self._thread: threading.Thread | None = None
+        # Stages overlap only when both models can stay resident
+        self.pipeline = (
+            StagedPipeline()
+            if DEFAULT_SETTINGS["pipeline_stages"] and not DEFAULT_SETTINGS["low_memory_mode"]
+            else None
+        )
+        self._ids_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.pipeline is not None:
+            self.pipeline.stop(timeout)
+
+    def notify(self) -> None:
+        """Wake the worker after a job has been submitted."""
+        self._wakeup.set()
+
+    def request_cancel(self, job_id: str) -> None:
+        self._cancelled.add(job_id)
+
+    def status(self) -> list[dict]:
+        """One entry per worker: where it runs, its jobs and its resident models."""
+        return [{
+            "index": 0,
+            "device": "in-process",
+            "pid": os.getpid(),
+            "alive": self._thread is not None and self._thread.is_alive(),
+            "jobs": list(self.current_job_ids),
+            "models": [f"{kind}:{name}" for kind, name in get_model_manager().loaded_models()],
+        }]
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait until a claimed job could start diffusing; False on timeout."""
+        return self.pipeline is None or self.pipeline.wait_ready(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            # Claiming fixes a job's batch and place in line, so leave it queued until it can start
+            if not self.wait_ready(self.poll_interval):
+                continue
+            job = self.store.claim_next()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            jobs = [job]
+            # Pull compatible queued jobs into the same diffusion batch
+            if job.batch_key and job.kind in BATCH_HANDLERS:
+                jobs += self.store.claim_compatible(job.kind, job.batch_key, batch_limit(job) - 1)
+            self._execute(jobs)
+
+    def _progress_callback(self, job: Job) -> JobProgress:
+        def on_progress(stage: PipelineStage, frac: float, msg: str) -> None:
+            # SAVED runs on the saver's thread once the file is on disk; raising
+            # there would fail a save that succeeded, and nothing is left to stop
+            if job.id in self._cancelled and stage != PipelineStage.SAVED:
+                raise JobCancelled(job.id)
+            weights = STAGE_WEIGHTS.get(stage.value, (0.0, 0.0))
+            overall = weights[0] + frac * (weights[1] - weights[0])
+            self.bus.publish(job.id, {
+                "type": "progress",
+                "job_id": job.id,
+                "stage": stage.value,
+                "progress": round(min(overall, 1.0), 4),
+                "message": msg,
+            })
+        return on_progress
+
+    def _preview_callback(self, job: Job) -> PreviewCallback:
+        def on_preview(step: int, total_steps: int, frame: bytes) -> None:
+            self.bus.publish(job.id, {
+                "type": "preview",
+                "job_id": job.id,
+                "step": step,
+                "total_steps": total_steps,
+                "image": _data_url(frame),
+            })
+        return on_preview
+
+    def _draft_callback(self, job: Job) -> DraftCallback:
+        def on_draft(index: int, seed: int, thumbnail: bytes) -> None:
+            self.bus.publish(job.id, {
+                "type": "draft",
+                "job_id": job.id,
+                "index": index,
+                "seed": seed,
+                "image": _data_url(thumbnail),
+            })
+        return on_draft
+
+    def _execute(self, jobs: list[Job]) -> None:
+        callbacks = [self._progress_callback(job) for job in jobs]
+        previews = [
+            self._draft_callback(job) if job.kind == "draft_grid" else self._preview_callback(job)
+            for job in jobs
+        ]
+        kind = jobs[0].kind
+        if self.pipeline is not None and kind == "generate":
+            self._execute_staged(jobs, callbacks, previews)
+            return
+
+        self.current_job_ids = [job.id for job in jobs]
+        try:
+            if len(jobs) > 1:
+                outputs = BATCH_HANDLERS[kind](jobs, callbacks, previews)
+            elif kind in JOB_HANDLERS:
+                outputs = [JOB_HANDLERS[kind](jobs[0], callbacks[0], previews[0])]
+            else:
+                raise ValueError(f"Unknown job kind: {kind}")
+        except Exception as e:
+            outputs = [({"success": False, "error": str(e)}, [])] * len(jobs)
+
+        self._complete(jobs, outputs)
+        self.current_job_ids = []
+
+    def _execute_staged(
+        self, jobs: list[Job], callbacks: list[JobProgress], previews: list[PreviewCallback]
+    ) -> None:
+        """Hand ``generate`` jobs to the staged pipeline; returns once diffusion has taken them."""
+        ids = {job.id for job in jobs}
+        with self._ids_lock:
+            self.current_job_ids = self.current_job_ids + list(ids)
+
+        def on_done(results: Future) -> None:
+            try:
+                outputs = [(pipeline_result_payload(r), _pending_saves([r])) for r in results.result()]
+            except Exception as e:
+                outputs = [({"success": False, "error": str(e)}, [])] * len(jobs)
+            with self._ids_lock:
+                self.current_job_ids = [i for i in self.current_job_ids if i not in ids]
+            self._complete(jobs, outputs)
+
+        try:
+            requests = [request_from_params(job.params) for job in jobs]
+            future = self.pipeline.submit(requests, callbacks, previews)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(on_done)
+
+    def _complete(self, jobs: list[Job], outputs: list[JobOutput]) -> None:
+        # The GPU is free now; jobs still encoding finish when their files land
+        for job, (payload, pending) in zip(jobs, outputs):
+            if pending:
+                self._finish_when_saved(job, payload, pending)
+            else:
+                self._finish(job, payload, payload.get("error"))
+
+    def _finish_when_saved(self, job: Job, payload: dict, pending: list[Future]) -> None:
+        remaining = len(pending)
+        lock = threading.Lock()
+
+        def on_done(_: Future) -> None:
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                if remaining:
+                    return
+            error = payload.get("error")
+            failures = [f.exception() for f in pending if f.exception() is not None]
+            if failures and error is None:
+                error = f"Saving failed: {failures[0]}"
+                self._finish(job, {**payload, "success": False, "error": error}, error)
+            else:
+                self._finish(job, payload, error)
+
+        for future in pending:
+            future.add_done_callback(on_done)
+
+    def _outcome(self, job_id: str, error: str | None) -> JobStatus:
+        """Terminal status of a job that stopped running with ``error``."""
+        cancelled = job_id in self._cancelled
+        self._cancelled.discard(job_id)
+        if cancelled:
+            return JobStatus.CANCELLED
+        return JobStatus.COMPLETE if error is None else JobStatus.FAILED
+
+    def _finish(self, job: Job, payload: dict | None, error: str | None) -> None:
+        """Record a job's outcome and publish its terminal event. Safe from any thread."""
+        status = self._outcome(job.id, error)
+        self.store.finish(job.id, status, result=payload, error=error)
+        job.status, job.result, job.error = status, payload, error
+        self.bus.publish(job.id, final_event(job))
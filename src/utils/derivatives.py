@@ -0,0 +1,137 @@
+"""Thumbnail and preview derivatives for gallery images.
+
+Derivatives are stored in a content-addressed cache: the file name is the
+SHA-256 of the source image plus the derivative kind, so identical images
+share derivatives and a changed image can never serve a stale thumbnail.
+
+Backfill derivatives for existing outputs with:
+    python -m src.utils.derivatives
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from src.config.settings import DERIVATIVE_DIR
+from src.utils.image_utils import create_thumbnail
+
+# Bounding boxes for each derivative kind
+DERIVATIVE_SIZES = {
+    "thumb": (480, 480),
+    "preview": (1600, 1600),
+}
+
+# format name -> (PIL format, file extension, media type)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+DERIVATIVE_QUALITY = 82
+
+
+def content_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derivative_path(digest: str, kind: str, fmt: str = "webp") -> Path:
+    """Return the cache path for a derivative of the image with the given digest."""
+    ext = DERIVATIVE_FORMATS[fmt][1]
+    return DERIVATIVE_DIR / digest[:2] / f"{digest}_{kind}.{ext}"
+
+
+def _write_derivative(image: Image.Image, path: Path, kind: str, fmt: str) -> None:
+    pil_format = DERIVATIVE_FORMATS[fmt][0]
+    thumb = create_thumbnail(image, DERIVATIVE_SIZES[kind])
+    if thumb.mode not in ("RGB", "L") and pil_format == "JPEG":
+        thumb = thumb.convert("RGB")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temp file and rename so readers never see a partial derivative
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            thumb.save(f, format=pil_format, quality=DERIVATIVE_QUALITY, method=4)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def ensure_derivative(
+    image_path: Path,
+    kind: str,
+    fmt: str = "webp",
+    digest: str | None = None,
+    image: Image.Image | None = None,
+) -> tuple[Path, str]:
+    """Return the path of a derivative, creating it if it is not cached yet.
+
+    Args:
+        image_path: Source image in the output directory.
+        kind: Derivative kind, a key of DERIVATIVE_SIZES.
+        fmt: Output format, a key of DERIVATIVE_FORMATS.
+        digest: Known content hash of the source, to skip re-hashing it.
+        image: Already-decoded source image, to skip re-reading it.
+
+    Returns:
+        (derivative path, source content hash)
+    """
+    if kind not in DERIVATIVE_SIZES:
+        raise ValueError(f"Unknown derivative kind: {kind}. Choose from {list(DERIVATIVE_SIZES)}")
+    if fmt not in DERIVATIVE_FORMATS:
+        raise ValueError(f"Unknown derivative format: {fmt}. Choose from {list(DERIVATIVE_FORMATS)}")
+    digest = digest or content_hash(image_path)
+    path = derivative_path(digest, kind, fmt)
+    if not path.exists():
+        if image is not None:
+            _write_derivative(image, path, kind, fmt)
+        else:
+            with Image.open(image_path) as img:
+                img.draft("RGB", DERIVATIVE_SIZES[kind])
+                _write_derivative(img, path, kind, fmt)
+    return path, digest
+
+
+def generate_derivatives(
+    image_path: Path, image: Image.Image | None = None, fmt: str = "webp"
+) -> str:
+    """Create every derivative kind for an image and return its content hash."""
+    digest = content_hash(image_path)
+    for kind in DERIVATIVE_SIZES:
+        ensure_derivative(image_path, kind, fmt, digest=digest, image=image)
+    return digest
+
+
+def backfill_derivatives(fmt: str = "webp") -> int:
+    """Create missing derivatives for every output and record their hashes."""
+    from src.utils.file_utils import list_outputs
+    from src.utils.gallery_index import get_gallery_index
+
+    index = get_gallery_index()
+    count = 0
+    for img_path in list_outputs():
+        digest = generate_derivatives(img_path, fmt=fmt)
+        index.set_content_hash(img_path.name, digest)
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill gallery thumbnails and previews.")
+    parser.add_argument("--format", choices=list(DERIVATIVE_FORMATS), default="webp")
+    args = parser.parse_args()
+    count = backfill_derivatives(fmt=args.format)
+    print(f"Derivatives ready for {count} images in {DERIVATIVE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Output image encoding, off the GPU worker thread.
+
+Final wallpapers are encoded in a small process pool so a multi-second PNG
+or AVIF encode never holds up the next generation. Files are written to a
+temp file next to the target and renamed into place, so the gallery never
+sees a partial image.
+"""
+
+import contextvars
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from src.config.settings import DEFAULT_SETTINGS
+
+# format name -> (PIL format, file extension)
+OUTPUT_FORMATS = {
+    "png": ("PNG", "png"),
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+    "avif": ("AVIF", "avif"),
+}
+
+OUTPUT_EXTENSIONS = tuple(ext for _, ext in OUTPUT_FORMATS.values())
+
+# PNG text chunk / EXIF tag used for embedded generation metadata
+METADATA_KEY = "wallpaper-gen"
+_EXIF_IMAGE_DESCRIPTION = 0x010E
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """How a final image is written to disk."""
+    format: str = "png"
+    quality: int = 95  # JPEG/AVIF/lossy WebP quality; effort for lossless WebP
+    png_compress_level: int = 6  # 0 (fastest) - 9 (smallest)
+    lossless: bool = False  # WebP only
+    embed_metadata: bool = True
+
+    @property
+    def ext(self) -> str:
+        return OUTPUT_FORMATS[self.format][1]
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "EncodeOptions":
+        """Build options from DEFAULT_SETTINGS, with non-None overrides applied."""
+        options = {
+            "format": DEFAULT_SETTINGS["output_format"],
+            "quality": DEFAULT_SETTINGS["output_quality"],
+            "png_compress_level": DEFAULT_SETTINGS["png_compress_level"],
+            "lossless": DEFAULT_SETTINGS["output_lossless"],
+            "embed_metadata": DEFAULT_SETTINGS["embed_metadata"],
+        }
+        options.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**options)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def format_available(fmt: str) -> bool:
+    """Whether Pillow can write the given output format in this environment."""
+    if fmt not in OUTPUT_FORMATS:
+        return False
+    pil_format = OUTPUT_FORMATS[fmt][0]
+    if pil_format == "AVIF":
+        try:
+            # Registers AVIF support on Pillow < 11.2
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+    Image.init()
+    return pil_format in Image.SAVE
+
+
+def _save_kwargs(image: Image.Image, options: EncodeOptions, metadata: dict | None) -> dict:
+    pil_format = OUTPUT_FORMATS[options.format][0]
+    kwargs: dict = {"format": pil_format}
+    text = json.dumps(metadata) if metadata and options.embed_metadata else None
+
+    if pil_format == "PNG":
+        kwargs["compress_level"] = options.png_compress_level
+        if text:
+            info = PngInfo()
+            info.add_text(METADATA_KEY, text)
+            kwargs["pnginfo"] = info
+        return kwargs
+
+    kwargs["quality"] = options.quality
+    if pil_format == "WEBP":
+        kwargs["lossless"] = options.lossless
+        kwargs["method"] = 4
+    elif pil_format == "JPEG":
+        kwargs["optimize"] = True
+    if text:
+        exif = image.getexif()
+        exif[_EXIF_IMAGE_DESCRIPTION] = text
+        kwargs["exif"] = exif.tobytes()
+    return kwargs
+
+
+def write_image(
+    image: Image.Image, path: Path, options: EncodeOptions, metadata: dict | None = None
+) -> Path:
+    """Encode an image and atomically move it to ``path``. Runs in the encoder pool."""
+    if not format_available(options.format):
+        raise ValueError(f"Output format not supported by this Pillow build: {options.format}")
+    if options.format == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    path = Path(path)
+    # Hidden ".part" temp file: not matched by the gallery's output globs
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, **_save_kwargs(image, options, metadata))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+SavedCallback = Callable[[Path], None]
+"""Callback run once the file is on disk: (output path)"""
+
+
+class ImageSaver:
+    """Encode images in worker processes and run follow-up work when they land.
+
+    Args:
+        max_workers: Encoder processes. Defaults to the ``encode_workers`` setting.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        workers = max_workers or DEFAULT_SETTINGS["encode_workers"]
+        # spawn, not fork: the parent holds CUDA state and worker threads
+        self._encoders = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        # Follow-up work (sidecar, index, derivatives) runs here, in order
+        self._finishers = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-saver")
+
+    def save(
+        self,
+        image: Image.Image,
+        path: Path,
+        options: EncodeOptions,
+        metadata: dict | None = None,
+        on_saved: SavedCallback | None = None,
+    ) -> Future:
+        """Queue an image for encoding.
+
+        Returns:
+            Future resolving to the output path once the file is on disk and
+            ``on_saved`` has run, or to the exception either raised.
+        """
+        # Imported here: image_buffer pulls in torch, which encoder processes never need
+        from src.utils.image_buffer import record_copy
+
+        done: Future = Future()
+        # The frame is pickled whole to reach the encoder process
+        record_copy(image)
+        encoded = self._encoders.submit(write_image, image, path, options, metadata)
+        # on_saved runs in the caller's context, so copy counts and traces see its work
+        context = contextvars.copy_context()
+        encoded.add_done_callback(
+            lambda f: self._finishers.submit(context.run, self._finalize, f, done, on_saved)
+        )
+        return done
+
+    @staticmethod
+    def _finalize(encoded: Future, done: Future, on_saved: SavedCallback | None) -> None:
+        try:
+            path = encoded.result()
+            if on_saved is not None:
+                on_saved(path)
+        except BaseException as e:
+            done.set_exception(e)
+            return
+        done.set_result(path)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; with ``wait`` finish every queued save first."""
+        self._encoders.shutdown(wait=wait)
+        self._finishers.shutdown(wait=wait)
+
+
+_saver: ImageSaver | None = None
+_saver_lock = threading.Lock()
+
+
+def get_image_saver() -> ImageSaver:
+    """Return the process-wide image saver, creating it on first use."""
+    global _saver
+    with _saver_lock:
+        if _saver is None:
+            _saver = ImageSaver()
+        return _saver
+
+
+def shutdown_image_saver(wait: bool = True) -> None:
+    """Flush and stop the process-wide image saver, if it was started."""
+    global _saver
+    with _saver_lock:
+        saver, _saver = _saver, None
+    if saver is not None:
+        saver.shutdown(wait=wait)
@@ -1,10 +1,14 @@
 import io
 import json
+import sqlite3
 import zipfile
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
 
 from src.config.settings import OUTPUT_DIR, ensure_directories
+from src.utils.encoding import OUTPUT_EXTENSIONS
+from src.utils.gallery_index import get_gallery_index
 
 
 def get_output_path(prompt: str, width: int, height: int, ext: str = "png") -> Path:
@@ -18,10 +22,16 @@ def get_output_path(prompt: str, width: int, height: int, ext: str = "png") -> P
     return OUTPUT_DIR / filename
 
 
-def list_outputs(ext: str = "png") -> list[Path]:
-    """List all generated wallpapers in the output directory."""
+def list_outputs(ext: str | None = None) -> list[Path]:
+    """List generated wallpapers in the output directory, newest first.
+
+    Args:
+        ext: Only list files with this extension. None = every output format.
+    """
     ensure_directories()
-    return sorted(OUTPUT_DIR.glob(f"*.{ext}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    exts = (ext,) if ext else OUTPUT_EXTENSIONS
+    paths = [p for e in exts for p in OUTPUT_DIR.glob(f"*.{e}")]
+    return sorted(paths, key=lambda p: p.stat().st_mtime, reverse=True)
 
 
 def _metadata_path(image_path: Path) -> Path:
@@ -32,7 +42,13 @@ def _metadata_path(image_path: Path) -> Path:
 def save_metadata(image_path: Path, metadata: dict) -> None:
     """Save generation metadata as a JSON sidecar file alongside the image."""
     meta = {**metadata, "timestamp": datetime.now().isoformat()}
-    _metadata_path(image_path).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    sidecar = _metadata_path(image_path)
+    sidecar.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    try:
+        get_gallery_index().upsert(image_path, meta, sidecar_mtime=sidecar.stat().st_mtime)
+    except sqlite3.Error:
+        # The sidecar is the source of truth; the next reconcile picks it up
+        pass
 
 
 def load_metadata(image_path: Path) -> dict | None:
@@ -62,6 +78,44 @@ def delete_output(image_path: Path) -> None:
     """Delete an output image and its metadata sidecar."""
     image_path.unlink(missing_ok=True)
     _metadata_path(image_path).unlink(missing_ok=True)
+    try:
+        get_gallery_index().remove(image_path.name)
+    except sqlite3.Error:
+        pass
+
+
+def reconcile_gallery_index(full: bool = False) -> dict:
+    """Bring the gallery index in line with the images and sidecars on disk.
+
+    Images whose file or sidecar changed since they were indexed are re-read,
+    new images are added and rows for deleted images are dropped. With
+    ``full=True`` every sidecar is re-read.
+
+    Returns counts of added, updated and removed rows.
+    """
+    index = get_gallery_index()
+    indexed = index.indexed_mtimes()
+    stats = {"added": 0, "updated": 0, "removed": 0}
+    seen = set()
+    pending = []
+    for img_path in list_outputs():
+        seen.add(img_path.name)
+        sidecar = _metadata_path(img_path)
+        sidecar_mtime = sidecar.stat().st_mtime if sidecar.exists() else None
+        mtime = img_path.stat().st_mtime
+        known = indexed.get(img_path.name)
+        if known and not full and known == (mtime, sidecar_mtime):
+            continue
+        pending.append((img_path.name, load_metadata(img_path), mtime, sidecar_mtime))
+        stats["updated" if known else "added"] += 1
+        if len(pending) >= 500:
+            index.upsert_many(pending)
+            pending = []
+    index.upsert_many(pending)
+    for filename in set(indexed) - seen:
+        index.remove(filename)
+        stats["removed"] += 1
+    return stats
 
 
 def filter_history(
@@ -87,11 +141,71 @@ def filter_history(
     return results
 
 
-def batch_export_zip(image_paths: list[Path]) -> bytes:
-    """Create an in-memory ZIP archive containing the given images."""
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+# Already-compressed formats are stored as-is; deflating them again costs CPU for ~0% gain
+_STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".avif"}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Non-seekable write target that collects bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_export_zip(
+    image_paths: list[Path],
+    include_metadata: bool = False,
+    chunk_size: int = 1 << 20,
+) -> Iterator[bytes]:
+    """Stream a ZIP archive of the given images chunk by chunk.
+
+    Memory use stays bounded by ``chunk_size`` regardless of how many files
+    are included: each file is read and emitted incrementally, and the archive
+    uses data descriptors so it never needs to seek back. Image formats are
+    stored without recompression; JSON sidecars (optional) are deflated.
+    """
+    sink = _ChunkSink()
+    seen: set[str] = set()
+    with zipfile.ZipFile(sink, "w") as zf:
         for path in image_paths:
-            if path.exists():
-                zf.write(path, path.name)
-    return buf.getvalue()
+            if not path.exists() or path.name in seen:
+                continue
+            seen.add(path.name)
+            files = [path]
+            sidecar = _metadata_path(path)
+            if include_metadata and sidecar.exists():
+                files.append(sidecar)
+            for file_path in files:
+                info = zipfile.ZipInfo.from_file(file_path, file_path.name)
+                if file_path.suffix.lower() in _STORED_SUFFIXES:
+                    info.compress_type = zipfile.ZIP_STORED
+                else:
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                with open(file_path, "rb") as src, zf.open(info, "w") as dst:
+                    while chunk := src.read(chunk_size):
+                        dst.write(chunk)
+                        if data := sink.drain():
+                            yield data
+                if data := sink.drain():
+                    yield data
+    # Closing the archive writes the central directory
+    if data := sink.drain():
+        yield data
+
+
+def batch_export_zip(image_paths: list[Path], include_metadata: bool = False) -> bytes:
+    """Create an in-memory ZIP archive containing the given images."""
+    return b"".join(iter_export_zip(image_paths, include_metadata=include_metadata))
@@ -0,0 +1,412 @@
+"""SQLite index of generated wallpapers and their metadata.
+
+The JSON sidecars next to each image remain the source of truth; this index
+mirrors them so gallery listing, filtering and pagination are answered by
+SQL instead of re-reading every sidecar on each request. Prompt search uses
+an FTS5 full-text index when the SQLite build supports it.
+"""
+
+import base64
+import binascii
+import html
+import json
+import math
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from src.config.settings import GALLERY_INDEX_PATH, OUTPUT_DIR, ensure_directories
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    filename TEXT PRIMARY KEY,
+    prompt TEXT,
+    negative_prompt TEXT,
+    seed INTEGER,
+    num_inference_steps INTEGER,
+    guidance_scale REAL,
+    base_width INTEGER,
+    base_height INTEGER,
+    target_width INTEGER,
+    target_height INTEGER,
+    resolution TEXT,
+    enable_upscaling INTEGER,
+    upscale_model TEXT,
+    model_id TEXT,
+    timestamp TEXT,
+    mtime REAL NOT NULL,
+    sidecar_mtime REAL,
+    metadata TEXT,
+    content_hash TEXT,
+    content_key TEXT,
+    base_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_order ON images (mtime DESC, filename DESC);
+CREATE INDEX IF NOT EXISTS idx_images_resolution ON images (resolution, mtime DESC, filename DESC);
+"""
+
+# External-content FTS5 table over the searchable columns, kept in sync by
+# triggers. Rows are keyed by the images table's implicit rowid, which upserts
+# preserve (ON CONFLICT DO UPDATE rather than INSERT OR REPLACE).
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE images_fts USING fts5(
+    filename, prompt, negative_prompt,
+    content='images', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER images_fts_insert AFTER INSERT ON images BEGIN
+    INSERT INTO images_fts (rowid, filename, prompt, negative_prompt)
+    VALUES (new.rowid, new.filename, new.prompt, new.negative_prompt);
+END;
+CREATE TRIGGER images_fts_delete AFTER DELETE ON images BEGIN
+    INSERT INTO images_fts (images_fts, rowid, filename, prompt, negative_prompt)
+    VALUES ('delete', old.rowid, old.filename, old.prompt, old.negative_prompt);
+END;
+CREATE TRIGGER images_fts_update AFTER UPDATE ON images BEGIN
+    INSERT INTO images_fts (images_fts, rowid, filename, prompt, negative_prompt)
+    VALUES ('delete', old.rowid, old.filename, old.prompt, old.negative_prompt);
+    INSERT INTO images_fts (rowid, filename, prompt, negative_prompt)
+    VALUES (new.rowid, new.filename, new.prompt, new.negative_prompt);
+END;
+"""
+
+# Columns added after the first release, applied to existing databases on open
+_MIGRATIONS = {
+    "content_hash": "ALTER TABLE images ADD COLUMN content_hash TEXT",
+    "content_key": "ALTER TABLE images ADD COLUMN content_key TEXT",
+    "base_key": "ALTER TABLE images ADD COLUMN base_key TEXT",
+}
+
+# Indexes on migrated columns, created once the columns exist
+_POST_MIGRATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_images_content_key ON images (content_key) WHERE content_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_images_base_key ON images (base_key) WHERE base_key IS NOT NULL;
+"""
+
+# bm25 column weights: filename, prompt, negative_prompt
+_FTS_WEIGHTS = (1.0, 10.0, 2.0)
+
+_COLUMNS = (
+    "filename", "prompt", "negative_prompt", "seed", "num_inference_steps",
+    "guidance_scale", "base_width", "base_height", "target_width", "target_height",
+    "resolution", "enable_upscaling", "upscale_model", "model_id", "timestamp",
+    "mtime", "sidecar_mtime", "metadata", "content_hash", "content_key", "base_key",
+)
+
+_UPSERT = (
+    f"INSERT INTO images ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+    "ON CONFLICT(filename) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[1:])
+)
+
+
+@dataclass
+class GalleryPage:
+    entries: list[dict]
+    total: int
+    next_cursor: str | None = None
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that this index did not issue."""
+
+
+def _encode_cursor(mtime: float, filename: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([mtime, filename]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (UnicodeError, binascii.Error, ValueError) as e:
+        raise InvalidCursor("Invalid gallery cursor") from e
+    if not (
+        isinstance(value, list)
+        and len(value) == 2
+        and type(value[0]) in (int, float)
+        and math.isfinite(value[0])
+        and isinstance(value[1], str)
+    ):
+        raise InvalidCursor("Invalid gallery cursor")
+    return float(value[0]), value[1]
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_fts_query(search: str) -> str:
+    """Turn free text into an FTS5 query: every token must match, as a prefix."""
+    tokens = re.findall(r"\w+", search)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+# Match delimiters for snippet(): control characters that are swapped for
+# <mark> tags only after the prompt text around them has been HTML-escaped
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+
+def _render_snippet(snippet: str) -> str:
+    """HTML-escape a snippet's text and turn its match delimiters into <mark> tags."""
+    text = html.escape(snippet)
+    return text.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def _row(filename: str, metadata: dict | None, mtime: float, sidecar_mtime: float | None) -> tuple:
+    meta = metadata or {}
+    base = meta.get("base_resolution") or [None, None]
+    target = meta.get("target_resolution") or [None, None]
+    resolution = f"{target[0]}x{target[1]}" if meta.get("target_resolution") else None
+    return (
+        filename,
+        meta.get("prompt"),
+        meta.get("negative_prompt"),
+        meta.get("seed"),
+        meta.get("num_inference_steps"),
+        meta.get("guidance_scale"),
+        base[0], base[1], target[0], target[1],
+        resolution,
+        None if meta.get("enable_upscaling") is None else int(meta["enable_upscaling"]),
+        meta.get("upscale_model"),
+        meta.get("model_id"),
+        meta.get("timestamp"),
+        mtime,
+        sidecar_mtime,
+        json.dumps(meta) if metadata is not None else None,
+        meta.get("content_hash"),
+        meta.get("content_key"),
+        meta.get("base_key"),
+    )
+
+
+class GalleryIndex:
+    """Queryable mirror of the output directory's images and sidecars."""
+
+    def __init__(self, db_path: Path | str | None = None, output_dir: Path | None = None):
+        if db_path is None:
+            ensure_directories()
+            db_path = GALLERY_INDEX_PATH
+        self.db_path = str(db_path)
+        self.output_dir = output_dir or OUTPUT_DIR
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        if self.db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(images)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in existing:
+                self._conn.execute(statement)
+        self._conn.executescript(_POST_MIGRATION_SCHEMA)
+        self.fts_enabled = self._ensure_fts()
+
+    def _ensure_fts(self) -> bool:
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'images_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans
+            return False
+        # Persist the column weights so queries can use the optimized ORDER BY rank
+        weights = ", ".join(str(w) for w in _FTS_WEIGHTS)
+        self._conn.execute(
+            "INSERT INTO images_fts (images_fts, rank) VALUES ('rank', ?)", (f"bm25({weights})",)
+        )
+        # Index rows that existed before the FTS table was added
+        self._conn.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild')")
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, image_path: Path, metadata: dict | None, sidecar_mtime: float | None = None) -> None:
+        """Insert or update the row for an image."""
+        self.upsert_many([(image_path.name, metadata, image_path.stat().st_mtime, sidecar_mtime)])
+
+    def upsert_many(
+        self, items: Iterable[tuple[str, dict | None, float, float | None]]
+    ) -> None:
+        """Insert or update many rows in one transaction.
+
+        Each item is (filename, metadata, image mtime, sidecar mtime).
+        """
+        rows = [_row(*item) for item in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(_UPSERT, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove(self, filename: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM images WHERE filename = ?", (filename,))
+
+    def set_content_hash(self, filename: str, digest: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE images SET content_hash = ? WHERE filename = ?", (digest, filename)
+            )
+
+    def get_content_hash(self, filename: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM images WHERE filename = ?", (filename,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _find_by(self, column: str, key: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT filename, mtime, metadata, content_hash FROM images WHERE {column} = ? "
+                "ORDER BY mtime DESC, filename DESC",
+                (key,),
+            ).fetchall()
+        return [self._row_to_entry(*row) for row in rows]
+
+    def find_by_content_key(self, key: str) -> list[dict]:
+        """Entries rendered from exactly the same request, newest first."""
+        return self._find_by("content_key", key)
+
+    def find_by_base_key(self, key: str) -> list[dict]:
+        """Entries sharing the same diffusion inputs (any target), newest first."""
+        return self._find_by("base_key", key)
+
+    def indexed_mtimes(self) -> dict[str, tuple[float, float | None]]:
+        """Return {filename: (image mtime, sidecar mtime)} for every indexed image."""
+        with self._lock:
+            rows = self._conn.execute("SELECT filename, mtime, sidecar_mtime FROM images").fetchall()
+        return {name: (mtime, sidecar) for name, mtime, sidecar in rows}
+
+    def count(self) -> int:
+        with self._lock:
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()
+        return n
+
+    def _row_to_entry(
+        self, filename: str, mtime: float, metadata: str | None, content_hash: str | None
+    ) -> dict:
+        from datetime import datetime
+
+        entry = {"path": str(self.output_dir / filename), "filename": filename}
+        if metadata:
+            entry.update(json.loads(metadata))
+        else:
+            entry["timestamp"] = datetime.fromtimestamp(mtime).isoformat()
+        if content_hash:
+            entry["content_hash"] = content_hash
+        return entry
+
+    def _where(self, search: str, resolution: str) -> tuple[str, list]:
+        clauses, args = [], []
+        if search and self.fts_enabled:
+            clauses.append("images_fts MATCH ?")
+            args.append(build_fts_query(search))
+        elif search:
+            pattern = f"%{_escape_like(search)}%"
+            clauses.append("(images.prompt LIKE ? ESCAPE '\\' OR images.filename LIKE ? ESCAPE '\\')")
+            args.extend([pattern, pattern])
+        if resolution:
+            clauses.append("images.resolution = ?")
+            args.append(resolution)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(
+        self,
+        search: str = "",
+        resolution: str = "",
+        limit: int = 50,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> GalleryPage:
+        """Return a page of entries.
+
+        Without a search, entries are newest first. With a search, prompts and
+        negative prompts are matched token by token (each token as a prefix),
+        ranked by relevance, and each entry gets a ``snippet``: HTML-escaped
+        text with the matches wrapped in ``<mark>`` tags.
+
+        Args:
+            search: Free-text query over prompt, negative prompt and filename.
+            resolution: Exact target resolution string (e.g. '3840x2160').
+            limit: Maximum number of entries to return.
+            offset: Number of matching entries to skip (LIMIT/OFFSET paging).
+            cursor: Opaque keyset cursor from a previous page; overrides offset.
+                Only used for unranked (non-search) listings.
+
+        Raises:
+            InvalidCursor: ``cursor`` is not one this index returned.
+        """
+        ranked = bool(search) and self.fts_enabled
+        keyset = _decode_cursor(cursor) if cursor and not ranked else None
+        if ranked and not build_fts_query(search):
+            return GalleryPage(entries=[], total=0)
+
+        where, args = self._where(search, resolution)
+        source = "images JOIN images_fts ON images_fts.rowid = images.rowid" if ranked else "images"
+        # A pure text search can be counted from the FTS index alone
+        count_source = "images_fts" if ranked and not resolution else source
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) FROM {count_source}{where}", args).fetchone()
+            page_where, page_args = where, list(args)
+            if keyset is not None:
+                page_where += (" AND " if where else " WHERE ") + "(images.mtime, images.filename) < (?, ?)"
+                page_args.extend(keyset)
+                offset = 0
+            if ranked:
+                rows = self._conn.execute(
+                    "SELECT images.filename, images.mtime, images.metadata, images.content_hash, "
+                    "snippet(images_fts, -1, ?, ?, '…', 16) "
+                    f"FROM {source}{page_where} "
+                    "ORDER BY images_fts.rank LIMIT ? OFFSET ?",
+                    [_MARK_OPEN, _MARK_CLOSE] + page_args + [limit, offset],
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT filename, mtime, metadata, content_hash, NULL FROM images{page_where} "
+                    "ORDER BY mtime DESC, filename DESC LIMIT ? OFFSET ?",
+                    page_args + [limit, offset],
+                ).fetchall()
+        entries = []
+        for filename, mtime, metadata, digest, snippet in rows:
+            entry = self._row_to_entry(filename, mtime, metadata, digest)
+            if snippet is not None:
+                entry["snippet"] = _render_snippet(snippet)
+            entries.append(entry)
+        next_cursor = None
+        if not ranked and len(rows) == limit:
+            next_cursor = _encode_cursor(rows[-1][1], rows[-1][0])
+        return GalleryPage(entries=entries, total=total, next_cursor=next_cursor)
+
+    def resolutions(self) -> list[str]:
+        """Return the distinct target resolutions present in the gallery."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT resolution FROM images WHERE resolution IS NOT NULL"
+            ).fetchall()
+        return sorted(r[0] for r in rows)
+
+
+_index: GalleryIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_gallery_index() -> GalleryIndex:
+    """Return the process-wide gallery index, creating it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = GalleryIndex()
+        return _index
@@ -0,0 +1,163 @@
+"""Images in flight between pipeline stages, converted lazily and counted.
+
+Stages hand each other an ``ImageBuffer`` instead of a PIL image. It holds
+whatever the producer had: a float (1, 3, H, W) RGB tensor in [0, 1] (VAE or
+upscaler output, on any device) or a PIL image. It converts only when a
+consumer needs the other form, so the VAE output reaches the upscaler as a
+tensor and the upscaled frame becomes a PIL image once, right before the
+final resize and encode.
+
+Every conversion that materializes a new full frame is counted, and so are
+the full-frame copies made outside ``ImageBuffer`` (a final Lanczos resize,
+the pickle that ships the frame to an encoder process; see
+``record_copy``). Wrap a job in ``count_copies()`` to see how many it made.
+"""
+
+import warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+import torch
+from PIL import Image
+
+
+@dataclass
+class CopyStats:
+    """Full-frame copies made by image conversions, and their total size."""
+    copies: int = 0
+    bytes: int = 0
+
+
+_stats: ContextVar[CopyStats | None] = ContextVar("image_copy_stats", default=None)
+
+
+@contextmanager
+def count_copies() -> Iterator[CopyStats]:
+    """Count the full-frame copies made by ``ImageBuffer`` conversions in this context."""
+    stats = CopyStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+def _count(nbytes: int) -> None:
+    stats = _stats.get()
+    if stats is not None:
+        stats.copies += 1
+        stats.bytes += nbytes
+
+
+def record_copy(image: Image.Image) -> None:
+    """Count a full-frame copy of a PIL image made outside ``ImageBuffer``."""
+    _count(image.width * image.height * len(image.getbands()))
+
+
+def _copied(tensor: torch.Tensor) -> torch.Tensor:
+    _count(tensor.numel() * tensor.element_size())
+    return tensor
+
+
+class ImageBuffer:
+    """An RGB image held as a tensor, a PIL image, or both.
+
+    Args:
+        tensor: (1, 3, H, W) or (3, H, W) float RGB in [0, 1], on any device.
+        image: A PIL image (converted to RGB on first tensor access).
+        owned: The tensor belongs to this buffer alone, so converting it to
+            PIL may scale it in place and then drop it, freeing the frame.
+    """
+
+    def __init__(
+        self,
+        tensor: torch.Tensor | None = None,
+        image: Image.Image | None = None,
+        owned: bool = False,
+    ):
+        if tensor is None and image is None:
+            raise ValueError("ImageBuffer needs a tensor or an image")
+        if tensor is not None and tensor.dim() == 3:
+            tensor = tensor[None]
+        self._tensor = tensor
+        self._image = image
+        self._owned = owned
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "ImageBuffer":
+        return cls(image=image)
+
+    @classmethod
+    def from_tensor(cls, tensor: torch.Tensor, owned: bool = False) -> "ImageBuffer":
+        return cls(tensor=tensor, owned=owned)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(width, height), like ``PIL.Image.size``."""
+        if self._image is not None:
+            return self._image.size
+        return self._tensor.shape[3], self._tensor.shape[2]
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    def tensor(
+        self, device: torch.device | str | None = None, dtype: torch.dtype | None = None
+    ) -> torch.Tensor:
+        """The image as a (1, 3, H, W) tensor in [0, 1] on ``device``.
+
+        Returns the held tensor itself when it already matches (None keeps
+        its device and dtype). A PIL image costs one copy out of PIL plus one
+        into ``dtype``, float32 by default; the result is a channels-last view
+        that the tiler slices without another copy.
+        """
+        if self._tensor is not None:
+            tensor = self._tensor
+            same_device = device is None or tensor.device == torch.device(device)
+            if same_device and (dtype is None or tensor.dtype == dtype):
+                return tensor
+            return _copied(tensor.to(device or tensor.device, dtype or tensor.dtype))
+
+        rgb = self._image if self._image.mode == "RGB" else self._image.convert("RGB")
+        width, height = rgb.size
+        with warnings.catch_warnings():
+            # The uint8 view is read once and never written
+            warnings.simplefilter("ignore", UserWarning)
+            data = rgb.tobytes()
+            _count(len(data))
+            pixels = torch.frombuffer(data, dtype=torch.uint8)
+        pixels = pixels.view(height, width, 3).permute(2, 0, 1)[None]
+        if device is not None and pixels.device != torch.device(device):
+            # Move the compact uint8 frame, not the 4x larger float one
+            pixels = _copied(pixels.to(device))
+        return _copied(pixels.to(dtype or torch.float32)).div_(255)
+
+    def pil(self) -> Image.Image:
+        """The image as an RGB PIL image; converted once, then cached."""
+        if self._image is not None:
+            return self._image
+        frame = self._tensor[0]
+        if self._owned:
+            frame.mul_(255).round_().clamp_(0, 255)
+        else:
+            frame = _copied(frame * 255).round_().clamp_(0, 255)
+        # One uint8 copy on the tensor's device, laid out as PIL expects
+        height, width = frame.shape[1], frame.shape[2]
+        pixels = torch.empty((height, width, 3), dtype=torch.uint8, device=frame.device)
+        _copied(pixels.copy_(frame.permute(1, 2, 0)))
+        if pixels.device.type != "cpu":
+            pixels = _copied(pixels.cpu())
+        # PIL stores RGB as 4 bytes per pixel, so this is the final, unavoidable copy
+        _count(pixels.numel())
+        self._image = Image.frombuffer("RGB", (width, height), pixels.numpy(), "raw", "RGB", 0, 1)
+        if self._owned:
+            # The tensor was scaled in place; free the float frame
+            self._tensor = None
+        return self._image
@@ -7,10 +7,17 @@ from PIL import Image
 
 
 def create_thumbnail(image: Image.Image, max_size: tuple[int, int] = (512, 512)) -> Image.Image:
-    """Create a thumbnail copy of the image, preserving aspect ratio."""
-    thumb = image.copy()
-    thumb.thumbnail(max_size, Image.LANCZOS)
-    return thumb
+    """Create a thumbnail copy of the image, preserving aspect ratio.
+
+    Resizes straight from the source (reducing by whole factors first), so
+    an 8K frame is never copied at full size on the way down.
+    """
+    width, height = image.size
+    scale = min(max_size[0] / width, max_size[1] / height)
+    if scale >= 1:
+        return image.copy()
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.LANCZOS, reducing_gap=2.0)
 
 
 
@@ -31,6 +38,22 @@ def resize_image(image: Image.Image, width: int, height: int) -> Image.Image:
     return image.resize((width, height), Image.LANCZOS)
 
 
+def resize_to_cover(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Center-crop an image to the target aspect ratio, then resize to exact dimensions."""
+    src_w, src_h = image.size
+    target_aspect = width / height
+    if src_w / src_h > target_aspect:
+        crop_w, crop_h = round(src_h * target_aspect), src_h
+    else:
+        crop_w, crop_h = src_w, round(src_w / target_aspect)
+    left = (src_w - crop_w) // 2
+    top = (src_h - crop_h) // 2
+    box = (left, top, left + crop_w, top + crop_h)
+    if (crop_w, crop_h) == (width, height):
+        return image.crop(box)
+    return image.resize((width, height), Image.LANCZOS, box=box)
+
+
 def convert_format(input_path: Path, output_path: Path, quality: int = 95) -> Path:
     """Convert an image file to a different format (determined by output_path extension)."""
     with Image.open(input_path) as img: